@@ -0,0 +1,154 @@
+"""
+Wav2Lip's audio front end: the mel spectrogram its models were trained on,
+computed with numpy, for a whole file or incrementally from a stream.
+"""
+
+import subprocess
+
+import numpy as np
+
+# Wav2Lip's hparams.
+SAMPLE_RATE = 16000
+N_FFT = 800
+HOP_SIZE = 200
+WIN_SIZE = 800
+NUM_MELS = 80
+FMIN = 55
+FMAX = 7600
+PREEMPHASIS = 0.97
+REF_LEVEL_DB = 20
+MIN_LEVEL_DB = -100
+MAX_ABS_VALUE = 4.0
+
+MEL_FRAMES_PER_SECOND = SAMPLE_RATE / HOP_SIZE
+MEL_STEP_SIZE = 16
+
+_mel_basis = None
+
+
+def load_wav(path, sr):
+    """
+    Decode any audio or video file to mono float32 at sr Hz through an ffmpeg pipe,
+    so inputs need no conversion to a temporary WAV first.
+    """
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path, "-vn", "-f", "s16le", "-ac", "1",
+               "-ar", str(sr), "pipe:1"]
+    out = subprocess.run(command, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def _hz_to_mel(f):
+    # Slaney's scale (librosa's default): linear below 1 kHz, logarithmic above.
+    f = np.asarray(f, dtype=np.float64)
+    log = 15.0 + np.log(np.maximum(f, 1e-10) / 1000.0) / (np.log(6.4) / 27.0)
+    return np.where(f >= 1000.0, log, f * 3.0 / 200.0)
+
+
+def _mel_to_hz(m):
+    m = np.asarray(m, dtype=np.float64)
+    return np.where(m >= 15.0, 1000.0 * np.exp((np.log(6.4) / 27.0) * (m - 15.0)), m * 200.0 / 3.0)
+
+
+def _build_mel_basis():
+    fft_freqs = np.linspace(0, SAMPLE_RATE / 2, 1 + N_FFT // 2)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(FMIN), _hz_to_mel(FMAX), NUM_MELS + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None]
+    return weights.astype(np.float32)
+
+
+def _mel_frames(padded):
+    """
+    Normalized mel frames of a preemphasized signal padded by N_FFT // 2 on both
+    sides, one every HOP_SIZE samples: the columns librosa's centered STFT gives.
+    """
+    global _mel_basis
+    if _mel_basis is None:
+        _mel_basis = _build_mel_basis()
+    count = 1 + (len(padded) - N_FFT) // HOP_SIZE
+    if count <= 0:
+        return np.zeros((NUM_MELS, 0), dtype=np.float32)
+    window = np.hanning(WIN_SIZE + 1)[:WIN_SIZE].astype(np.float32)
+    frames = padded[np.arange(count)[:, None] * HOP_SIZE + np.arange(N_FFT)[None, :]] * window
+    magnitude = np.abs(np.fft.rfft(frames, axis=1)).T
+    db = 20 * np.log10(np.maximum(1e-5, _mel_basis @ magnitude)) - REF_LEVEL_DB
+    normalized = (2 * MAX_ABS_VALUE) * ((db - MIN_LEVEL_DB) / -MIN_LEVEL_DB) - MAX_ABS_VALUE
+    return np.clip(normalized, -MAX_ABS_VALUE, MAX_ABS_VALUE).astype(np.float32)
+
+
+def _preemphasize(wav, previous=0.0):
+    wav = np.asarray(wav, dtype=np.float32)
+    return wav - PREEMPHASIS * np.concatenate([[previous], wav[:-1]]).astype(np.float32)
+
+
+def melspectrogram(wav):
+    """
+    (NUM_MELS, frames) mel spectrogram of a whole SAMPLE_RATE signal.
+    """
+    pad = N_FFT // 2
+    return _mel_frames(np.pad(_preemphasize(wav), pad, mode="reflect" if len(wav) > pad else "constant"))
+
+
+class StreamingMel:
+    """
+    The mel spectrogram of audio still arriving in a utils.audio_stream.AudioRing
+    at SAMPLE_RATE, computed block_frames at a time as chunk() asks for it. Chunks
+    only move forward, so the samples and mel frames behind them are released.
+    Matches melspectrogram() except within N_FFT // 2 samples of the end, which is
+    padded with silence rather than reflected.
+    """
+
+    def __init__(self, ring, block_frames=80):
+        self.ring = ring
+        self.block_frames = block_frames
+        self.mel = np.zeros((NUM_MELS, 0), dtype=np.float32)
+        self.first = 0  # index of mel[:, 0]
+        self.total = None  # frame count, known once the stream has ended
+
+    @property
+    def computed(self):
+        return self.first + self.mel.shape[1]
+
+    def _extend(self, upto):
+        pad = N_FFT // 2
+        while self.total is None and self.computed < upto:
+            j0 = self.computed
+            j1 = max(upto, j0 + self.block_frames)
+            available = self.ring.wait_for((j1 - 1) * HOP_SIZE + pad)
+            if available < (j1 - 1) * HOP_SIZE + pad:
+                self.total = 1 + available // HOP_SIZE if available else 0
+                j1 = min(j1, self.total)
+                if j1 <= j0:
+                    break
+            lo = j0 * HOP_SIZE - pad
+            x = self.ring.read(max(lo, 0) - 1, (j1 - 1) * HOP_SIZE + pad)
+            y = _preemphasize(x[1:], x[0])
+            if lo < 0:
+                y = np.concatenate([y[1:1 - lo][::-1], y])
+            self.mel = np.concatenate([self.mel, _mel_frames(y)], axis=1)
+
+    def chunk(self, start, size=MEL_STEP_SIZE):
+        """
+        Mel frames [start, start + size), blocking until the audio for them has
+        arrived. Past the end of the stream, the last size frames (like Wav2Lip's
+        own inference), zero-padded if the audio is shorter; None if there was no audio.
+        """
+        self._extend(start + size)
+        end = self.computed
+        if end == 0:
+            return None
+        if start + size > end:
+            start = end - size
+        keep = max(self.first, min(start, end - size))
+        self.mel = self.mel[:, keep - self.first:]
+        self.first = keep
+        # The next block starts from frame `computed`, which needs samples from N_FFT // 2 before it.
+        self.ring.release(max(0, self.computed * HOP_SIZE - N_FFT // 2 - 1))
+        chunk = self.mel[:, max(start, self.first) - self.first:start + size - self.first]
+        if chunk.shape[1] < size:
+            chunk = np.pad(chunk, ((0, 0), (size - chunk.shape[1], 0)))
+        return chunk
@@ -17,8 +17,12 @@ import os
 import sys
 import logging
 
-# Add the current directory to Python path
+# Add the current directory (and the project root, for utils) to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Wav2Lip import audio
+from utils.audio_stream import AudioRing
 
 logger = logging.getLogger(__name__)
 
@@ -27,84 +31,83 @@ class SimpleLipSync:
     
     def __init__(self):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        # Rate of the audio sync_frames expects in an AudioRing.
+        self.sample_rate = audio.SAMPLE_RATE
         logger.info(f"Using device: {self.device}")
     
-    def process_video(self, face_path, audio_path, outfile_path):
+    def sync_frames(self, frames, speech, fps=25.0):
+        """
+        Yield lip-synced BGR frames for the given input frames and audio.
+        Each frame is paired with the mel chunk Wav2Lip reads for it; frames whose
+        audio hasn't been synthesized yet wait for it, so lip-sync can run on the
+        first seconds of speech while the rest is still being generated.
+        The simplified model keeps the frames as they are; mouth inference slots in _infer.
+        frames: iterable of BGR numpy arrays or utils.media.Frame (fps is used to time plain arrays).
+        speech: path of an audio file, or a utils.audio_stream.AudioRing at audio.SAMPLE_RATE.
+        """
+        if not isinstance(speech, AudioRing):
+            speech = AudioRing.from_array(audio.load_wav(speech, audio.SAMPLE_RATE), audio.SAMPLE_RATE)
+        mel = audio.StreamingMel(speech)
+        try:
+            for i, frame in enumerate(frames):
+                t = getattr(frame, "t", i / fps)
+                chunk = mel.chunk(int(t * audio.MEL_FRAMES_PER_SECOND))
+                yield self._infer(getattr(frame, "image", frame), chunk)
+        finally:
+            # Stop a producer still feeding the ring if rendering ends early.
+            speech.close()
+
+    def _infer(self, image, mel_chunk):
+        return image
+
+    def process_video(self, face_path, audio_path, outfile_path, frames=None, fps=None, srt_path=""):
         """
         Process video and audio for lip-sync.
         This is a simplified version that focuses on audio-video synchronization.
+        The lip-synced frames, the new audio and optional subtitles are encoded in one ffmpeg pass.
+        frames: optional iterable of BGR frames (numpy arrays or utils.media.Frame)
+                already decoded from face_path by a shared media source; fps is then required.
         """
+        from utils.video_processing import render_final
+
+        cap = None
         try:
-            # Load video
-            cap = cv2.VideoCapture(face_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            # Load audio (simplified - just get duration)
-            import librosa
-            audio, sr = librosa.load(audio_path, sr=None)
-            audio_duration = len(audio) / sr
-            
-            # Calculate video duration
-            video_duration = frame_count / fps
-            
-            logger.info(f"Video: {video_duration:.2f}s, Audio: {audio_duration:.2f}s")
-            
-            # Create output video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(outfile_path, fourcc, fps, 
-                                (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 
-                                 int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
-            
-            # Process frames
-            frame_idx = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Write frame to output
-                out.write(frame)
-                frame_idx += 1
-                
-                if frame_idx % 100 == 0:
-                    logger.info(f"Processed {frame_idx}/{frame_count} frames")
-            
-            cap.release()
-            out.release()
-            
-            # Use ffmpeg to combine video with new audio
-            import subprocess
-            temp_output = outfile_path.replace('.mp4', '_temp.mp4')
-            os.rename(outfile_path, temp_output)
-            
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', temp_output,
-                '-i', audio_path,
-                '-c:v', 'copy',
-                '-c:a', 'aac',
-                '-map', '0:v:0',
-                '-map', '1:a:0',
-                '-shortest',
-                outfile_path
-            ]
-            
-            subprocess.run(cmd, check=True)
-            os.remove(temp_output)
-            
+            if frames is None:
+                # Load video
+                cap = cv2.VideoCapture(face_path)
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                logger.info(f"Video: {frame_count / fps:.2f}s at {fps:.2f} fps")
+                frames = self._read_frames(cap)
+
+            result = render_final(self.sync_frames(frames, audio_path, fps), fps, audio_path, outfile_path, srt_path)
+            if not result:
+                raise RuntimeError("final render failed")
+
             logger.info(f"Lip-sync completed: {outfile_path}")
             return outfile_path
-            
+
         except Exception as e:
             logger.error(f"Lip-sync failed: {e}")
             return None
+        finally:
+            if cap is not None:
+                cap.release()
+
+    @staticmethod
+    def _read_frames(cap):
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
 
 def main():
     parser = argparse.ArgumentParser(description='Simple Lip-Sync Inference')
     parser.add_argument('--face', type=str, required=True, help='Path to video file')
     parser.add_argument('--audio', type=str, required=True, help='Path to audio file')
     parser.add_argument('--outfile', type=str, required=True, help='Path to output file')
+    parser.add_argument('--srt', type=str, default='', help='Optional subtitles to burn in during the same encode')
     
     args = parser.parse_args()
     
@@ -115,7 +118,7 @@ def main():
     lip_sync = SimpleLipSync()
     
     # Process video
-    result = lip_sync.process_video(args.face, args.audio, args.outfile)
+    result = lip_sync.process_video(args.face, args.audio, args.outfile, srt_path=args.srt)
     
     if result:
         print(f"Successfully created: {result}")
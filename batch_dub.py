@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Headless batch dubbing: runs the same pipeline as the Streamlit app over a
+directory or manifest of MP4s.
+
+    python batch_dub.py videos/ --output-dir output/batch --cpu-workers 4 --io-workers 16
+    python batch_dub.py manifest.txt --stage-workers render=2 --summary summary.json
+    python batch_dub.py videos/ --output-dir output/batch --resume   # continue an interrupted batch
+
+Exit status: 0 if every video was dubbed, 1 if any failed, 2 on bad arguments.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger("batch_dub")
+
+
+def collect_videos(source: str, recursive: bool = False):
+    """
+    List input videos from a directory of MP4s or a manifest file.
+    A manifest is either a JSON list of paths or a text file with one path per line
+    ('#' starts a comment); relative paths are resolved against the manifest's folder.
+    """
+    if os.path.isdir(source):
+        videos = []
+        for root, dirs, files in os.walk(source):
+            videos.extend(os.path.join(root, f) for f in files if f.lower().endswith(".mp4"))
+            if not recursive:
+                break
+        return sorted(videos)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        if source.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.split("#", 1)[0].strip() for line in f]
+    return [os.path.join(base, e) for e in entries if e]
+
+
+def session_name(video_path: str) -> str:
+    """
+    Job folder name for a video: its stem plus a short hash of its absolute path,
+    so --resume finds the same folder however the batch's list changes.
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}-{digest}"
+
+
+def _parse_stage_workers(values):
+    limits = {}
+    for value in values or []:
+        name, _, count = value.partition("=")
+        if not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(f"--stage-workers expects NAME=N, got {value!r}")
+        limits[name] = int(count)
+    return limits
+
+
+def dub_one(video_path: str, session_dir: str, executors, use_cache: bool = True, resume: bool = False,
+            chunk_seconds=None) -> dict:
+    """
+    Dub a single video and return its summary record.
+    With resume, a video whose job already finished in session_dir is skipped and
+    an unfinished one continues after its last completed stage.
+    chunk_seconds: see pipeline.run_dubbing (None: settings.CHUNK_SECONDS).
+    """
+    from utils import pipeline
+    from utils.manifest import JobManifest
+
+    record = {"video": video_path, "session_dir": session_dir, "status": "ok", "stages": {}}
+    if resume:
+        manifest = JobManifest.load(session_dir)
+        finished = manifest.status == "done" and manifest.data["video_path"] == video_path
+        if finished and manifest.data.get("result") and os.path.exists(manifest.data["result"]):
+            record.update(output=manifest.data["result"], seconds=0.0, resumed="skipped",
+                          trace=os.path.join(session_dir, "trace.json"))
+            return record
+    started = {}
+
+    def on_stage_start(stage):
+        started[stage.name] = time.perf_counter()
+
+    def on_stage_complete(stage, result):
+        record["stages"][stage.name] = round(time.perf_counter() - started[stage.name], 3)
+
+    t0 = time.perf_counter()
+    try:
+        results = pipeline.run_dubbing(video_path, session_dir, executors=executors,
+                                       on_stage_start=on_stage_start, on_stage_complete=on_stage_complete,
+                                       use_cache=use_cache, resume=resume, chunk_seconds=chunk_seconds)
+        record["output"] = results["render"]
+    except pipeline.PipelineError as e:
+        record.update(status="failed", stage=e.stage, error=str(e))
+        logger.error(f"{video_path}: {e}")
+    except Exception as e:
+        record.update(status="failed", stage="", error=str(e))
+        logger.exception(f"{video_path}: unexpected failure")
+    record["seconds"] = round(time.perf_counter() - t0, 3)
+    record["trace"] = os.path.join(session_dir, "trace.json")
+    return record
+
+
+def main(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Dub a directory or manifest of English MP4s into French.")
+    parser.add_argument("source", help="Directory of .mp4 files, or a manifest (.txt one path per line, or .json list)")
+    parser.add_argument("--output-dir", default=os.path.join("output", "batch"), help="Where per-video job folders go")
+    parser.add_argument("--recursive", action="store_true", help="Also pick up MP4s in subdirectories")
+    parser.add_argument("--jobs", type=int, default=0,
+                        help="Videos in flight at once (default: io-workers + cpu-workers)")
+    parser.add_argument("--io-workers", type=int, default=16,
+                        help="Pool size for network-bound stages: translation, TTS (default: 16)")
+    parser.add_argument("--cpu-workers", type=int, default=max(1, cpu_count // 2),
+                        help="Pool size for CPU-bound stages: Whisper, OCR, lip-sync and final render "
+                             "(default: half the cores)")
+    parser.add_argument("--cpu-executor", choices=["thread", "process"], default=None,
+                        help="Run CPU-bound stages on threads or processes (default: PIPELINE_CPU_EXECUTOR)")
+    parser.add_argument("--stage-workers", action="append", metavar="STAGE=N",
+                        help="Cap one stage's concurrency across all videos, e.g. transcribe=1 (repeatable)")
+    parser.add_argument("--summary", default="", help="Write the JSON summary here (default: <output-dir>/summary.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the artifact cache")
+    parser.add_argument("--chunk-seconds", type=float, default=None,
+                        help="Dub videos longer than this in chunks of about this length, split at pauses or "
+                             "scene cuts and processed on a shared pool of --cpu-workers processes "
+                             "(default: CHUNK_SECONDS, 0 disables)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip videos already dubbed in --output-dir and continue unfinished ones "
+                             "from their last completed stage")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.io_workers < 1 or args.cpu_workers < 1:
+        parser.error("--io-workers and --cpu-workers must be at least 1")
+    if args.jobs < 0:
+        parser.error("--jobs must be at least 1 (or 0 for the default)")
+    try:
+        stage_limits = _parse_stage_workers(args.stage_workers)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Every CPU worker gets an equal share of the cores for its BLAS/torch
+    # threads so a full pool doesn't oversubscribe the machine. Must be set
+    # before torch is imported by the stages.
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, cpu_count // args.cpu_workers)))
+
+    try:
+        videos = collect_videos(args.source, recursive=args.recursive)
+    except (OSError, ValueError) as e:
+        parser.error(f"Cannot read {args.source}: {e}")
+    if not videos:
+        parser.error(f"No MP4 files found in {args.source}")
+
+    from utils import pipeline
+    from utils.cache import get_cache
+    from utils.lip_sync_worker import preload_lip_sync
+    from utils.model_registry import preload_whisper
+    from utils.translation_memory import get_translation_memory
+    from utils.tts_cache import get_tts_cache
+
+    # Jobs share one loaded Whisper model and lip-syncer per process instead of loading them per video.
+    preload_whisper(background=True)
+    preload_lip_sync(background=True)
+    executors = pipeline.make_executors(io_workers=args.io_workers, cpu_workers=args.cpu_workers,
+                                        cpu_executor=args.cpu_executor)
+    # Chunks of long videos share --cpu-workers processes across all jobs.
+    executors["chunk"] = pipeline.make_chunk_pool(args.cpu_workers)
+    stage_pools = {stage.name: stage.pool for stage in pipeline.dubbing_stages()}
+    for name, count in stage_limits.items():
+        if name not in stage_pools:
+            parser.error(f"Unknown stage {name!r}; expected one of {', '.join(stage_pools)}")
+        if stage_pools[name] == "cpu" and isinstance(executors["cpu"], ProcessPoolExecutor):
+            executors[name] = ProcessPoolExecutor(max_workers=count)
+        else:
+            executors[name] = ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"pipeline-{name}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = args.jobs or args.io_workers + args.cpu_workers
+    logger.info(f"Dubbing {len(videos)} videos, {jobs} at a time "
+                f"(io={args.io_workers}, cpu={args.cpu_workers}, stage limits={stage_limits or 'none'})")
+
+    summary = {"source": args.source, "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "videos": []}
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="batch-job") as drivers:
+            futures = {}
+            for i, video in enumerate(videos):
+                session_dir = os.path.join(args.output_dir, session_name(video))
+                futures[drivers.submit(dub_one, video, session_dir, executors, not args.no_cache, args.resume,
+                                       args.chunk_seconds)] = i
+            records = [None] * len(videos)
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                records[futures[future]] = record
+                logger.info(f"[{done}/{len(videos)}] {record['status']}: {record['video']} ({record['seconds']}s)")
+    finally:
+        for pool in executors.values():
+            pool.shutdown(wait=True)
+
+    summary["videos"] = records
+    summary["seconds"] = round(time.perf_counter() - t0, 3)
+    summary["ok"] = sum(r["status"] == "ok" for r in records)
+    summary["failed"] = len(records) - summary["ok"]
+    cache = None if args.no_cache else get_cache()
+    if cache is not None:
+        summary["cache"] = cache.stats()
+    memory = get_translation_memory()
+    if memory is not None:
+        memory.flush()
+        summary["translation_memory"] = memory.stats()
+    tts_cache = get_tts_cache()
+    if tts_cache is not None:
+        summary["tts_cache"] = tts_cache.stats()
+
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    logger.info(f"{summary['ok']} dubbed, {summary['failed']} failed in {summary['seconds']}s. Summary: {summary_path}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+End-to-end load test: N dubbing jobs at once against the local Gemini and
+ElevenLabs stand-ins, through the plain-HTTP backends.
+
+    python -m benchmarks.dub_load --jobs 8 --llm-latency 0.3 --tts-latency 0.5 --tts-max-concurrent 4
+    python -m benchmarks.dub_load --videos clips/ --jobs 16 --tts-chunk-size 1024 --tts-chunk-interval 0.05
+
+Every job runs the full pipeline (batch_dub.dub_one) on shared executors, with
+the artifact cache, translation memory and TTS cache off so each one really
+calls the APIs. Prints throughput, p50/p95/p99 of every stage's wall time,
+the stand-ins' request/throttle counts and the translation client's retries.
+Without --videos a synthetic speech-like clip is used; Whisper may transcribe
+it to little or nothing, which leaves translation and TTS with less to do.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import llm_server, standin, tts_server
+from benchmarks.llm_load import percentile
+from config import settings
+
+
+def _videos(args, work_dir):
+    if args.videos:
+        from batch_dub import collect_videos
+        return collect_videos(args.videos)
+    from benchmarks import synthetic
+    return [synthetic.make_clip(os.path.join(work_dir, "clip.mp4"), args.seconds, args.resolution)]
+
+
+def run_jobs(videos, jobs: int, work_dir: str, io_workers: int, cpu_workers: int) -> dict:
+    from batch_dub import dub_one
+    from utils import pipeline
+
+    executors = pipeline.make_executors(io_workers=io_workers, cpu_workers=cpu_workers)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="load-job") as drivers:
+            futures = [drivers.submit(dub_one, videos[i % len(videos)], os.path.join(work_dir, f"job{i:03d}"),
+                                      executors, False, False, 0)
+                       for i in range(jobs)]
+            records = [future.result() for future in futures]
+    finally:
+        for pool in executors.values():
+            pool.shutdown(wait=True)
+    wall = time.perf_counter() - started
+
+    from utils.media import probe
+    video_seconds = sum(probe(r["video"]).get("duration", 0.0) for r in records if r["status"] == "ok")
+    stages = {}
+    for record in records:
+        for name, seconds in record["stages"].items():
+            stages.setdefault(name, []).append(seconds)
+    return {
+        "jobs": jobs,
+        "ok": sum(r["status"] == "ok" for r in records),
+        "failed": [{"video": r["video"], "stage": r["stage"], "error": r["error"]}
+                   for r in records if r["status"] != "ok"],
+        "seconds": round(wall, 3),
+        "jobs_per_minute": round(60 * sum(r["status"] == "ok" for r in records) / wall, 2),
+        "video_seconds_per_second": round(video_seconds / wall, 3),
+        "job_p50": round(percentile([r["seconds"] for r in records], 50), 3),
+        "job_p95": round(percentile([r["seconds"] for r in records], 95), 3),
+        "stages": {name: {"count": len(values),
+                          "p50": round(percentile(values, 50), 3),
+                          "p95": round(percentile(values, 95), 3),
+                          "p99": round(percentile(values, 99), 3),
+                          "max": round(max(values), 3)}
+                   for name, values in stages.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run concurrent dubbing jobs against the local API stand-ins.")
+    parser.add_argument("--jobs", type=int, default=4, help="Dubbing jobs to run at once")
+    parser.add_argument("--videos", default="", help="Directory or manifest of MP4s, used round robin "
+                                                     "(default: one synthetic clip)")
+    parser.add_argument("--seconds", type=int, default=10, help="Length of the synthetic clip")
+    parser.add_argument("--resolution", default="360p")
+    parser.add_argument("--io-workers", type=int, default=16)
+    parser.add_argument("--cpu-workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    standin.add_arguments(parser, "llm-", latency=0.3, jitter=0.1)
+    standin.add_arguments(parser, "tts-", latency=0.5, jitter=0.2)
+    tts_server.add_stream_arguments(parser, "tts-")
+    parser.add_argument("--json", default="", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="dub-load-")
+    settings.TRANSLATION_BACKEND, settings.TTS_BACKEND = "gemini-rest", "elevenlabs-rest"
+    settings.GOOGLE_API_KEY = settings.ELEVENLABS_API_KEY = "stub"
+    settings.CACHE_ENABLED = settings.TRANSLATION_MEMORY_ENABLED = settings.TTS_CACHE_ENABLED = False
+    settings.VOICE_CATALOGUE_DIR = os.path.join(work_dir, "voices")
+
+    from utils.model_registry import preload_whisper
+
+    videos = _videos(args, work_dir)
+    if not videos:
+        parser.error(f"No MP4 files found in {args.videos}")
+    preload_whisper()
+    with llm_server.running(**standin.behaviour(args, "llm-")) as llm, \
+            tts_server.running(chunk_size=args.tts_chunk_size, chunk_interval=args.tts_chunk_interval,
+                               **standin.behaviour(args, "tts-")) as tts:
+        settings.GEMINI_API_ENDPOINT = f"http://127.0.0.1:{llm.server_port}"
+        settings.ELEVENLABS_API_URL = f"http://127.0.0.1:{tts.server_port}"
+        result = run_jobs(videos, args.jobs, work_dir, args.io_workers, args.cpu_workers)
+        result["gemini"] = standin.stats(llm)
+        result["elevenlabs"] = dict(standin.stats(tts), characters=tts.characters)
+
+    from utils import translation
+    result["translation_client"] = {key[1] or "default": dict(client.stats)
+                                    for key, client in translation._clients.items()}
+    result["work_dir"] = work_dir
+
+    print(f"{args.jobs} jobs: {result['ok']} ok, {len(result['failed'])} failed in {result['seconds']:.1f}s | "
+          f"{result['jobs_per_minute']:.1f} jobs/min, {result['video_seconds_per_second']:.2f} video s/s | "
+          f"job p50 {result['job_p50']:.2f}s p95 {result['job_p95']:.2f}s")
+    for name, s in result["stages"].items():
+        print(f"  {name:12s} p50 {s['p50']:7.3f}s  p95 {s['p95']:7.3f}s  p99 {s['p99']:7.3f}s  max {s['max']:7.3f}s")
+    print(f"  gemini {result['gemini']} | elevenlabs {result['elevenlabs']} | client {result['translation_client']}")
+    for failure in result["failed"]:
+        print(f"  failed at {failure['stage'] or '?'}: {failure['error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+        print(f"Results written to {args.json}")
+    return 0 if not result["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Tail-latency load test of the translation client against the local Gemini stand-in.
+
+    python -m benchmarks.llm_load --requests 400 --concurrency 16 --slow-rate 0.05 --error-rate 0.05 --hedge 0,0.8
+
+For every --hedge value a fresh client (same timeout/retry settings as the app)
+sends the same requests through the stand-in, and the latency percentiles,
+failures and retry/hedge counts are printed side by side.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import llm_server
+from config import settings
+
+
+def percentile(values, q: float) -> float:
+    """
+    q-th percentile (0-100) of values by linear interpolation.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_load(requests: int, concurrency: int, hedge_after: float) -> dict:
+    from utils import translation
+
+    translation._clients.clear()
+    settings.TRANSLATION_HEDGE_SECONDS = hedge_after
+    client = translation.get_llm_client()
+    latencies, failures = [], 0
+
+    def one(i):
+        started = time.perf_counter()
+        client.complete(f"Translate the following text to fr (French):\nSentence {i}.")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one, i) for i in range(requests)]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                failures += 1
+    wall = time.perf_counter() - started
+    return {
+        "hedge_after": hedge_after,
+        "ok": len(latencies),
+        "failed": failures,
+        "throughput": round(len(latencies) / wall, 2),
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "max": round(max(latencies, default=0.0), 3),
+        "client": dict(client.stats),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the translation client against the Gemini stand-in.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hedge", default="0,1.0", help="TRANSLATION_HEDGE_SECONDS values to compare, comma separated")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--backend", default=settings.TRANSLATION_BACKEND,
+                        help="TRANSLATION_BACKEND to load (gemini needs the LangChain packages, gemini-rest doesn't)")
+    parser.add_argument("--json", default="", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    settings.GOOGLE_API_KEY = settings.GOOGLE_API_KEY or "stub"
+    settings.TRANSLATION_BACKEND = args.backend
+    results = []
+    for hedge_after in (float(h) for h in args.hedge.split(",")):
+        with llm_server.running(latency=args.latency, jitter=args.jitter, slow_rate=args.slow_rate,
+                                slow_latency=args.slow_latency, error_rate=args.error_rate) as server:
+            settings.GEMINI_API_ENDPOINT = f"http://127.0.0.1:{server.server_port}"
+            result = run_load(args.requests, args.concurrency, hedge_after)
+            result["server_requests"] = server.requests
+        results.append(result)
+        print(f"hedge {hedge_after:4.1f}s: {result['ok']} ok, {result['failed']} failed, "
+              f"{result['throughput']:6.1f} req/s, p50 {result['p50']:.3f}s p95 {result['p95']:.3f}s "
+              f"p99 {result['p99']:.3f}s max {result['max']:.3f}s | {result['client']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
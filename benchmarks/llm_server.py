@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Gemini REST API, so translation can be exercised end to
+end (HTTP, batching, concurrency, rate limiting, timeouts, retries, hedging)
+without an API key or quota.
+
+    python -m benchmarks.llm_server --port 8081 --latency 0.3 --jitter 0.2 --slow-rate 0.05 --error-rate 0.05
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8081 GOOGLE_API_KEY=stub python batch_dub.py ...
+
+It answers POST /v1beta/models/<model>:generateContent with a Gemini-shaped
+response whose text is benchmarks.stubs.fake_translation of the prompt.
+Latency, slow tail, injected 429/503 errors and 429 throttling above
+--max-concurrent requests in flight are set as in benchmarks/standin.py.
+"""
+
+import argparse
+import re
+import sys
+import time
+from http.server import ThreadingHTTPServer
+
+from benchmarks import standin
+from benchmarks.stubs import fake_translation
+
+_GENERATE_RE = re.compile(r"^/v1(?:beta)?/models/([^/:]+):generateContent")
+
+
+def generate_response(text: str) -> dict:
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text) // 4 + 1},
+    }
+
+
+class GeminiHandler(standin.StandInHandler):
+
+    def do_POST(self):
+        request = self.read_json()
+        if not _GENERATE_RE.match(self.path):
+            self.send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+            return
+        prompt = "\n".join(part.get("text", "") for content in request.get("contents", [])
+                           for part in content.get("parts", []))
+        with self.admit() as (delay, outcome):
+            time.sleep(delay)
+            if outcome in ("throttled", 429):
+                self.send_json(429, {"error": {"code": 429,
+                                               "message": "Resource has been exhausted (e.g. check quota).",
+                                               "status": "RESOURCE_EXHAUSTED"}})
+            elif outcome == 503:
+                self.send_json(503, {"error": {"code": 503, "message": "The model is overloaded.",
+                                               "status": "UNAVAILABLE"}})
+            else:
+                self.send_json(200, generate_response(fake_translation(prompt)))
+
+
+def make_server(port: int = 0, **behaviour) -> ThreadingHTTPServer:
+    """
+    behaviour: latency, jitter, distribution, slow_rate, slow_latency, error_rate,
+    max_concurrent, seed (see standin.make_server).
+    """
+    return standin.make_server(GeminiHandler, port, **behaviour)
+
+
+def running(port: int = 0, **behaviour):
+    """
+    Serve on a background thread for the duration of the block; yields the
+    server, whose URL is f"http://127.0.0.1:{server.server_port}".
+    """
+    return standin.running(make_server, port, **behaviour)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument("--port", type=int, default=8081)
+    standin.add_arguments(parser)
+    args = parser.parse_args(argv)
+    server = make_server(args.port, **standin.behaviour(args))
+    print(f"Gemini stand-in listening on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Offline benchmark of every dubbing stage on synthetic clips.
+
+    python -m benchmarks.run --lengths 10,60 --resolutions 360p,720p
+
+Each run appends one record per clip to the history file and prints the
+change against the previous record for the same clip, so regressions in
+frames/second and seconds per minute of video show up immediately.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+from benchmarks.stubs import stub_backends
+from utils.tracing import JobTrace, run_traced
+
+HISTORY_PATH = os.path.join("output", "benchmarks", "history.json")
+MEDIA_DIR = os.path.join("output", "bench_media")
+
+# Stages whose throughput is quoted in video frames per second.
+FRAME_STAGES = {"ocr", "render", "wav2lip_inference"}
+STAGES = ("transcribe", "translate", "tts", "ocr", "ocr_translate", "srt", "render", "wav2lip_inference")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def bench_clip(video_path: str, seconds: int, work_dir: str, stages) -> dict:
+    """
+    Dub one clip through the pipeline's stage graph, as the app and batch_dub do
+    (no artifact cache, no chunking), and return {stage: metrics} for the selected
+    stages from its trace. Stages overlap as in production, so a streaming
+    stage's wall time includes waiting for the stage it streams from.
+    wav2lip_inference also times the lip-sync model alone on the clip and its dubbed audio.
+    """
+    from utils import pipeline
+    from utils.lip_sync_worker import get_lip_sync_worker
+
+    frames = seconds * synthetic.FPS
+    trace = JobTrace(os.path.basename(work_dir), video=video_path)
+    dubbed = {}
+    try:
+        dubbed = pipeline.run_dubbing(video_path, work_dir, use_cache=False, trace=trace, resume=False,
+                                       chunk_seconds=0)
+    except pipeline.PipelineError as e:
+        print(f"  pipeline failed at {e.stage}: {e}")
+    records = {record["stage"]: record for record in trace.stages}
+    if "wav2lip_inference" in stages and dubbed.get("tts"):
+        syncer = get_lip_sync_worker().syncer
+        _, records["wav2lip_inference"] = run_traced("wav2lip_inference", syncer.process_video, video_path,
+                                                     dubbed["tts"], os.path.join(work_dir, "w2l.mp4"))
+
+    results = {}
+    for name, record in records.items():
+        if name not in stages:
+            continue
+        wall = record["wall_seconds"]
+        metrics = {
+            "wall_seconds": wall,
+            "cpu_seconds": record["cpu_seconds"],
+            "peak_rss_bytes": record["peak_rss_bytes"],
+            "seconds_per_minute": round(wall / (seconds / 60), 4),
+            "counts": record["counts"],
+            "error": record["error"],
+        }
+        if name in FRAME_STAGES:
+            metrics["fps"] = round(frames / wall, 2) if wall else None
+        results[name] = metrics
+    return results
+
+
+def load_history(path: str):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(previous: dict, current: dict):
+    """
+    Lines describing relative changes in seconds/minute and fps between two clip records.
+    """
+    lines = []
+    for stage, metrics in current["stages"].items():
+        before = previous["stages"].get(stage)
+        if not before:
+            continue
+        for key, lower_is_better in (("seconds_per_minute", True), ("fps", False)):
+            old, new = before.get(key), metrics.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = change > 0 if lower_is_better else change < 0
+            flag = "  <-- regression" if worse and abs(change) > 10 else ""
+            lines.append(f"  {stage:18s} {key:18s} {old:10.3f} -> {new:10.3f} ({change:+.1f}%){flag}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dubbing stages on synthetic clips (offline).")
+    parser.add_argument("--lengths", default="10,30", help="Clip lengths in seconds, comma separated")
+    parser.add_argument("--resolutions", default="360p,720p", help=f"Any of {', '.join(synthetic.RESOLUTIONS)}")
+    parser.add_argument("--audio", default="speech", choices=["speech", "tone"])
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="Stages to report, comma separated (the whole pipeline runs either way)")
+    parser.add_argument("--api-latency", type=float, default=0.0,
+                        help="Seconds of latency injected into the Gemini/ElevenLabs stubs")
+    parser.add_argument("--media-dir", default=MEDIA_DIR, help="Where generated clips are kept between runs")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON file results are appended to")
+    parser.add_argument("--label", default="", help="Free-form note stored with the run")
+    args = parser.parse_args(argv)
+
+    stages = set(args.stages.split(","))
+    history = load_history(args.history)
+    run_meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "label": args.label,
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+    }
+
+    with stub_backends(latency=args.api_latency):
+        for resolution in args.resolutions.split(","):
+            for seconds in (int(s) for s in args.lengths.split(",")):
+                cid = synthetic.clip_id(seconds, resolution, args.audio)
+                video = synthetic.make_clip(os.path.join(args.media_dir, f"{cid}.mp4"), seconds, resolution, args.audio)
+                print(f"== {cid}")
+                with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+                    record = dict(run_meta, clip=cid, seconds=seconds, resolution=resolution,
+                                  stages=bench_clip(video, seconds, work_dir, stages))
+                for stage, metrics in record["stages"].items():
+                    fps = f"{metrics['fps']:8.1f} fps" if metrics.get("fps") else " " * 12
+                    print(f"  {stage:18s} {metrics['wall_seconds']:8.2f}s {fps} "
+                          f"{metrics['seconds_per_minute']:8.2f} s/min{'  ERROR ' + metrics['error'] if metrics['error'] else ''}")
+                previous = next((r for r in reversed(history) if r["clip"] == cid), None)
+                if previous:
+                    print(f"  vs {previous['commit'] or '?'} ({previous['timestamp']}):")
+                    print("\n".join(compare(previous, record)) or "  no comparable stages")
+                history.append(record)
+
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    with open(args.history, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+    print(f"Results appended to {args.history}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
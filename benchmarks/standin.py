@@ -0,0 +1,153 @@
+"""
+Behaviour shared by the local API stand-ins (llm_server.py, tts_server.py):
+response latency drawn from a distribution with a slow tail, injected errors,
+and 429 throttling once too many requests are in flight.
+"""
+
+import contextlib
+import json
+import math
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISTRIBUTIONS = ("fixed", "exponential", "lognormal")
+
+
+def make_server(handler, port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                distribution: str = "exponential", slow_rate: float = 0.0, slow_latency: float = 10.0,
+                error_rate: float = 0.0, max_concurrent: int = 0, seed: int = 0) -> ThreadingHTTPServer:
+    """
+    Every response takes `latency` plus `jitter` drawn from `distribution`
+    ("fixed": exactly jitter, "exponential": mean jitter, "lognormal": median
+    jitter with sigma 1, i.e. a heavier tail); a `slow_rate` fraction takes
+    `slow_latency` instead. An `error_rate` fraction fails with a 429 or 503,
+    and with max_concurrent set, requests beyond that many in flight get a 429 at once.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution {distribution!r}; expected one of {DISTRIBUTIONS}")
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.distribution = distribution
+    server.slow_rate = slow_rate
+    server.slow_latency = slow_latency
+    server.error_rate = error_rate
+    server.max_concurrent = max_concurrent
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.errors = 0
+    server.throttled = 0
+    server.in_flight = 0
+    return server
+
+
+def _jitter(server) -> float:
+    if not server.jitter:
+        return 0.0
+    if server.distribution == "fixed":
+        return server.jitter
+    if server.distribution == "lognormal":
+        return server.random.lognormvariate(math.log(server.jitter), 1.0)
+    return server.random.expovariate(1 / server.jitter)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Base handler: admit() applies the server's behaviour to a request and says
+    how it should be answered; subclasses send the API-shaped bodies.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    @contextlib.contextmanager
+    def admit(self):
+        """
+        Count the request as in flight for the block and yield (delay, outcome):
+        the seconds to wait before answering and "ok", "throttled", 429 or 503.
+        """
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            throttled = server.max_concurrent and server.in_flight > server.max_concurrent
+            roll = server.random.random()
+            delay = server.latency + _jitter(server)
+            if server.random.random() < server.slow_rate:
+                delay = server.slow_latency
+            if throttled:
+                server.throttled += 1
+                outcome, delay = "throttled", 0.0
+            elif roll < server.error_rate:
+                server.errors += 1
+                outcome = 429 if roll < server.error_rate / 2 else 503
+            else:
+                outcome = "ok"
+        try:
+            yield delay, outcome
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def stats(server) -> dict:
+    with server.lock:
+        return {"requests": server.requests, "errors": server.errors, "throttled": server.throttled}
+
+
+@contextlib.contextmanager
+def running(make, port: int = 0, **behaviour):
+    """
+    Serve make(port, **behaviour) on a background thread for the duration of the
+    block; yields the server, whose URL is f"http://127.0.0.1:{server.server_port}".
+    """
+    server = make(port, **behaviour)
+    thread = threading.Thread(target=server.serve_forever, name="stand-in", daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def add_arguments(parser, prefix: str = "", latency: float = 0.0, jitter: float = 0.0):
+    """
+    Behaviour options (see make_server), optionally prefixed, e.g. "llm-" gives --llm-latency.
+    behaviour(args, prefix) reads them back.
+    """
+    parser.add_argument(f"--{prefix}latency", type=float, default=latency, help="Seconds added to every response")
+    parser.add_argument(f"--{prefix}jitter", type=float, default=jitter,
+                        help="Scale of the extra latency drawn from --distribution, seconds")
+    parser.add_argument(f"--{prefix}distribution", default="exponential", choices=DISTRIBUTIONS)
+    parser.add_argument(f"--{prefix}slow-rate", type=float, default=0.0,
+                        help="Fraction of responses that take --slow-latency")
+    parser.add_argument(f"--{prefix}slow-latency", type=float, default=10.0)
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0,
+                        help="Fraction of requests failing with 429/503")
+    parser.add_argument(f"--{prefix}max-concurrent", type=int, default=0,
+                        help="Requests in flight beyond this get a 429 (0: unlimited)")
+    parser.add_argument(f"--{prefix}seed", type=int, default=0)
+
+
+def behaviour(args, prefix: str = "") -> dict:
+    names = ("latency", "jitter", "distribution", "slow_rate", "slow_latency", "error_rate", "max_concurrent", "seed")
+    prefix = prefix.replace("-", "_")
+    return {name: getattr(args, prefix + name) for name in names}
@@ -0,0 +1,131 @@
+"""
+In-process stand-ins for Gemini and ElevenLabs, plugged in as the "stub"
+backends, so benchmarks measure our code, not the network. Latency can be
+injected to mimic the APIs. llm_server.py and tts_server.py serve the same
+over HTTP.
+"""
+
+import contextlib
+import re
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks.synthetic import synth_audio
+
+# Roughly the speaking rate of ElevenLabs' French voices.
+CHARS_PER_SECOND = 15
+TTS_SAMPLE_RATE = 22050
+
+
+def fake_translation(prompt: str) -> str:
+    """
+    "Translate" a prompt built by utils.translation: the text after the first line
+    comes back marked with [fr], numbered lines keeping their numbers.
+    """
+    text = prompt.split("\n", 1)[1] if "\n" in prompt else prompt
+    lines = [re.match(r"(\d+): (.*)", line) for line in text.splitlines()]
+    if lines and all(lines):
+        return "\n".join(f"{m.group(1)}: [fr] {m.group(2)}" for m in lines)
+    return f"[fr] {text}"
+
+
+class StubChatModel:
+    """
+    Minimal ChatGoogleGenerativeAI replacement: echoes the text to translate
+    back with a marker so downstream lengths stay realistic.
+    """
+
+    def __init__(self, model="", google_api_key="", latency=0.0, **kwargs):
+        self.model = model
+        self.latency = latency
+
+    def _reply(self, messages):
+        time.sleep(self.latency)
+        prompt = messages if isinstance(messages, str) else messages[-1].content
+        return SimpleNamespace(content=fake_translation(prompt))
+
+    def __call__(self, messages):
+        return self._reply(messages)
+
+    def invoke(self, messages):
+        return self._reply(messages)
+
+
+def mp3_for_text(text: str, sample_rate: int = TTS_SAMPLE_RATE) -> bytes:
+    """
+    Encode a speech-like signal as long as text would take to read, as mp3 bytes.
+    """
+    seconds = max(1.0, len(text) / CHARS_PER_SECOND)
+    pcm = (synth_audio(seconds, "speech", sr=sample_rate) * 32767).astype("<i2").tobytes()
+    proc = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3", "pipe:1"],
+        input=pcm, capture_output=True, check=True,
+    )
+    return proc.stdout
+
+
+class StubElevenLabs:
+    """
+    Minimal ElevenLabs client: one French voice and a convert() that streams mp3 chunks.
+    """
+
+    def __init__(self, api_key="", latency=0.0, chunk_size=4096, **kwargs):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        french = SimpleNamespace(language="fr")
+        self.voices = SimpleNamespace(get_all=self._get_all)
+        self.text_to_speech = SimpleNamespace(convert=self._convert)
+        self._voices = [
+            SimpleNamespace(name="Stub English", voice_id="stub-en", verified_languages=[SimpleNamespace(language="en")]),
+            SimpleNamespace(name="Stub French", voice_id="stub-fr", verified_languages=[french]),
+        ]
+
+    def _get_all(self):
+        time.sleep(self.latency)
+        return SimpleNamespace(voices=self._voices)
+
+    def _convert(self, text, voice_id, model_id="", output_format="", **kwargs):
+        time.sleep(self.latency)
+        audio = mp3_for_text(text)
+        for i in range(0, len(audio), self.chunk_size):
+            yield audio[i:i + self.chunk_size]
+
+
+@contextlib.contextmanager
+def stub_backends(latency: float = 0.0):
+    """
+    Route translation and TTS to the local stubs for the duration of the block.
+    """
+    from config import settings
+    from utils import translation, tts, voice_catalogue
+
+    saved = (settings.GOOGLE_API_KEY, settings.ELEVENLABS_API_KEY, settings.VOICE_CATALOGUE_DIR,
+             settings.TTS_CACHE_ENABLED, settings.TRANSLATION_MEMORY_ENABLED, settings.TRANSLATION_BACKEND,
+             settings.TTS_BACKEND)
+    # Keep the stub voices out of the real account's persisted catalogue, and stub
+    # replies and audio out of the translation memory and TTS cache; clips sharing
+    # a script would also hit them and skip translation and TTS.
+    settings.VOICE_CATALOGUE_DIR = tempfile.mkdtemp(prefix="stub-voices-")
+    settings.TTS_CACHE_ENABLED = False
+    settings.TRANSLATION_MEMORY_ENABLED = False
+    settings.GOOGLE_API_KEY = settings.GOOGLE_API_KEY or "stub"
+    settings.ELEVENLABS_API_KEY = settings.ELEVENLABS_API_KEY or "stub"
+    translation.LLM_BACKENDS["stub"] = lambda model: StubChatModel(model, latency=latency)
+    tts.TTS_BACKENDS["stub"] = lambda api_key: StubElevenLabs(api_key, latency=latency)
+    settings.TRANSLATION_BACKEND = settings.TTS_BACKEND = "stub"
+    # Pooled clients hold the chat model / SDK client they were built with.
+    translation._clients.clear()
+    tts._clients.clear()
+    voice_catalogue._catalogues.clear()
+    try:
+        yield
+    finally:
+        (settings.GOOGLE_API_KEY, settings.ELEVENLABS_API_KEY, settings.VOICE_CATALOGUE_DIR,
+         settings.TTS_CACHE_ENABLED, settings.TRANSLATION_MEMORY_ENABLED, settings.TRANSLATION_BACKEND,
+         settings.TTS_BACKEND) = saved
+        translation._clients.clear()
+        tts._clients.clear()
+        voice_catalogue._catalogues.clear()
@@ -0,0 +1,126 @@
+"""
+Synthetic benchmark clips: a cartoon talking head whose mouth follows the
+audio envelope, a burned-in lower-third caption for OCR, and either a pure
+tone or a speech-like signal (harmonic "voice" with syllable-rate envelope).
+Everything is generated locally with numpy, OpenCV and ffmpeg.
+"""
+
+import os
+import subprocess
+import wave
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    "360p": (640, 360),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+SAMPLE_RATE = 16000
+FPS = 25
+CAPTION = "BREAKING NEWS: Local team wins"
+
+
+def clip_id(seconds: int, resolution: str, audio: str) -> str:
+    return f"{resolution}_{seconds}s_{audio}"
+
+
+def synth_audio(seconds: float, kind: str = "speech", sr: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Mono float32 audio in [-1, 1].
+    kind="tone": 220 Hz sine. kind="speech": a wandering-pitch harmonic voice
+    gated into ~4 Hz syllables with pauses, loosely speech-shaped for Whisper/VAD.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    if kind == "tone":
+        return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t) + 10 * rng.standard_normal(len(t)).cumsum() / np.sqrt(sr)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    # Two seconds of speech, one of silence, like a sentence boundary.
+    sentences = ((t % 3.0) < 2.0).astype(np.float64)
+    noise = 0.01 * rng.standard_normal(len(t))
+    signal = 0.25 * voice * syllables * sentences / 2.6 + noise
+    return np.clip(signal, -1, 1).astype(np.float32)
+
+
+def _draw_frame(width, height, mouth_open, show_caption):
+    frame = np.full((height, width, 3), (60, 40, 30), dtype=np.uint8)
+    cx, cy = width // 2, height // 2 - height // 12
+    face_w, face_h = width // 8, height // 4
+    cv2.ellipse(frame, (cx, cy), (face_w, face_h), 0, 0, 360, (150, 180, 225), -1)
+    for dx in (-face_w // 2, face_w // 2):
+        cv2.circle(frame, (cx + dx, cy - face_h // 3), max(2, face_w // 10), (40, 40, 40), -1)
+    mouth_h = max(1, int(face_h // 5 * mouth_open))
+    cv2.ellipse(frame, (cx, cy + face_h // 2), (face_w // 3, mouth_h), 0, 0, 360, (40, 30, 120), -1)
+    if show_caption:
+        bar_top = height - height // 6
+        cv2.rectangle(frame, (0, bar_top), (width, height), (20, 20, 20), -1)
+        scale = height / 540
+        cv2.putText(frame, CAPTION, (width // 20, bar_top + height // 10), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (255, 255, 255), max(1, int(2 * scale)), cv2.LINE_AA)
+    return frame
+
+
+def make_clip(path: str, seconds: int, resolution: str = "720p", audio: str = "speech", seed: int = 0) -> str:
+    """
+    Render a clip to path (H.264 + AAC mp4) unless it already exists. Returns path.
+    The caption is shown for the middle third of the clip. The clip is rendered
+    under a temporary name and moved into place when complete, so an interrupted
+    run never leaves a truncated clip at path.
+    """
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    width, height = RESOLUTIONS[resolution]
+    samples = synth_audio(seconds, audio, seed=seed)
+
+    root, ext = os.path.splitext(path)
+    partial = f"{root}.{os.getpid()}.partial{ext}"
+    wav_path = partial + ".wav"
+    pcm = (samples * 32767).astype("<i2").tobytes()
+    _write_wav(wav_path, pcm, SAMPLE_RATE)
+
+    samples_per_frame = SAMPLE_RATE // FPS
+    envelope = np.abs(samples[: len(samples) // samples_per_frame * samples_per_frame])
+    envelope = envelope.reshape(-1, samples_per_frame).mean(axis=1)
+    envelope = envelope / (envelope.max() or 1.0)
+
+    command = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(FPS), "-i", "pipe:0",
+        "-i", wav_path,
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", partial,
+    ]
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        try:
+            for i in range(seconds * FPS):
+                t = i / FPS
+                show_caption = seconds / 3 <= t < 2 * seconds / 3
+                proc.stdin.write(_draw_frame(width, height, envelope[min(i, len(envelope) - 1)],
+                                             show_caption).tobytes())
+        finally:
+            proc.stdin.close()
+            proc.wait()
+            os.remove(wav_path)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed rendering {path}")
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
+
+
+def _write_wav(path, pcm: bytes, sr: int):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm)
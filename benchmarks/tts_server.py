@@ -0,0 +1,137 @@
+"""
+Local stand-in for the ElevenLabs REST API, so TTS can be exercised end to end
+(HTTP, streamed audio, concurrency, throttling, retries) without an API key or
+character quota.
+
+    python -m benchmarks.tts_server --port 8082 --latency 0.4 --jitter 0.2 --max-concurrent 4 --chunk-size 4096
+    TTS_BACKEND=elevenlabs-rest ELEVENLABS_API_URL=http://127.0.0.1:8082 ELEVENLABS_API_KEY=stub python batch_dub.py ...
+
+It answers GET /v1/voices with one English and one French voice, and
+POST /v1/text-to-speech/<voice_id>[/stream] with an mp3 as long as the text
+would take to read (benchmarks.stubs.mp3_for_text), sent with chunked transfer
+encoding in --chunk-size pieces --chunk-interval seconds apart after the
+response latency (time to first byte). Latency, slow tail, injected 429/503
+errors and 429 throttling above --max-concurrent requests in flight (as
+ElevenLabs limits concurrent requests per plan) are set as in benchmarks/standin.py.
+"""
+
+import argparse
+import re
+import sys
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import standin
+from benchmarks.stubs import mp3_for_text
+
+_TTS_RE = re.compile(r"^/v1/text-to-speech/([^/?]+)(/stream)?$")
+_FORMAT_RE = re.compile(r"^mp3_(\d+)_\d+$")
+
+VOICES = [
+    {"voice_id": "standin-en", "name": "Stand-in English", "verified_languages": [{"language": "en"}]},
+    {"voice_id": "standin-fr", "name": "Stand-in French", "verified_languages": [{"language": "fr"}]},
+]
+
+
+class ElevenLabsHandler(standin.StandInHandler):
+
+    def _error(self, status: int, code: str, message: str):
+        self.send_json(status, {"detail": {"status": code, "message": message}})
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/v1/voices":
+            self._error(404, "not_found", f"Unknown path {self.path}")
+            return
+        with self.admit() as (delay, outcome):
+            time.sleep(delay)
+            self.send_json(200, {"voices": VOICES})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        match = _TTS_RE.match(url.path)
+        request = self.read_json()
+        if not match:
+            self._error(404, "not_found", f"Unknown path {self.path}")
+            return
+        if match.group(1) not in {v["voice_id"] for v in VOICES}:
+            self._error(404, "voice_not_found", f"A voice with voice_id {match.group(1)} was not found.")
+            return
+        output_format = parse_qs(url.query).get("output_format", ["mp3_44100_128"])[0]
+        rate = _FORMAT_RE.match(output_format)
+        if not rate:
+            self._error(422, "invalid_output_format", f"Only mp3 formats are served, not {output_format}")
+            return
+        with self.admit() as (delay, outcome):
+            if outcome == "throttled":
+                self._error(429, "too_many_concurrent_requests",
+                            "Too many concurrent requests for your subscription.")
+                return
+            time.sleep(delay)
+            if outcome == 429:
+                self._error(429, "system_busy", "Our services are experiencing high levels of traffic.")
+                return
+            if outcome == 503:
+                self._error(503, "service_unavailable", "The service is temporarily unavailable.")
+                return
+            audio = mp3_for_text(request.get("text", ""), int(rate.group(1)))
+            with self.server.lock:
+                self.server.characters += len(request.get("text", ""))
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            size = self.server.chunk_size
+            for i in range(0, len(audio), size):
+                if i:
+                    time.sleep(self.server.chunk_interval)
+                chunk = audio[i:i + size]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(port: int = 0, chunk_size: int = 4096, chunk_interval: float = 0.0,
+                **behaviour) -> ThreadingHTTPServer:
+    """
+    chunk_size / chunk_interval: bytes per streamed audio chunk and seconds between chunks.
+    behaviour: latency, jitter, distribution, slow_rate, slow_latency, error_rate,
+    max_concurrent, seed (see standin.make_server).
+    """
+    server = standin.make_server(ElevenLabsHandler, port, **behaviour)
+    server.chunk_size = chunk_size
+    server.chunk_interval = chunk_interval
+    server.characters = 0
+    return server
+
+
+def running(port: int = 0, **behaviour):
+    """
+    Serve on a background thread for the duration of the block; yields the
+    server, whose URL is f"http://127.0.0.1:{server.server_port}".
+    """
+    return standin.running(make_server, port, **behaviour)
+
+
+def add_stream_arguments(parser, prefix: str = ""):
+    parser.add_argument(f"--{prefix}chunk-size", type=int, default=4096, help="Bytes per streamed audio chunk")
+    parser.add_argument(f"--{prefix}chunk-interval", type=float, default=0.0, help="Seconds between audio chunks")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the ElevenLabs text-to-speech API.")
+    parser.add_argument("--port", type=int, default=8082)
+    standin.add_arguments(parser)
+    add_stream_arguments(parser)
+    args = parser.parse_args(argv)
+    server = make_server(args.port, args.chunk_size, args.chunk_interval, **standin.behaviour(args))
+    print(f"ElevenLabs stand-in listening on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
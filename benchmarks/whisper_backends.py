@@ -0,0 +1,118 @@
+"""
+Speed and accuracy of the Whisper inference backends on synthetic clips.
+
+    python -m benchmarks.whisper_backends --models base,small --backends torch,int8,int8-torchscript
+
+For every model and backend this reports the load time, the real-time factor
+(transcription wall time / audio duration, lower is faster) and the word error
+rate against the fp32 "torch" backend of the same model. When a clip has a
+reference transcript next to it (<clip>.txt) the WER is taken against that
+instead. Compare a bigger int8 model's RTF with the smaller fp32 one to see
+whether it fits the same latency budget.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from benchmarks import synthetic
+from benchmarks.run import MEDIA_DIR
+from utils import media
+from utils.model_registry import get_whisper_registry, warmup_whisper
+from utils.transcription import iter_segments, join_segments
+from utils.whisper_backends import BACKENDS
+
+
+def _words(text: str):
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level Levenshtein distance divided by the reference length.
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def bench_backend(model: str, backend: str, clips, vad: bool) -> dict:
+    """
+    Load one model/backend and transcribe every clip. Returns load time and per-clip results.
+    """
+    registry = get_whisper_registry()
+    started = time.perf_counter()
+    registry.preload(model, backend=backend, warmup=warmup_whisper)
+    load_seconds = time.perf_counter() - started
+    results = {}
+    for cid, (path, audio) in clips.items():
+        started = time.perf_counter()
+        text = join_segments(iter_segments(path, model, audio=audio, use_vad=vad, backend=backend))
+        wall = time.perf_counter() - started
+        results[cid] = {"wall_seconds": round(wall, 3),
+                        "rtf": round(wall / (len(audio) / media.WHISPER_SAMPLE_RATE), 4),
+                        "text": text}
+    size = sum(v for k, v in registry.stats()["models"].items() if k.startswith(f"{model}/{backend}@"))
+    return {"load_seconds": round(load_seconds, 2), "model_bytes": size, "clips": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Whisper backends: real-time factor and WER (offline).")
+    parser.add_argument("--models", default="base", help="Whisper model sizes, comma separated")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"Any of {', '.join(BACKENDS)}")
+    parser.add_argument("--lengths", default="10,30", help="Clip lengths in seconds, comma separated")
+    parser.add_argument("--resolutions", default="360p", help=f"Any of {', '.join(synthetic.RESOLUTIONS)}")
+    parser.add_argument("--audio", default="speech", choices=["speech", "tone"])
+    parser.add_argument("--no-vad", action="store_true", help="Transcribe the whole soundtrack instead of VAD chunks")
+    parser.add_argument("--media-dir", default=MEDIA_DIR, help="Where generated clips are kept between runs")
+    parser.add_argument("--json", default="", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(",")
+    # The fp32 model is the baseline every other backend is scored against.
+    if "torch" not in backends:
+        backends.insert(0, "torch")
+    clips = {}
+    for resolution in args.resolutions.split(","):
+        for seconds in (int(s) for s in args.lengths.split(",")):
+            cid = synthetic.clip_id(seconds, resolution, args.audio)
+            path = synthetic.make_clip(os.path.join(args.media_dir, f"{cid}.mp4"), seconds, resolution, args.audio)
+            clips[cid] = (path, media.load_audio(path))
+
+    report = {}
+    for model in args.models.split(","):
+        report[model] = {backend: bench_backend(model, backend, clips, not args.no_vad) for backend in backends}
+        baseline = report[model]["torch"]["clips"]
+        print(f"== whisper {model}")
+        print(f"  {'backend':18s} {'load':>8s} {'MB':>7s} {'clip':>16s} {'RTF':>8s} {'WER':>7s}")
+        for backend, result in report[model].items():
+            for cid, clip in result["clips"].items():
+                reference_path = os.path.splitext(clips[cid][0])[0] + ".txt"
+                if os.path.exists(reference_path):
+                    with open(reference_path, encoding="utf-8") as f:
+                        reference = f.read()
+                else:
+                    reference = baseline[cid]["text"]
+                clip["wer"] = round(word_error_rate(reference, clip["text"]), 4)
+                print(f"  {backend:18s} {result['load_seconds']:7.1f}s {result['model_bytes'] / 2 ** 20:7.0f} "
+                      f"{cid:>16s} {clip['rtf']:8.3f} {clip['wer']:7.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
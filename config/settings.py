@@ -11,3 +11,68 @@ GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
 
 # Add more config variables as needed
+
+# Pipeline
+OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'output')
+PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', '4'))
+PIPELINE_CPU_EXECUTOR = os.getenv('PIPELINE_CPU_EXECUTOR', 'thread')  # 'thread' or 'process'
+
+# Model / stage parameters (part of every artifact cache key)
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'torch')  # torch | int8 | torchscript | int8-torchscript (CPU)
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', '')  # empty: cuda if available, else cpu
+WHISPER_PRELOAD = os.getenv('WHISPER_PRELOAD', '1') == '1'  # load WHISPER_MODEL at startup
+WHISPER_VAD = os.getenv('WHISPER_VAD', '1') == '1'  # transcribe only detected speech, in batches
+WHISPER_BATCH_SIZE = int(os.getenv('WHISPER_BATCH_SIZE', '8'))  # 30 s windows per batched decode
+WHISPER_CACHE_MAX_BYTES = int(os.getenv('WHISPER_CACHE_MAX_BYTES', str(4 * 1024 ** 3)))  # loaded models, LRU
+TRANSLATION_MODEL = os.getenv('TRANSLATION_MODEL', 'gemini-1.5-flash')
+TRANSLATION_MIN_CHARS = int(os.getenv('TRANSLATION_MIN_CHARS', '200'))  # batches end on a sentence past this
+TRANSLATION_BATCH_TOKENS = int(os.getenv('TRANSLATION_BATCH_TOKENS', '1500'))  # most source tokens per translation request
+TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', '4'))  # translation requests in flight per job
+TRANSLATION_REQUESTS_PER_MINUTE = float(os.getenv('TRANSLATION_REQUESTS_PER_MINUTE', '0'))  # per process, 0: no limit
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', '30'))  # seconds per request attempt
+TRANSLATION_RETRIES = int(os.getenv('TRANSLATION_RETRIES', '3'))  # retries on timeouts, 429s and 5xx
+TRANSLATION_BACKOFF = float(os.getenv('TRANSLATION_BACKOFF', '1.0'))  # first retry delay, doubled per retry
+TRANSLATION_HEDGE_SECONDS = float(os.getenv('TRANSLATION_HEDGE_SECONDS', '0'))  # duplicate slow requests after this, 0: off
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', '')  # e.g. http://127.0.0.1:8081 for the local stand-in
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'gemini')  # gemini (LangChain) or gemini-rest (plain HTTP)
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'elevenlabs')  # elevenlabs (SDK) or elevenlabs-rest (plain HTTP)
+ELEVENLABS_API_URL = os.getenv('ELEVENLABS_API_URL', '')  # e.g. http://127.0.0.1:8082 for the local stand-in
+ELEVENLABS_VOICE_ID = os.getenv('ELEVENLABS_VOICE_ID', '')  # empty: first French-capable voice
+TTS_MIN_CHARS = int(os.getenv('TTS_MIN_CHARS', '0'))  # clips end on a sentence past this, 0: one per sentence
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '4'))  # ElevenLabs requests in flight per job
+TTS_MAX_SPEEDUP = float(os.getenv('TTS_MAX_SPEEDUP', '1.3'))  # most a clip is sped up to fit its slot
+OCR_FRAME_INTERVAL = float(os.getenv('OCR_FRAME_INTERVAL', '1.0'))
+
+# Artifact cache
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', '1') == '1'
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(OUTPUT_DIR, '.cache'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(20 * 1024 ** 3)))
+VOICE_CATALOGUE_DIR = os.getenv('VOICE_CATALOGUE_DIR', CACHE_DIR)  # ElevenLabs voice list, one file per API key
+VOICE_CATALOGUE_TTL = float(os.getenv('VOICE_CATALOGUE_TTL', str(24 * 3600)))  # seconds before a background refresh
+
+# TTS audio cache (synthesized clips by text, voice, model and output format)
+TTS_CACHE_ENABLED = os.getenv('TTS_CACHE_ENABLED', '1') == '1'
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(CACHE_DIR, 'tts'))
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+# Translation memory (past translations by source text, language and model)
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', '1') == '1'
+TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', os.path.join(CACHE_DIR, 'translation_memory.sqlite3'))
+TRANSLATION_MEMORY_MAX_BYTES = int(os.getenv('TRANSLATION_MEMORY_MAX_BYTES', str(256 * 1024 ** 2)))
+
+# Final render (single encode of lip-synced frames + dubbed audio + subtitles)
+RENDER_PRESET = os.getenv('RENDER_PRESET', 'veryfast')
+RENDER_CRF = int(os.getenv('RENDER_CRF', '20'))
+LIP_SYNC_WORKERS = int(os.getenv('LIP_SYNC_WORKERS', '2'))  # submitted lip-sync jobs at once per process (pipeline renders run on the stage's thread)
+LIP_SYNC_PRELOAD = os.getenv('LIP_SYNC_PRELOAD', '1') == '1'  # build the lip-syncer at startup
+
+# Chunked dubbing of long videos (split at pauses / scene cuts, one process per chunk)
+CHUNK_SECONDS = float(os.getenv('CHUNK_SECONDS', '0'))  # 0 disables chunking
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', '0'))  # 0: one per core
+
+# Media server for the app's video previews and downloads (streamed from disk, see utils/media_server.py)
+MEDIA_SERVER_HOST = os.getenv('MEDIA_SERVER_HOST', '127.0.0.1')  # 0.0.0.0 to serve browsers on other machines
+MEDIA_SERVER_PORT = int(os.getenv('MEDIA_SERVER_PORT', '8502'))
+MEDIA_SERVER_URL = os.getenv('MEDIA_SERVER_URL', '')  # URL the browser reaches it at; empty: the app page's host on MEDIA_SERVER_PORT
+MEDIA_URL_TTL = float(os.getenv('MEDIA_URL_TTL', str(24 * 3600)))  # seconds a published video stays available
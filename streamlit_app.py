@@ -1,93 +1,155 @@
 import streamlit as st
 import os
 import uuid
-from utils import transcription, translation, tts, lip_sync, ocr, subtitles
+from utils import pipeline
+from utils.cache import get_cache
+from utils.manifest import find_unfinished
+from utils.media_server import get_media_server, save_upload, url_for_page
+from utils.lip_sync_worker import preload_lip_sync
+from utils.model_registry import preload_whisper
+from utils.tracing import JobTrace
 from ai_dubber_app.config import settings
 
+
+def media_url(path, session_id, name, download=False):
+    """
+    Publish path on the media server at the address this page was loaded from
+    (its scheme and host, the media server's port), unless MEDIA_SERVER_URL is set.
+    """
+    headers = st.context.headers
+    page = headers.get("Origin") or f"http://{headers.get('Host', '')}"
+    server = get_media_server()
+    base_url = url_for_page(page, server.port, st.get_option("server.port"))
+    return server.publish(path, session_id, name, download=download, base_url=base_url)
+
+
+def show_video(url):
+    st.markdown(f'<video src="{url}" controls preload="metadata" style="width: 100%"></video>',
+                unsafe_allow_html=True)
+
+
+def browser_owner():
+    """
+    Id the jobs started in this browser are recorded under. It is kept in the URL,
+    so a reload or a restarted server still lists them, and nobody else's.
+    """
+    owner = st.query_params.get("owner")
+    if not owner:
+        owner = uuid.uuid4().hex
+        st.query_params["owner"] = owner
+    return owner
+
+
+def start_job(session_id):
+    """
+    Stop serving the previous job's videos in this browser session; the rest
+    expire after MEDIA_URL_TTL.
+    """
+    previous = st.session_state.get("media_session")
+    if previous and previous != session_id:
+        get_media_server().unpublish(previous)
+    st.session_state["media_session"] = session_id
+
+
+def dub(session_id, session_dir, input_video_path):
+    """
+    Run (or resume) the dubbing job in session_dir and show its result.
+    """
+    # 2-8. Transcription -> translation -> TTS -> lip sync, with OCR -> subtitles
+    # running alongside; the branches join in the final single-pass render.
+    status = st.empty()
+
+    def on_stage_start(stage):
+        status.info(f"⏳ {stage.label}...")
+
+    progress = {}
+
+    def on_stage_progress(stage, items):
+        unit = {"transcribe": "segments", "translate": "segments", "tts": "audio blocks",
+                "render": "frames", "chunks": "done"}.get(stage.name, "items")
+        progress[stage.label] = f"{items} {unit}"
+        status.info("⏳ " + ", ".join(f"{label}: {done}" for label, done in progress.items()))
+
+    def on_stage_complete(stage, result):
+        if stage.name == "ocr":
+            st.success(f"✅ OCR complete! Detected {len(result)} text frames.")
+        elif stage.name == "srt" and not result:
+            st.warning("⚠️ No English text detected for subtitles. Returning dubbed video without subtitles.")
+        else:
+            st.success(f"✅ {stage.label} complete!")
+
+    trace = JobTrace(session_id, video=os.path.basename(input_video_path))
+    with st.spinner("Dubbing video..."):
+        try:
+            results = pipeline.run_dubbing(input_video_path, session_dir, owner=browser_owner(),
+                                           on_stage_start=on_stage_start,
+                                           on_stage_complete=on_stage_complete,
+                                           on_stage_progress=on_stage_progress,
+                                           trace=trace)
+        except pipeline.PipelineError as e:
+            status.empty()
+            st.error(f"❌ {e}")
+            if e.stage != "manifest":
+                st.info("Completed stages are saved; use Resume in the sidebar to continue this job.")
+            st.stop()
+    status.empty()
+    final_video_path = results["render"]
+    cache = get_cache()
+    if cache is not None:
+        st.caption(f"Artifact cache: {cache.hits} hits, {cache.misses} misses")
+    with st.expander("Stage timings"):
+        st.table([{"stage": r["stage"], "wall (s)": r["wall_seconds"], "cpu (s)": r["cpu_seconds"],
+                   "peak RSS (MB)": round(r["peak_rss_bytes"] / 2 ** 20, 1), "cached": r["cached"]}
+                  for r in trace.to_dict()["stages"]])
+
+    # 9. Display final video
+    show_video(media_url(final_video_path, session_id, "dubbed_french.mp4"))
+    download_url = media_url(final_video_path, session_id, "dubbed_french.mp4", download=True)
+    st.markdown(f'<a href="{download_url}">⬇️ Download French-dubbed video</a>', unsafe_allow_html=True)
+
+
 st.set_page_config(page_title="AI Video Dubber", layout="centered")
+# Load Whisper and build the lip-syncer in the background while the user picks a file; no-ops once they are loaded.
+preload_whisper()
+preload_lip_sync()
 st.title("🎬 AI Video Dubber: English → French")
 
+# This browser's jobs interrupted by a crash, restart or failed stage can be picked
+# up after their last completed stage; jobs still running elsewhere aren't listed.
+resume_job = None
+unfinished = [m for m in find_unfinished(settings.OUTPUT_DIR, owner=browser_owner())
+              if os.path.exists(m.data["video_path"])]
+if unfinished:
+    st.sidebar.header("Unfinished jobs")
+    for manifest in unfinished:
+        done = [name for name, entry in manifest.data["stages"].items() if entry.get("status") == "done"]
+        st.sidebar.write(f"**{os.path.basename(manifest.data['video_path'])}** — {manifest.status}, "
+                         f"{len(done)} stages done")
+        if manifest.data.get("error"):
+            st.sidebar.caption(manifest.data["error"])
+        if st.sidebar.button("Resume", key=f"resume-{os.path.basename(manifest.session_dir)}"):
+            resume_job = manifest
+
+if resume_job is not None:
+    session_id = os.path.basename(os.path.normpath(resume_job.session_dir))
+    st.info(f"Resuming {os.path.basename(resume_job.data['video_path'])}")
+    start_job(session_id)
+    dub(session_id, resume_job.session_dir, resume_job.data["video_path"])
+    st.stop()
+
 uploaded_file = st.file_uploader("Upload an English video (MP4)", type=["mp4"])
 
 if uploaded_file:
     # 1. Save uploaded file
     session_id = str(uuid.uuid4())
-    session_dir = f"output/{session_id}"
+    session_dir = os.path.join(settings.OUTPUT_DIR, session_id)
     os.makedirs(session_dir, exist_ok=True)
 
     input_video_path = os.path.join(session_dir, uploaded_file.name)
-    with open(input_video_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    save_upload(uploaded_file, input_video_path)
 
-    st.video(input_video_path)
+    start_job(session_id)
+    show_video(media_url(input_video_path, session_id, "input.mp4"))
     st.success(f"Video saved to {input_video_path}")
 
-    # 2. Transcription
-    with st.spinner("Transcribing audio..."):
-        transcript, segments = transcription.transcribe_audio(input_video_path)
-    if not transcript:
-        st.error("❌ Transcription failed!")
-        st.stop()
-    st.success("✅ Transcription complete!")
-
-    # 3. Translation
-    with st.spinner("Translating to French..."):
-        french_text = translation.translate_text(transcript)
-    if not french_text:
-        st.error("❌ Translation failed!")
-        st.stop()
-    st.success("✅ Translation complete!")
-
-    # 4. TTS
-    tts_audio_path = os.path.join(session_dir, "tts_audio.wav")
-    with st.spinner("Generating French TTS..."):
-        tts_audio_path = tts.text_to_speech(french_text, tts_audio_path)
-    if not os.path.exists(tts_audio_path):
-        st.error("❌ TTS generation failed!")
-        st.stop()
-    st.success("✅ TTS audio generated!")
-
-    # 5. Lip Sync
-    synced_video_path = os.path.join(session_dir, "synced_video.mp4")
-    with st.spinner("Lip-syncing video..."):
-        synced_video_path = lip_sync.lip_sync_video(input_video_path, tts_audio_path, synced_video_path)
-    if not os.path.exists(synced_video_path):
-        st.error("❌ Lip-sync failed!")
-        st.stop()
-    st.success("✅ Lip-sync complete!")
-
-    # 6. OCR
-    with st.spinner("Detecting English text in video frames..."):
-        ocr_results = ocr.detect_english_text_frames(input_video_path)
-    st.success(f"✅ OCR complete! Detected {len(ocr_results)} text frames.")
-
-    # 7. Generate subtitles
-    if ocr_results:
-        subtitle_items = [(frame_idx, frame_idx+1, text) for frame_idx, text in ocr_results]
-        srt_path = os.path.join(session_dir, "subtitles.srt")
-        with st.spinner("Generating subtitles..."):
-            srt_path = subtitles.generate_srt(subtitle_items, srt_path)
-        if not os.path.exists(srt_path):
-            st.error("❌ Subtitle generation failed!")
-            st.stop()
-        st.success("✅ Subtitles generated!")
-
-        # 8. Burn subtitles
-        final_video_path = os.path.join(session_dir, "final_video.mp4")
-        with st.spinner("Burning subtitles into video..."):
-            final_video_path = subtitles.burn_subtitles(synced_video_path, srt_path, final_video_path)
-        if not os.path.exists(final_video_path):
-            st.error("❌ Burning subtitles failed!")
-            st.stop()
-        st.success("✅ Final video ready with subtitles!")
-    else:
-        final_video_path = synced_video_path
-        st.warning("⚠️ No English text detected for subtitles. Returning dubbed video without subtitles.")
-
-    # 9. Display final video
-    st.video(final_video_path)
-    st.download_button(
-        "Download French-dubbed video",
-        data=open(final_video_path, "rb").read(),
-        file_name="dubbed_french.mp4"
-    )
+    dub(session_id, session_dir, input_video_path)
@@ -0,0 +1,49 @@
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Tests import the app's packages (config, utils, Wav2Lip) from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from utils import translation  # noqa: E402
+
+
+class EchoChatModel:
+    """
+    Chat model that "translates" by marking the text with [fr], keeping
+    numbered lines numbered, like the benchmark stub. reply overrides the answer.
+    """
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if self.reply is not None:
+            return SimpleNamespace(content=self.reply(prompt))
+        text = prompt.split("\n", 1)[1]
+        lines = [re.match(r"(\d+): (.*)", line) for line in text.splitlines()]
+        if lines and all(lines):
+            return SimpleNamespace(content="\n".join(f"{m.group(1)}: [fr] {m.group(2)}" for m in lines))
+        return SimpleNamespace(content=f"[fr] {text}")
+
+
+@pytest.fixture
+def echo_llm(monkeypatch):
+    """
+    Route translation to an EchoChatModel (returned), without the translation memory.
+    """
+    model = EchoChatModel()
+    monkeypatch.setitem(translation.LLM_BACKENDS, "echo", lambda name: model)
+    monkeypatch.setattr(settings, "TRANSLATION_BACKEND", "echo")
+    monkeypatch.setattr(settings, "GOOGLE_API_KEY", "test")
+    monkeypatch.setattr(settings, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(settings, "TRANSLATION_RETRIES", 0)
+    translation._clients.clear()
+    yield model
+    translation._clients.clear()
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+import batch_dub
+
+
+def test_session_dirs_follow_the_video_not_its_place_in_the_list(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    name = batch_dub.session_name("videos/talk.mp4")
+    assert name.startswith("talk-")
+    assert batch_dub.session_name(os.path.join(str(tmp_path), "videos", "talk.mp4")) == name
+    assert batch_dub.session_name("other/talk.mp4") != name
+
+
+def test_negative_jobs_is_rejected_on_its_own(capsys):
+    with pytest.raises(SystemExit) as e:
+        batch_dub.main(["videos", "--jobs", "-1"])
+    assert e.value.code == 2
+    assert "--jobs must be at least 1" in capsys.readouterr().err
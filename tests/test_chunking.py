@@ -0,0 +1,45 @@
+import pytest
+
+from utils import chunking
+
+
+@pytest.fixture
+def boundaries(monkeypatch):
+    """
+    Pauses and scene cuts plan_chunks will find; cut_scans counts scene detections.
+    """
+    found = {"pauses": [], "cuts": [], "cut_scans": 0}
+
+    def cuts(path):
+        found["cut_scans"] += 1
+        return found["cuts"]
+
+    monkeypatch.setattr(chunking, "detect_silences", lambda path: found["pauses"])
+    monkeypatch.setattr(chunking, "detect_scene_cuts", cuts)
+    return found
+
+
+def test_short_video_is_one_chunk(boundaries):
+    assert chunking.plan_chunks("in.mp4", 140.0, 25.0, 100.0) == [(0.0, None)]
+
+
+def test_boundaries_move_to_pauses_then_scene_cuts(boundaries):
+    boundaries["pauses"] = [(98.0, 98.8), (130.0, 131.0)]
+    boundaries["cuts"] = [207.0]
+    chunks = chunking.plan_chunks("in.mp4", 380.0, 25.0, 100.0)
+    # 100 -> the pause at 98.4, 200 -> the cut at 207, 300 has neither within 25 s.
+    assert chunks == [(0.0, 98.4), (98.4, 207.0), (207.0, 300.0), (300.0, None)]
+    assert boundaries["cut_scans"] == 1
+
+
+def test_scene_cuts_are_only_scanned_when_needed(boundaries):
+    boundaries["pauses"] = [(99.0, 101.0)]
+    assert chunking.plan_chunks("in.mp4", 200.0, 25.0, 100.0) == [(0.0, 100.0), (100.0, None)]
+    assert boundaries["cut_scans"] == 0
+
+
+def test_short_tail_is_folded_and_boundaries_land_on_frames(boundaries):
+    boundaries["pauses"] = [(100.0, 100.03)]
+    chunks = chunking.plan_chunks("in.mp4", 230.0, 25.0, 100.0)
+    # 200 would leave a 30 s tail; 100.015 rounds to frame 2500 at 25 fps.
+    assert chunks == [(0.0, 100.0), (100.0, None)]
@@ -0,0 +1,31 @@
+from utils.manifest import JobManifest, find_unfinished
+
+
+def _job(output_dir, name, owner, status="running"):
+    manifest = JobManifest(str(output_dir / name), f"{name}.mp4", owner)
+    manifest.data["status"] = status
+    manifest.mark_running("tts", "key")
+    return manifest
+
+
+def test_unfinished_jobs_are_listed_per_owner(tmp_path):
+    _job(tmp_path, "mine", "alice")
+    _job(tmp_path, "theirs", "bob")
+    _job(tmp_path, "finished", "alice", status="done")
+    assert [m.data["video_path"] for m in find_unfinished(str(tmp_path), owner="alice")] == ["mine.mp4"]
+    assert len(find_unfinished(str(tmp_path))) == 2
+
+
+def test_running_jobs_cant_be_resumed_until_released(tmp_path):
+    running = _job(tmp_path, "job", "alice")
+    assert running.claim()
+    assert find_unfinished(str(tmp_path)) == []
+    resumed = JobManifest.load(running.session_dir)
+    assert resumed.in_use()
+    assert not resumed.claim()
+
+    running.release()
+    assert [m.session_dir for m in find_unfinished(str(tmp_path), owner="alice")] == [running.session_dir]
+    assert resumed.claim()
+    assert resumed.owner == "alice"
+    resumed.release()
@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+from utils import media
+
+
+def test_blocks_read_back_while_the_wav_is_written_and_after_it_moves(tmp_path):
+    path, moved = str(tmp_path / "dubbed.wav"), str(tmp_path / "final.wav")
+    blocks = [np.linspace(-0.5, 0.5, n, dtype=np.float32) for n in (300, 1, 700)]
+    descriptors = []
+    reader = media.read_pcm_blocks(iter(descriptors))
+    with media.open_wav(path, 22050) as wav:
+        offset = 0
+        for i, block in enumerate(blocks):
+            media.write_pcm(wav, block)
+            descriptors.append({"path": path, "offset": offset, "frames": len(block)})
+            offset += len(block)
+            # Readable as soon as it's written, header sizes not final yet.
+            np.testing.assert_allclose(next(reader), block, atol=1e-4)
+            if i == 0:
+                # The reader keeps the file it opened (e.g. across manifest promotion).
+                os.replace(path, moved)
+    reader.close()
+
+    samples = np.concatenate(list(media.read_pcm_blocks(
+        {"path": moved, "offset": offset, "frames": 100} for offset in range(0, 1000, 100))))
+    np.testing.assert_allclose(samples, np.concatenate(blocks)[:1000], atol=1e-4)
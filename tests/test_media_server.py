@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils import media_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def server():
+    server = media_server.MediaServer(port=0)
+    yield server
+    server.close()
+
+
+def test_serves_ranges_with_the_right_type(tmp_path, server):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(256)) * 4)
+    url = server.publish(str(path), "session", "dubbed french.mp4")
+
+    with urllib.request.urlopen(url) as response:
+        assert response.headers["Content-Type"] == "video/mp4"
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.read() == path.read_bytes()
+
+    request = urllib.request.Request(url, headers={"Range": "bytes=10-19"})
+    with urllib.request.urlopen(request) as response:
+        assert response.status == 206
+        assert response.headers["Content-Range"] == "bytes 10-19/1024"
+        assert response.read() == bytes(range(10, 20))
+
+    request = urllib.request.Request(url, headers={"Range": "bytes=-4"})
+    with urllib.request.urlopen(request) as response:
+        assert response.read() == bytes(range(252, 256))
+
+    with urllib.request.urlopen(server.publish(str(path), "session", "dubbed french.mp4", download=True)) as response:
+        assert response.headers["Content-Disposition"] == "attachment; filename*=UTF-8''dubbed%20french.mp4"
+
+
+def test_unpublished_and_expired_files_are_gone(tmp_path, server):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"0" * 10)
+    kept = server.publish(str(path), "other", "input.mp4")
+    url = server.publish(str(path), "session", "input.mp4")
+    assert server.unpublish("session") == 1
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(url)
+    assert e.value.code == 404
+    with urllib.request.urlopen(kept) as response:
+        assert response.read() == b"0" * 10
+
+    server.ttl = 0
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(kept)
+
+
+# Saves a file of the given size as an upload and then downloads it from a
+# MediaServer, printing how much each step raised the process's peak RSS.
+_MEASURE = textwrap.dedent("""
+    import json, os, sys, urllib.request
+    from utils import media_server
+
+    def reset_peak():
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return rss("VmRSS")
+
+    def rss(field):
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith(field))
+
+    source, copy = sys.argv[1], sys.argv[2]
+    server = media_server.MediaServer(port=0)
+    url = server.publish(copy, "session", "video.mp4")
+    growth = {}
+    base = reset_peak()
+    with open(source, "rb") as upload:
+        media_server.save_upload(upload, copy)
+    growth["save"] = rss("VmHWM") - base
+    base = reset_peak()
+    with urllib.request.urlopen(url) as response:
+        while response.read(1024 * 1024):
+            pass
+    growth["serve"] = rss("VmHWM") - base
+    print(json.dumps(growth))
+""")
+
+
+def _peak_growth(tmp_path, size):
+    source = tmp_path / f"upload-{size}.mp4"
+    with open(source, "wb") as f:
+        f.truncate(size)
+    out = subprocess.run([sys.executable, "-c", _MEASURE, str(source), str(tmp_path / f"copy-{size}.mp4")],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+@pytest.mark.skipif(not os.access("/proc/self/clear_refs", os.W_OK), reason="needs Linux /proc peak RSS reset")
+def test_urls_follow_the_page_unless_configured(tmp_path, server):
+    assert media_server.url_for_page("http://localhost:8501", 8502) == "http://localhost:8502"
+    assert media_server.url_for_page("https://dub.example.com", 8502) == "https://dub.example.com:8502"
+    assert media_server.url_for_page("https://x-8501.app.github.dev", 8502) == "https://x-8502.app.github.dev"
+    assert media_server.url_for_page("", 8502) == ""
+
+    path = str(tmp_path / "video.mp4")
+    assert server.publish(path, "s", "a.mp4", base_url="https://dub.example.com:8502/").startswith(
+        "https://dub.example.com:8502/")
+    assert server.publish(path, "s", "a.mp4").startswith(f"http://localhost:{server.port}/")
+    server.base_url = "https://media.example.com"
+    assert server.publish(path, "s", "a.mp4", base_url="https://dub.example.com:8502").startswith(
+        "https://media.example.com/")
+
+
+def test_peak_rss_stays_flat_as_the_file_grows(tmp_path):
+    small = _peak_growth(tmp_path, 32 * 2 ** 20)
+    large = _peak_growth(tmp_path, 512 * 2 ** 20)
+    for step in ("save", "serve"):
+        assert large[step] < 16 * 2 ** 20, (step, small, large)
+        assert large[step] - small[step] < 8 * 2 ** 20, (step, small, large)
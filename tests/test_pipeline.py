@@ -0,0 +1,303 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# utils.pipeline imports every stage's module (OCR, subtitles, lip-sync and their deps).
+pipeline = pytest.importorskip("utils.pipeline")
+
+from utils.cache import ArtifactCache  # noqa: E402
+from utils.manifest import JobManifest  # noqa: E402
+
+Stage, Stream, PipelineError, run_pipeline = (pipeline.Stage, pipeline.Stream, pipeline.PipelineError,
+                                              pipeline.run_pipeline)
+
+
+class Calls:
+    """
+    Stage funcs that record which stages ran, in order.
+    """
+
+    def __init__(self):
+        self.order = []
+        self._lock = threading.Lock()
+
+    def stage(self, name, value=None):
+        def func(ctx):
+            with self._lock:
+                self.order.append(name)
+            return value(ctx) if callable(value) else value
+        return func
+
+
+def test_stages_run_after_their_deps_and_branches_overlap():
+    calls = Calls()
+    both_running = threading.Barrier(2, timeout=5)
+
+    def branch(name):
+        def func(ctx):
+            # Only passes if the other branch is running at the same time.
+            both_running.wait()
+            return f"{name}({ctx['source']})"
+        return func
+
+    stages = [
+        Stage("source", calls.stage("source", lambda ctx: ctx["video_path"]), inputs=["video_path"]),
+        Stage("left", branch("left"), deps=["source"]),
+        Stage("right", branch("right"), deps=["source"], pool="cpu"),
+        Stage("join", calls.stage("join", lambda ctx: [ctx["left"], ctx["right"]]), deps=["left", "right"]),
+    ]
+    results = run_pipeline(stages, {"video_path": "in.mp4"})
+    assert results["join"] == ["left(in.mp4)", "right(in.mp4)"]
+    assert calls.order == ["source", "join"]
+
+
+def test_graph_errors_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage"):
+        run_pipeline([Stage("a", lambda ctx: 1, deps=["b"])], {})
+    with pytest.raises(ValueError, match="Cycle"):
+        run_pipeline([Stage("a", lambda ctx: 1, deps=["b"]), Stage("b", lambda ctx: 1, deps=["a"])], {})
+
+
+def test_failure_names_the_stage_and_stops_its_dependents():
+    calls = Calls()
+    completed = []
+
+    def broken(ctx):
+        raise ValueError("boom")
+
+    stages = [
+        Stage("a", calls.stage("a", 1)),
+        Stage("b", broken, deps=["a"], label="Broken stage"),
+        Stage("c", calls.stage("c", 3), deps=["b"]),
+    ]
+    with pytest.raises(PipelineError, match="Broken stage failed: boom") as e:
+        run_pipeline(stages, {}, on_stage_complete=lambda stage, result: completed.append(stage.name))
+    assert e.value.stage == "b"
+    assert calls.order == ["a"]
+    assert completed == ["a"]
+
+
+def test_unchanged_stages_are_served_from_the_cache(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), 10 ** 9)
+    calls = Calls()
+
+    def write_file(ctx):
+        calls.stage("file")(ctx)
+        path = os.path.join(ctx["session_dir"], "out.txt")
+        with open(path, "w") as f:
+            f.write(ctx["text"])
+        return path
+
+    def stages(suffix):
+        return [
+            Stage("text", calls.stage("text", lambda ctx: "hello" + suffix), params={"suffix": suffix}),
+            Stage("file", write_file, deps=["text"], produces_file=True, inputs=["session_dir"]),
+        ]
+
+    (tmp_path / "one").mkdir()
+    first = run_pipeline(stages(""), {"session_dir": str(tmp_path / "one")}, cache=cache,
+                         cache_dir=str(tmp_path / "one"))
+    (tmp_path / "two").mkdir()
+    second = run_pipeline(stages(""), {"session_dir": str(tmp_path / "one")}, cache=cache,
+                          cache_dir=str(tmp_path / "two"))
+    assert calls.order == ["text", "file"]
+    assert cache.hits == 2
+    assert second["file"] == str(tmp_path / "two" / "out.txt")
+    assert open(second["file"]).read() == open(first["file"]).read() == "hello"
+
+    # A changed param reruns the stage and everything after it.
+    run_pipeline(stages("!"), {"session_dir": str(tmp_path / "one")}, cache=cache, cache_dir=str(tmp_path / "one"))
+    assert calls.order == ["text", "file", "text", "file"]
+
+
+def test_resume_skips_completed_stages_and_promotes_files(tmp_path):
+    session = str(tmp_path / "job")
+    calls = Calls()
+    fail = {"render": True}
+
+    def tts(ctx):
+        calls.stage("tts")(ctx)
+        path = os.path.join(ctx["session_dir"], "dubbed.wav")
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        return path
+
+    def render(ctx):
+        calls.stage("render")(ctx)
+        if fail["render"]:
+            raise RuntimeError("killed")
+        return open(ctx["tts"], "rb").read().decode()
+
+    stages = [Stage("tts", tts, produces_file=True), Stage("render", render, deps=["tts"])]
+    with pytest.raises(PipelineError):
+        run_pipeline(stages, {}, manifest=JobManifest(session, "in.mp4"))
+    manifest = JobManifest.load(session, "in.mp4")
+    assert manifest.data["stages"]["tts"]["status"] == "done"
+    assert manifest.data["stages"]["render"]["status"] == "failed"
+    assert os.path.exists(os.path.join(session, "dubbed.wav"))
+
+    fail["render"] = False
+    manifest.discard_partial()
+    assert run_pipeline(stages, {}, manifest=manifest)["render"] == "RIFF"
+    assert calls.order == ["tts", "render", "render"]
+
+    # A truncated artifact isn't trusted: its stage runs again (render's inputs are unchanged).
+    with open(os.path.join(session, "dubbed.wav"), "wb") as f:
+        f.write(b"RI")
+    run_pipeline(stages, {}, manifest=JobManifest.load(session, "in.mp4"))
+    assert calls.order == ["tts", "render", "render", "tts"]
+
+
+def _streaming_stages(calls, started_consumer):
+    def produce(ctx):
+        calls.stage("produce")(ctx)
+        yield 1
+        # Only continues once the consumer has the first item.
+        assert started_consumer.wait(5)
+        yield 2
+        yield 3
+
+    def consume(ctx):
+        calls.stage("consume")(ctx)
+        items = []
+        for item in ctx["produce"]:
+            items.append(item)
+            started_consumer.set()
+        return items
+
+    return [
+        Stage("produce", produce, collect=sum, replay=lambda total: [total]),
+        Stage("consume", consume, deps=["produce"], stream_deps=["produce"]),
+        Stage("after", lambda ctx: ctx["produce"], deps=["produce"]),
+    ]
+
+
+def test_stream_consumers_start_before_the_producer_finishes(tmp_path):
+    calls, started = Calls(), threading.Event()
+    reported = []
+    results = run_pipeline(_streaming_stages(calls, started), {},
+                           on_stage_progress=lambda stage, items: reported.append((stage.name, items)))
+    assert results["consume"] == [1, 2, 3]
+    # Dependents outside stream_deps get the collected result.
+    assert results["after"] == results["produce"] == 6
+    assert all(name == "produce" for name, _ in reported)
+
+
+def test_cached_streams_are_replayed(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), 10 ** 9)
+    calls, started = Calls(), threading.Event()
+    run_pipeline(_streaming_stages(calls, started), {}, cache=cache, cache_dir=str(tmp_path))
+    calls.order.clear()
+
+    stages = _streaming_stages(calls, threading.Event())
+    # Rerun only the consumer: the producer's items come from replay(cached result).
+    stages[1].params = {"rerun": True}
+    results = run_pipeline(stages, {}, cache=cache, cache_dir=str(tmp_path))
+    assert calls.order == ["consume"]
+    assert results["consume"] == [6]
+
+
+def test_streamed_files_stay_readable_after_the_producer_is_committed(tmp_path):
+    session = str(tmp_path / "job")
+    committed = threading.Event()
+
+    def tts(ctx):
+        path = os.path.join(ctx["session_dir"], "dubbed.wav")
+        with open(path, "w") as f:
+            for block in ("a", "b"):
+                f.write(block)
+                f.flush()
+                yield {"path": path, "block": block}
+
+    def slow(ctx):
+        # Holds render back until tts is done and recorded in the manifest.
+        assert committed.wait(5)
+        return "subtitles"
+
+    def render(ctx):
+        return [open(item["path"]).read() for item in ctx["tts"]]
+
+    stages = [
+        Stage("tts", tts, produces_file=True, collect=lambda items: items[-1]["path"],
+              replay=lambda path: [{"path": path}]),
+        Stage("ocr", slow),
+        Stage("render", render, deps=["tts", "ocr"], stream_deps=["tts"]),
+    ]
+    results = run_pipeline(stages, {"session_dir": session}, manifest=JobManifest(session, "in.mp4"),
+                           on_stage_complete=lambda stage, result: stage.name == "tts" and committed.set())
+    assert results["tts"] == os.path.join(session, "dubbed.wav")
+    assert results["render"] == ["ab", "ab"]
+
+
+def test_stream_replays_from_the_start_and_reports_the_producers_error():
+    stream = Stream("tts", "TTS generation")
+    stream.put("a")
+    reader = iter(stream)
+    assert next(reader) == "a"
+    stream.put("b")
+    stream.close(RuntimeError("quota"))
+    assert next(reader) == "b"
+    with pytest.raises(PipelineError, match="TTS generation failed: quota"):
+        next(reader)
+    # A late consumer still sees every item.
+    late = []
+    with pytest.raises(PipelineError):
+        for item in stream:
+            late.append(item)
+    assert late == ["a", "b"]
+
+
+def test_stages_report_progress():
+    reported = []
+    seen = {25: threading.Event(), 50: threading.Event()}
+
+    def render(ctx):
+        for frames in seen:
+            ctx["progress"](frames)
+            # Reported while the stage is still running.
+            assert seen[frames].wait(5)
+        return "done"
+
+    def on_stage_progress(stage, items):
+        reported.append((stage.name, items))
+        seen[items].set()
+
+    run_pipeline([Stage("render", render, pool="cpu")], {}, on_stage_progress=on_stage_progress)
+    assert reported == [("render", 25), ("render", 50)]
+
+
+def test_chunks_run_on_the_shared_pool_and_are_reported(tmp_path, monkeypatch):
+    video = tmp_path / "in.mp4"
+    video.write_bytes(b"video")
+
+    def dub_chunk(video_path, chunk_dir, start, end, use_cache, resume):
+        os.makedirs(chunk_dir, exist_ok=True)
+        path = os.path.join(chunk_dir, "final_video.mp4")
+        with open(path, "w") as f:
+            f.write(f"{start}-{end};")
+        return path, []
+
+    def concat(paths, output_path):
+        with open(output_path, "w") as f:
+            f.write("".join(open(path).read() for path in paths))
+        return output_path
+
+    monkeypatch.setattr(pipeline.media, "probe", lambda path: {"duration": 250.0, "fps": 25.0})
+    monkeypatch.setattr(pipeline.chunking, "plan_chunks", lambda *args: [(0.0, 100.0), (100.0, None)])
+    monkeypatch.setattr(pipeline, "_dub_chunk", dub_chunk)
+    monkeypatch.setattr(pipeline.video_processing, "concat_videos", concat)
+    events = []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = pipeline.run_chunked_dubbing(
+            str(video), str(tmp_path / "job"), 100.0, executors={"chunk": pool}, use_cache=False,
+            on_stage_start=lambda stage: events.append(("start", stage.name)),
+            on_stage_complete=lambda stage, result: events.append(("done", stage.name)),
+            on_stage_progress=lambda stage, items: events.append((stage.name, items)))
+        # The job leaves the shared pool running for the next one.
+        assert pool.submit(lambda: "still up").result() == "still up"
+    assert open(results["render"]).read() == "0.0-100.0;100.0-None;"
+    assert events[:2] == [("start", "chunk000"), ("start", "chunk001")]
+    assert sorted(events[2:6]) == [("chunks", 1), ("chunks", 2), ("done", "chunk000"), ("done", "chunk001")]
+    assert events[6:] == [("start", "concat"), ("done", "concat")]
@@ -0,0 +1,18 @@
+import pytest
+
+pysrt = pytest.importorskip("pysrt")
+pytest.importorskip("moviepy.editor")
+
+from utils import subtitles, translation  # noqa: E402
+
+
+def test_srt_keeps_fractional_ocr_times(tmp_path, echo_llm):
+    # Frames sampled every 0.5 s: frames 0-1 show one caption, frame 3 another.
+    ocr_results = [(0, "HELLO THERE"), (1, "Hello there"), (3, "GOODBYE")]
+    items = translation.translate_screen_text(ocr_results, frame_interval=0.5)
+    assert [(start, end) for start, end, _ in items] == [(0.0, 1.0), (1.5, 2.0)]
+
+    path = subtitles.generate_srt(items, str(tmp_path / "subs.srt"))
+    cues = pysrt.open(path, encoding="utf-8")
+    assert [(cue.start.ordinal, cue.end.ordinal) for cue in cues] == [(0, 1000), (1500, 2000)]
+    assert cues[1].text == "[fr] GOODBYE"
@@ -0,0 +1,50 @@
+import numpy as np
+
+from utils.timeline import Timeline, time_stretch
+
+SR = 1000
+
+
+def test_clips_go_at_their_start_and_never_overlap():
+    track = Timeline(SR, duration=5.0)
+    track.place(np.ones(500, np.float32), 1.0)
+    # Starts before the first clip has ended: pushed back to where it ends.
+    end = track.place(np.full(500, 2.0, np.float32), 1.2)
+    assert end == 2.0
+    assert track.delayed == 1
+
+    samples = track.take()
+    assert len(samples) == 5 * SR
+    assert not samples[:1000].any()
+    assert (samples[1000:1500] == 1.0).all()
+    assert (samples[1500:2000] == 2.0).all()
+    assert not samples[2000:].any()
+
+
+def test_clip_longer_than_its_slot_is_sped_up_at_most_max_speedup():
+    track = Timeline(SR, max_speedup=1.25)
+    # 1.2 s of speech for a 1 s slot fits at 1.2x.
+    assert track.place(np.ones(1200, np.float32), 0.0, slot_end=1.0) == 1.0
+    # 2 s for a 1 s slot would need 2x: capped at 1.25x, running 0.6 s past the slot.
+    assert track.place(np.ones(2000, np.float32), 1.0, slot_end=2.0) == 2.6
+    assert track.stretched == 2
+
+
+def test_take_hands_on_each_part_once_and_drops_it():
+    track = Timeline(SR, duration=3.0)
+    track.place(np.ones(500, np.float32), 0.5)
+    first = track.take(1.0)
+    assert len(first) == 1000 and first[500:].all()
+    assert len(track.samples) == 0
+
+    # Taken audio is final: a later clip starting inside it goes after it.
+    assert track.place(np.full(200, 2.0, np.float32), 0.8) == 1.2
+    rest = track.take()
+    assert len(first) + len(rest) == 3 * SR
+    assert (rest[:200] == 2.0).all()
+
+
+def test_time_stretch_keeps_length_proportional():
+    audio = np.sin(np.arange(SR, dtype=np.float32) / 5)
+    assert len(time_stretch(audio, 1.25, SR)) == 800
+    assert time_stretch(audio, 1.0, SR) is audio
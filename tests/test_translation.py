@@ -0,0 +1,51 @@
+from utils import translation
+
+
+def _segments(*texts):
+    return [{"start": float(i), "end": i + 0.9, "text": text} for i, text in enumerate(texts)]
+
+
+def test_pack_segments_sends_the_first_alone_then_closes_on_sentences():
+    segments = _segments("Hello", "and welcome", "to the show.", "Today", "we cook.", "Bye")
+    batches = list(translation.pack_segments(segments, min_chars=10, max_tokens=100))
+    assert [[s["text"] for s in batch] for batch in batches] == [
+        ["Hello"], ["and welcome", "to the show."], ["Today", "we cook."], ["Bye"]]
+
+
+def test_pack_segments_closes_a_batch_before_the_token_budget():
+    segments = _segments("a" * 40, "b" * 40, "c" * 40, "d" * 40)
+    batches = list(translation.pack_segments(segments, min_chars=1000, max_tokens=25))
+    # 11 tokens each: the first alone, then two per batch.
+    assert [len(batch) for batch in batches] == [1, 2, 1]
+
+
+def test_blank_segments_are_skipped():
+    batches = list(translation.pack_segments(_segments("Hi.", "  ", "There."), min_chars=1, max_tokens=100))
+    assert [[s["text"] for s in batch] for batch in batches] == [["Hi."], ["There."]]
+
+
+def test_translate_segments_keeps_each_segments_timing(echo_llm):
+    segments = _segments("Hello", "and welcome", "to the show.", "Bye")
+    translated = list(translation.translate_segments(segments, min_chars=10, max_tokens=100, workers=2))
+    assert [(t["start"], t["end"], t["source"], t["text"]) for t in translated] == [
+        (s["start"], s["end"], s["text"], f"[fr] {s['text']}") for s in segments]
+    # One request per batch: the first segment, the sentence and the unfinished tail.
+    assert len(echo_llm.prompts) == 3
+
+
+def test_batch_reply_with_missing_lines_falls_back_to_one_by_one(echo_llm):
+    def reply(prompt):
+        if "numbered line" in prompt:
+            return "1: [fr] Hello"
+        return f"[fr] {prompt.split(chr(10), 1)[1]}"
+
+    echo_llm.reply = reply
+    assert translation.translate_batch(["Hello", "and welcome", "to the show."]) == [
+        "[fr] Hello", "[fr] and welcome", "[fr] to the show."]
+    assert len(echo_llm.prompts) == 4
+
+
+def test_parse_numbered_rejects_gaps_and_blanks():
+    assert translation._parse_numbered("1: un\n2) deux\n3. trois", 3) == ["un", "deux", "trois"]
+    assert translation._parse_numbered("1: un\n3: trois", 3) is None
+    assert translation._parse_numbered("1: un\n2:", 2) is None
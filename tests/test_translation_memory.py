@@ -0,0 +1,39 @@
+import sqlite3
+
+from utils import translation_memory
+from utils.translation_memory import TranslationMemory
+
+
+def _last_used(memory, source):
+    return memory._db.execute("SELECT last_used FROM memory WHERE source=?", (source,)).fetchone()[0]
+
+
+def test_hits_record_last_used_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation_memory, "TOUCH_BATCH", 2)
+    memory = TranslationMemory(str(tmp_path / "memory.sqlite3"), 10 ** 6)
+    memory.put("Hello", "fr", "m", "Bonjour")
+    memory.put("Bye", "fr", "m", "Au revoir")
+    memory._db.execute("UPDATE memory SET last_used=0")
+
+    assert memory.get("Hello", "fr", "m") == "Bonjour"
+    assert memory.get("  hello ", "fr", "m") == "Bonjour"
+    assert _last_used(memory, "Hello") == 0
+    # The second entry hit fills the batch.
+    memory.get("Bye", "fr", "m")
+    assert _last_used(memory, "Hello") > 0 and _last_used(memory, "Bye") > 0
+    assert memory.stats()["exact_hits"] == 2 and memory.stats()["normalized_hits"] == 1
+
+
+def test_unreadable_database_is_a_miss(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "memory.sqlite3"), 10 ** 6)
+    memory.put("Hello", "fr", "m", "Bonjour")
+
+    class Locked:
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    memory._db = Locked()
+    assert memory.get("Hello", "fr", "m") is None
+    assert memory.misses == 1
+    # Storing is skipped the same way.
+    memory.put("Bye", "fr", "m", "Au revoir")
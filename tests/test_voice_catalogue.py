@@ -0,0 +1,29 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.voice_catalogue import VoiceCatalogue
+
+
+class Voices:
+    def __init__(self):
+        self.calls = 0
+
+    def get_all(self):
+        self.calls += 1
+        time.sleep(0.1)
+        french = SimpleNamespace(voice_id="v-fr", name="Claire", verified_languages=[SimpleNamespace(language="fr")])
+        return SimpleNamespace(voices=[french])
+
+
+def test_cold_start_fetches_the_voices_once(tmp_path):
+    voices = Voices()
+    catalogue = VoiceCatalogue(SimpleNamespace(voices=voices), str(tmp_path / "voices.json"), ttl=3600)
+    found = []
+    jobs = [threading.Thread(target=lambda: found.append(catalogue.voice_for("fr"))) for _ in range(4)]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join(5)
+    assert found == ["v-fr"] * 4
+    assert voices.calls == catalogue.fetches == 1
@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+import pytest
+
+# The Wav2Lip package imports its torch models.
+pytest.importorskip("torch")
+
+from Wav2Lip import audio  # noqa: E402
+from utils.audio_stream import AudioRing  # noqa: E402
+
+
+def _speechlike(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * audio.SAMPLE_RATE)) / audio.SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+            + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def test_streaming_mel_matches_the_batch_mel():
+    wav = _speechlike(2.0)
+    whole = audio.melspectrogram(wav)
+    # A ring smaller than the audio, filled in uneven blocks while chunks are read.
+    ring = AudioRing(audio.SAMPLE_RATE, capacity_seconds=1.0)
+
+    def feed():
+        for i in range(0, len(wav), 3001):
+            ring.write(wav[i:i + 3001])
+        ring.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    mel = audio.StreamingMel(ring, block_frames=40)
+    # Away from the end, where the batch mel reflects and the stream pads with silence.
+    last = whole.shape[1] - 2 - audio.MEL_STEP_SIZE
+    for start in range(0, last, 5):
+        np.testing.assert_allclose(mel.chunk(start), whole[:, start:start + audio.MEL_STEP_SIZE],
+                                   rtol=1e-4, atol=1e-4)
+    mel.chunk(whole.shape[1])
+    feeder.join(timeout=5)
+    assert not feeder.is_alive()
+
+
+def test_chunks_past_the_end_repeat_the_last_frames():
+    wav = _speechlike(0.5)
+    mel = audio.StreamingMel(AudioRing.from_array(wav, audio.SAMPLE_RATE))
+    end = mel.chunk(10_000)
+    assert end.shape == (audio.NUM_MELS, audio.MEL_STEP_SIZE)
+    whole = audio.melspectrogram(wav)
+    assert mel.total == whole.shape[1]
+    # All but the frames within N_FFT // 2 samples of the end.
+    np.testing.assert_allclose(end[:, :-3], whole[:, -audio.MEL_STEP_SIZE:-3], rtol=1e-4, atol=1e-4)
+
+
+def test_no_audio_gives_no_chunk():
+    ring = AudioRing(audio.SAMPLE_RATE)
+    ring.close()
+    assert audio.StreamingMel(ring).chunk(0) is None
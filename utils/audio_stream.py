@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+
+
+class AudioRing:
+    """
+    Fixed-size ring buffer of mono float32 PCM between a producer appending audio
+    as it is synthesized and a consumer reading windows of it by absolute sample
+    position. Reads block until the window has been written (or the stream has
+    ended, when the missing part reads as silence); writes block while the ring
+    is full until the consumer release()s what it no longer needs. A reader that
+    gives up close()s the ring, after which writes are dropped instead of blocking.
+    """
+
+    def __init__(self, sr: int, capacity_seconds: float = 30.0):
+        self.sr = sr
+        self.capacity = int(capacity_seconds * sr)
+        self._buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.written = 0
+        self.released = 0
+        self.closed = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_array(cls, samples: np.ndarray, sr: int):
+        ring = cls(sr, capacity_seconds=max(1, len(samples)) / sr)
+        ring.write(samples)
+        ring.close()
+        return ring
+
+    def write(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float32)
+        offset = 0
+        while offset < len(samples):
+            with self._cond:
+                while self.written - self.released >= self.capacity and not self.closed:
+                    self._cond.wait()
+                if self.closed:
+                    # The reader is gone (or the stream was ended); nothing to feed.
+                    return
+                n = min(len(samples) - offset, self.capacity - (self.written - self.released))
+                self._put(self.written, samples[offset:offset + n])
+                self.written += n
+                offset += n
+                self._cond.notify_all()
+
+    def _put(self, position, samples):
+        start = position % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        self._buffer[:len(samples) - first] = samples[first:]
+
+    def close(self, error=None):
+        """
+        End of stream. With error, blocked and later reads raise it.
+        """
+        with self._cond:
+            if not self.closed:
+                self.closed = True
+                self.error = error
+            self._cond.notify_all()
+
+    def wait_for(self, end: int) -> int:
+        """
+        Block until sample end has been written or the stream ended. Returns how
+        many samples are available in total.
+        """
+        with self._cond:
+            while self.written < end and not self.closed:
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+            return self.written
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """
+        Samples [start, end), zero-padded before 0 and after the end of the stream.
+        """
+        self.wait_for(end)
+        out = np.zeros(max(0, end - start), dtype=np.float32)
+        with self._cond:
+            if max(start, 0) < self.released:
+                raise ValueError(f"samples before {self.released} were already released")
+            lo, hi = max(start, 0), min(end, self.written)
+            if hi > lo:
+                first = lo % self.capacity
+                n = hi - lo
+                part = min(n, self.capacity - first)
+                out[lo - start:lo - start + part] = self._buffer[first:first + part]
+                out[lo - start + part:hi - start] = self._buffer[:n - part]
+        return out
+
+    def release(self, upto: int):
+        """
+        The consumer won't read before sample upto any more; frees that space.
+        """
+        with self._cond:
+            upto = min(upto, self.written)
+            if upto > self.released:
+                self.released = upto
+                self._cond.notify_all()
+
+
+class LinearResampler:
+    """
+    Resample a stream of blocks from sr_in to sr_out by linear interpolation on
+    one global sample grid, so block boundaries leave no seams.
+    Good enough for features such as mel spectrograms, not for listening.
+    """
+
+    def __init__(self, sr_in: int, sr_out: int):
+        self.ratio = sr_in / sr_out
+        self.consumed = 0  # input samples seen
+        self.produced = 0  # output samples emitted
+        self._last = 0.0
+
+    def __call__(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        if not len(block):
+            return block
+        # Output sample k sits at input position k * ratio; emit those up to this
+        # block's last sample, the ones after it need the next block.
+        end = int(np.floor((self.consumed + len(block) - 1) / self.ratio + 1e-9)) + 1
+        positions = np.arange(self.produced, end) * self.ratio - self.consumed
+        out = np.interp(positions, np.arange(-1, len(block)), np.concatenate([[self._last], block]))
+        self.consumed += len(block)
+        self.produced = end
+        self._last = block[-1]
+        return out.astype(np.float32)
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached artifact after a change in stage semantics.
+CACHE_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def hash_file(path: str) -> str:
+    """
+    sha256 of a file's bytes, memoized on (path, size, mtime).
+    """
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _file_hashes_lock:
+        digest = _file_hashes.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _file_hashes_lock:
+            _file_hashes[memo_key] = digest
+    return digest
+
+
+def make_key(stage: str, params: dict, inputs: dict) -> str:
+    """
+    Key for a stage run: the stage name, its parameters and the keys/hashes of its inputs.
+    """
+    payload = json.dumps({"v": CACHE_VERSION, "stage": stage, "params": params, "inputs": inputs},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def store_best_effort(write, what: str, errors=(OSError,), cleanup=None) -> bool:
+    """
+    Run write(), which stores a result the caller has already computed. If it
+    raises one of errors (a full disk, a concurrent writer, a locked database)
+    log it, run cleanup and return False: the result stands, it just isn't kept.
+    """
+    try:
+        write()
+    except errors as e:
+        logger.warning(f"Could not store {what}: {e}")
+        if cleanup is not None:
+            cleanup()
+        return False
+    return True
+
+
+def _link_or_copy(src, dst):
+    """
+    Hard-link src to dst, falling back to a copy across filesystems.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for stage outputs.
+    Each entry is a directory <root>/<key[:2]>/<key>/ holding meta.json (the JSON
+    result) and, for file-producing stages, the output file itself.
+    Entries are evicted least-recently-used first once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str, restore_dir: str = ""):
+        """
+        Look up a key. Returns (True, value) on a hit, (False, None) on a miss.
+        File results are linked into restore_dir and the returned value points there.
+        """
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, "meta.json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            value = meta["value"]
+            if meta.get("file"):
+                cached_file = os.path.join(entry, meta["file"])
+                os.makedirs(restore_dir, exist_ok=True)
+                value = os.path.join(restore_dir, meta["file"])
+                _link_or_copy(cached_file, value)
+            os.utime(meta_path)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return False, None
+        with self._lock:
+            self.hits += 1
+        return True, value
+
+    def put(self, key: str, value, file_path: str = ""):
+        """
+        Store a JSON-serializable value, plus the file at file_path if the stage produced one.
+        """
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+        tmp = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+
+        def write():
+            os.makedirs(tmp)
+            meta = {"value": value, "file": ""}
+            if file_path:
+                meta["file"] = os.path.basename(file_path)
+                _link_or_copy(file_path, os.path.join(tmp, meta["file"]))
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            # Fails if another writer got there first.
+            os.rename(tmp, entry)
+
+        if store_best_effort(write, f"artifact {key[:12]}",
+                             cleanup=lambda: shutil.rmtree(tmp, ignore_errors=True)):
+            self.evict()
+
+    def _entries(self):
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if shard.startswith(".") or not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                entry = os.path.join(shard_dir, key)
+                try:
+                    last_used = os.stat(os.path.join(entry, "meta.json")).st_mtime
+                    size = sum(os.stat(os.path.join(entry, name)).st_size for name in os.listdir(entry))
+                except OSError:
+                    continue
+                yield entry, last_used, size
+
+    def evict(self):
+        """
+        Drop least-recently-used entries until the store fits in max_bytes.
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            for entry, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted cached artifact {os.path.basename(entry)[:12]} ({size} bytes)")
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, _, size in entries),
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Process-wide cache configured from settings, or None when caching is disabled.
+    """
+    global _default_cache
+    if not settings.CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ArtifactCache(settings.CACHE_DIR, settings.CACHE_MAX_BYTES)
+        return _default_cache
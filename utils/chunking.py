@@ -0,0 +1,101 @@
+import logging
+import re
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+_SHOWINFO_RE = re.compile(r"pts_time:(-?[\d.]+)")
+
+
+def detect_silences(video_path: str, noise_db: float = -35.0, min_silence: float = 0.4):
+    """
+    Find pauses in the soundtrack with ffmpeg's silencedetect filter.
+    Returns list of (start, end) in seconds.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-i", video_path, "-vn",
+        "-af", f"silencedetect=n={noise_db}dB:d={min_silence}", "-f", "null", "-",
+    ]
+    try:
+        stderr = subprocess.run(command, capture_output=True, text=True, check=True).stderr
+    except Exception as e:
+        logger.error(f"Silence detection failed: {e}")
+        return []
+    silences = []
+    start = None
+    for kind, value in _SILENCE_RE.findall(stderr):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    logger.info(f"Detected {len(silences)} silences in {video_path}")
+    return silences
+
+
+def detect_scene_cuts(video_path: str, threshold: float = 0.4):
+    """
+    Find shot changes with ffmpeg's scene score, on a downscaled copy of the frames.
+    Returns list of cut times in seconds.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-i", video_path, "-an",
+        "-vf", f"scale=160:-2,select='gt(scene\\,{threshold})',showinfo", "-f", "null", "-",
+    ]
+    try:
+        stderr = subprocess.run(command, capture_output=True, text=True, check=True).stderr
+    except Exception as e:
+        logger.error(f"Scene detection failed: {e}")
+        return []
+    cuts = [float(t) for t in _SHOWINFO_RE.findall(stderr)]
+    logger.info(f"Detected {len(cuts)} scene cuts in {video_path}")
+    return cuts
+
+
+def _nearest(candidates, target, tolerance):
+    best = None
+    for t in candidates:
+        if abs(t - target) <= tolerance and (best is None or abs(t - target) < abs(best - target)):
+            best = t
+    return best
+
+
+def plan_chunks(video_path: str, duration: float, fps: float, chunk_seconds: float, tolerance: float = 0.0):
+    """
+    Split [0, duration) into chunks of about chunk_seconds each.
+    Every boundary is moved to the middle of the nearest pause in speech within
+    tolerance seconds (default: a quarter of chunk_seconds), so no sentence is cut;
+    failing that to the nearest scene cut, and otherwise kept where it is.
+    Boundaries are rounded to whole frames so the chunks tile the video exactly.
+    Returns list of (start, end) in seconds; the last chunk ends at None (end of file).
+    """
+    if duration <= chunk_seconds * 1.5:
+        return [(0.0, None)]
+    tolerance = tolerance or chunk_seconds / 4
+    targets = [chunk_seconds * k for k in range(1, int(duration // chunk_seconds) + 1)]
+    if duration - targets[-1] < chunk_seconds / 2:
+        # Fold a short tail into the previous chunk.
+        targets.pop()
+
+    pauses = [(start + end) / 2 for start, end in detect_silences(video_path)]
+    cuts = None
+    boundaries = []
+    for target in targets:
+        boundary = _nearest(pauses, target, tolerance)
+        if boundary is None:
+            if cuts is None:
+                # Only decode the video for scene detection when some boundary needs it.
+                cuts = detect_scene_cuts(video_path)
+            boundary = _nearest(cuts, target, tolerance)
+        if boundary is None:
+            boundary = target
+        boundary = round(boundary * fps) / fps
+        if not boundaries or boundary > boundaries[-1]:
+            boundaries.append(boundary)
+
+    starts = [0.0] + boundaries
+    ends = boundaries + [None]
+    chunks = list(zip(starts, ends))
+    logger.info(f"Split {video_path} ({duration:.1f}s) into {len(chunks)} chunks at {boundaries}")
+    return chunks
@@ -0,0 +1,165 @@
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+GEMINI_URL = "https://generativelanguage.googleapis.com"
+ELEVENLABS_URL = "https://api.elevenlabs.io"
+
+
+class HTTPError(Exception):
+    """
+    Non-2xx response. code is the HTTP status, as on google.api_core errors, so
+    llm_client.is_retryable treats 429s and 5xx alike for every backend.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+
+
+class _Connections:
+    """
+    One keep-alive connection per thread and host, reopened after a failure.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.netloc, timeout=self.timeout)
+        return conn
+
+    def drop(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def request(self, method: str, path: str, body=None, headers=None) -> http.client.HTTPResponse:
+        """
+        Send a request and return the response once its headers are in; raises
+        HTTPError for non-2xx statuses and ConnectionError when the server can't be reached.
+        The caller reads the body to the end before the next request on this thread.
+        """
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = dict(headers or {}, **({"Content-Type": "application/json"} if payload else {}))
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, self.prefix + path, body=payload, headers=headers)
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, http.client.ImproperConnectionState, BrokenPipeError,
+                    ConnectionResetError) as e:
+                # A kept-alive connection the server has since closed: retry once on a fresh one.
+                self.drop()
+                if attempt:
+                    raise ConnectionError(str(e)) from e
+            except OSError:
+                self.drop()
+                raise
+        if response.status >= 300:
+            detail = response.read().decode("utf-8", errors="replace")
+            raise HTTPError(response.status, detail[:500])
+        return response
+
+
+def _prompt(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(getattr(m, "content", str(m)) for m in messages)
+
+
+class GeminiREST:
+    """
+    Chat model speaking the Gemini generateContent REST API with the standard
+    library only, for endpoint (default the public API, or e.g. the local
+    stand-in in benchmarks/llm_server.py). invoke() takes a prompt or chat
+    messages and returns an object with .content, like a LangChain chat model.
+    Retries and deadlines are left to llm_client.LLMClient.
+    """
+
+    def __init__(self, model: str, api_key: str, endpoint: str = "", timeout: float = 30.0):
+        self.model = model
+        self.api_key = api_key
+        self._connections = _Connections(endpoint or GEMINI_URL, timeout)
+
+    def invoke(self, messages):
+        body = {"contents": [{"role": "user", "parts": [{"text": _prompt(messages)}]}]}
+        response = self._connections.request("POST", f"/v1beta/models/{self.model}:generateContent", body,
+                                             {"x-goog-api-key": self.api_key})
+        reply = json.loads(response.read())
+        parts = reply["candidates"][0]["content"]["parts"]
+        return SimpleNamespace(content="".join(part.get("text", "") for part in parts))
+
+
+class ElevenLabsREST:
+    """
+    The subset of the ElevenLabs SDK client the app uses (voices.get_all() and
+    text_to_speech.convert()), over the REST API with the standard library only,
+    for base_url (default the public API, or e.g. benchmarks/tts_server.py).
+    Like the SDK, a request rejected with 429 or 5xx before any audio arrived
+    is retried up to `retries` times with exponential backoff.
+    """
+
+    def __init__(self, api_key: str, base_url: str = "", timeout: float = 60.0, retries: int = 2,
+                 backoff: float = 0.5, chunk_size: int = 16384):
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self._connections = _Connections(base_url or ELEVENLABS_URL, timeout)
+        self.voices = SimpleNamespace(get_all=self._get_all)
+        self.text_to_speech = SimpleNamespace(convert=self._convert)
+
+    def _request(self, method, path, body=None):
+        for attempt in range(self.retries + 1):
+            try:
+                return self._connections.request(method, path, body, {"xi-api-key": self.api_key})
+            except HTTPError as e:
+                if attempt == self.retries or not (e.code == 429 or e.code >= 500):
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning(f"ElevenLabs request failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _get_all(self):
+        reply = json.loads(self._request("GET", "/v1/voices").read())
+        return SimpleNamespace(voices=[
+            SimpleNamespace(voice_id=v["voice_id"], name=v.get("name", ""),
+                            verified_languages=[SimpleNamespace(language=lang.get("language", ""))
+                                                for lang in v.get("verified_languages") or []])
+            for v in reply.get("voices", [])
+        ])
+
+    def _convert(self, text, voice_id, model_id="", output_format="", **kwargs):
+        query = urllib.parse.urlencode({"output_format": output_format}) if output_format else ""
+        path = f"/v1/text-to-speech/{urllib.parse.quote(voice_id)}/stream" + (f"?{query}" if query else "")
+        response = self._request("POST", path, {"text": text, "model_id": model_id})
+        complete = False
+        try:
+            while True:
+                chunk = response.read1(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            complete = True
+        finally:
+            if not complete:
+                # The rest of the body is still on the wire; don't reuse the connection.
+                self._connections.drop()
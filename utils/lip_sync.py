@@ -1,63 +1,142 @@
 import logging
-import subprocess
 import os
+import threading
+from config import settings
+from utils import media, video_processing
+from utils.audio_stream import AudioRing, LinearResampler
+from utils.lip_sync_worker import get_lip_sync_worker
 
 logger = logging.getLogger(__name__)
 
 
-def lip_sync_video(video_path: str, audio_path: str, output_path: str) -> str:
+def lip_sync_video(video_path: str, audio_path: str, output_path: str, srt_path: str = "",
+                   on_progress=None) -> str:
     """
     Lip-sync French audio to video using simplified Wav2Lip.
+    srt_path: optional subtitles burned in during the same encode.
+    on_progress(job): called as frames are done (see lip_sync_worker.LipSyncJob).
     Returns the path to the lip-synced video.
     """
+    return render_dubbed_video(video_path, audio_path, output_path, srt_path, on_progress=on_progress)
+
+
+def render_dubbed_video(video_path: str, audio_path: str, output_path: str, srt_path: str = "",
+                        source=None, on_progress=None) -> str:
+    """
+    Lip-sync with the process-wide lip-sync worker's lip-syncer, on the calling
+    thread, and produce the deliverable in a single encode: the
+    lip-synced frame stream, the dubbed audio and optional subtitles go through
+    one ffmpeg filter graph, with no intermediate video files.
+    source: media.MediaSource to take the frames from (defaults to the whole of video_path).
+            For a range of the file (a chunk) the audio is padded so every frame is kept.
+    Returns the path to the final video.
+    """
     try:
-        # Path to our simplified inference script
-        wav2lip_script = os.path.join(os.path.dirname(__file__), "..", "Wav2Lip", "simple_inference.py")
-        
-        if not os.path.exists(wav2lip_script):
-            logger.error(f"Wav2Lip script not found at {wav2lip_script}")
-            # Fallback: just replace audio without lip-sync
-            logger.info("Falling back to simple audio replacement...")
-            return _simple_audio_replacement(video_path, audio_path, output_path)
-        
-        command = [
-            "python3", wav2lip_script,
-            "--face", video_path,
-            "--audio", audio_path,
-            "--outfile", output_path
-        ]
-        
-        logger.info(f"Running lip-sync: {' '.join(command)}")
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        logger.info(f"Lip-sync output: {result.stdout}")
-        
-        if os.path.exists(output_path):
-            logger.info(f"Lip-synced video saved at {output_path}")
-            return output_path
-        else:
-            logger.error("Lip-sync failed - output file not created")
-            return _simple_audio_replacement(video_path, audio_path, output_path)
-            
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Lip-sync subprocess failed: {e}")
-        logger.error(f"Error output: {e.stderr}")
-        return _simple_audio_replacement(video_path, audio_path, output_path)
+        job = get_lip_sync_worker().run(video_path, audio_path, output_path, srt_path, source, on_progress)
+        result = job.result()
+        logger.info(f"Lip-synced {job.frames} frames in {job.finished - job.started:.2f}s: {result}")
+        return result
     except Exception as e:
-        logger.error(f"Lip sync failed: {e}")
-        return _simple_audio_replacement(video_path, audio_path, output_path)
+        logger.error(f"Lip-sync render failed: {e}")
+    logger.info("Falling back to simple audio replacement...")
+    return _simple_audio_replacement(video_path, audio_path, output_path, srt_path, source)
 
 
-def _simple_audio_replacement(video_path: str, audio_path: str, output_path: str) -> str:
+def render_dubbed_stream(video_path: str, blocks, sr: int, output_path: str, srt_path: str = "",
+                         source=None, on_progress=None) -> str:
+    """
+    render_dubbed_video for dubbed audio that is still being synthesized: blocks
+    yields it as mono float32 PCM at sr Hz (e.g. the tts stage's stream). The
+    blocks are resampled into a ring buffer the lip-sync reads mel chunks from,
+    so frames for the first seconds of speech are generated and encoded while
+    the rest is still arriving; the audio is saved next to output_path as it
+    streams in and muxed in at the end, copying the encoded video.
+    An error raised by blocks (the TTS failing) is raised; lip-sync or render
+    failures fall back to simple audio replacement like render_dubbed_video.
+    on_progress(job): as for render_dubbed_video.
+    Returns the path to the final video.
+    """
+    base = os.path.splitext(output_path)[0]
+    audio_path, video_only = f"{base}_audio.wav", f"{base}_video.mp4"
+    worker = get_lip_sync_worker()
+    try:
+        sample_rate = worker.syncer.sample_rate
+    except Exception as e:
+        logger.error(f"Lip-sync unavailable: {e}")
+        sample_rate = None
+    ring = AudioRing(sample_rate) if sample_rate else None
+    errors = []
+
+    def feed():
+        resample = LinearResampler(sr, ring.sr) if ring is not None else None
+        try:
+            with media.open_wav(audio_path, sr) as wav:
+                for block in blocks:
+                    media.write_pcm(wav, block)
+                    if ring is not None:
+                        ring.write(resample(block))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if ring is not None:
+                ring.close(errors[0] if errors else None)
+
+    feeder = threading.Thread(target=feed, name="dubbed-audio", daemon=True)
+    feeder.start()
+    result = ""
+    try:
+        if ring is not None:
+            try:
+                source = source or media.open_source(video_path)
+                chunk = bool(source.start or source.end is not None)
+                if worker.run(video_path, ring, video_only, srt_path, source, on_progress).result():
+                    feeder.join()
+                    if not errors:
+                        result = video_processing.mux_audio(video_only, audio_path, output_path, pad_audio=chunk)
+            except Exception as e:
+                logger.error(f"Lip-sync render failed: {e}")
+        if ring is not None:
+            # No reader any more: let the feeder save the rest of the audio.
+            ring.close()
+        feeder.join()
+        if errors:
+            raise errors[0]
+        if not result:
+            logger.info("Falling back to simple audio replacement...")
+            result = _simple_audio_replacement(video_path, audio_path, output_path, srt_path, source)
+        return result
+    finally:
+        for path in (video_only, audio_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _simple_audio_replacement(video_path: str, audio_path: str, output_path: str, srt_path: str = "",
+                              source=None) -> str:
     """
     Simple fallback: replace audio in video using ffmpeg.
+    The video stream is copied unless subtitles have to be burned in or only a
+    range of it (source.start/end) is wanted; ranges are encoded like render_final
+    so the chunks can still be concatenated without re-encoding.
     """
     try:
         import subprocess
+        chunk = source is not None and bool(source.start or source.end is not None)
+        input_range = media.range_args(source.start, source.end) if chunk else []
+        if srt_path or chunk:
+            video_codec = ["-c:v", "libx264"]
+            if srt_path:
+                video_codec = ["-vf", video_processing.subtitles_filter(srt_path)] + video_codec
+            if chunk:
+                video_codec += ["-preset", settings.RENDER_PRESET, "-crf", str(settings.RENDER_CRF),
+                                "-pix_fmt", "yuv420p", "-af", "apad"]
+        else:
+            video_codec = ["-c:v", "copy"]
         command = [
             "ffmpeg", "-y",
-            "-i", video_path,
+            *input_range, "-i", video_path,
             "-i", audio_path,
-            "-c:v", "copy",
+            *video_codec,
             "-c:a", "aac",
             "-map", "0:v:0",
             "-map", "1:a:0",
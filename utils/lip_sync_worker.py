@@ -0,0 +1,234 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import settings
+from utils import media, tracing, video_processing
+
+logger = logging.getLogger(__name__)
+
+
+def load_syncer():
+    # SimpleLipSync has no weights yet (its _infer passes frames through), so
+    # this imports torch and picks the device; a Wav2Lip checkpoint and face
+    # detector would be loaded here.
+    from Wav2Lip.simple_inference import SimpleLipSync
+    return SimpleLipSync()
+
+
+class LipSyncJob:
+    """
+    One lip-sync job on a LipSyncWorker. frames / total say how far it has got
+    (total is 0 when the frame count isn't known); updates() streams that back
+    as it changes and result() waits for the output path.
+    """
+
+    def __init__(self, job_id: int, video_path: str, output_path: str, on_progress=None):
+        self.id = job_id
+        self.video_path = video_path
+        self.output_path = output_path
+        self.status = "queued"
+        self.frames = 0
+        self.total = 0
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.started = self.finished = None
+        self.future = None
+        self._on_progress = on_progress
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def _update(self, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._changed.notify_all()
+        if self._on_progress is not None:
+            try:
+                self._on_progress(self)
+            except Exception as e:
+                logger.error(f"Lip-sync progress callback failed: {e}")
+
+    def updates(self, interval: float = 0.5):
+        """
+        Yield (status, frames, total) whenever the job has moved on, at most once
+        per interval seconds, ending with its final state.
+        """
+        last = None
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: (self.status, self.frames, self.total) != last)
+                last = (self.status, self.frames, self.total)
+            yield last
+            if last[0] in ("done", "failed"):
+                return
+            time.sleep(interval)
+
+    def result(self, timeout=None) -> str:
+        """
+        Wait for the job; returns the output path or raises what made it fail.
+        """
+        return self.future.result(timeout)
+
+
+class LipSyncWorker:
+    """
+    Long-lived in-process lip-sync worker. The lip-syncer (see load_syncer) is
+    built once per process and shared by every job, so a job only pays for its
+    own frames. Up to `workers` submitted jobs run at once on worker threads;
+    run() does a job on the caller's thread instead.
+    """
+
+    def __init__(self, workers: int = 2, loader=load_syncer):
+        self.loader = loader
+        self.workers = workers
+        self._syncer = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lip-sync")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = {}
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def syncer(self):
+        """
+        The lip-syncer, built on first use.
+        """
+        with self._load_lock:
+            if self._syncer is None:
+                started = time.perf_counter()
+                self._syncer = self.loader()
+                logger.info(f"Lip-syncer ready in {time.perf_counter() - started:.2f}s")
+            return self._syncer
+
+    def preload(self, background: bool = False):
+        """
+        Build the lip-syncer ahead of the first job; with background, on a thread.
+        """
+        def run():
+            try:
+                self.syncer
+            except Exception as e:
+                logger.error(f"Preloading lip-sync failed: {e}")
+
+        if background:
+            thread = threading.Thread(target=run, name="preload-lip-sync", daemon=True)
+            thread.start()
+            return thread
+        run()
+        return None
+
+    def submit(self, video_path: str, speech, output_path: str, srt_path: str = "", source=None,
+               on_progress=None) -> LipSyncJob:
+        """
+        Queue a job lip-syncing the frames of video_path (or of source, a
+        media.MediaSource) to speech and encoding them to output_path with
+        optional subtitles burned in.
+        speech: path of the dubbed audio, which is also muxed in, or a
+                utils.audio_stream.AudioRing still being filled, in which case
+                the video is encoded alone.
+        on_progress(job) is called from the worker thread as frames are done.
+        Counts (frames) go to the caller's tracing span.
+        """
+        job = self._add_job(video_path, output_path, on_progress)
+        job.future = self._executor.submit(tracing.carry_span(self._run), job, speech, srt_path, source)
+        return job
+
+    def run(self, video_path: str, speech, output_path: str, srt_path: str = "", source=None,
+            on_progress=None) -> LipSyncJob:
+        """
+        Like submit, but on the calling thread, for callers that would only wait
+        for the job (e.g. a pipeline stage, whose pool already bounds how many
+        run at once). Returns the finished job; raises what made it fail.
+        """
+        job = self._add_job(video_path, output_path, on_progress)
+        job.future = Future()
+        try:
+            job.future.set_result(self._run(job, speech, srt_path, source))
+        except Exception as e:
+            job.future.set_exception(e)
+            raise
+        return job
+
+    def _add_job(self, video_path, output_path, on_progress) -> LipSyncJob:
+        with self._lock:
+            job = LipSyncJob(next(self._ids), video_path, output_path, on_progress)
+            self.jobs[job.id] = job
+        return job
+
+    def _run(self, job: LipSyncJob, speech, srt_path: str, source) -> str:
+        job._update(status="running", started=time.perf_counter())
+        try:
+            syncer = self.syncer
+            source = source or media.open_source(job.video_path)
+            chunk = bool(source.start or source.end is not None)
+            fps = source.info["fps"]
+            job._update(total=source.info.get("frame_count") or 0)
+            audio_path = speech if isinstance(speech, str) else ""
+            step = max(1, int(round(fps)))
+
+            def counted(frames):
+                for i, frame in enumerate(frames, 1):
+                    yield frame
+                    if i % step == 0:
+                        job._update(frames=i)
+
+            frames = counted(syncer.sync_frames(source.frames(), speech, fps))
+            result = video_processing.render_final(frames, fps, audio_path, job.output_path, srt_path,
+                                                   pad_audio=chunk)
+            if not result:
+                raise RuntimeError("final render failed")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                del self.jobs[job.id]
+            job._update(status="failed", error=e, finished=time.perf_counter())
+            raise
+        with self._lock:
+            self.completed += 1
+            del self.jobs[job.id]
+        job._update(status="done", frames=max(job.frames, job.total), finished=time.perf_counter())
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "loaded": self._syncer is not None, "active": len(self.jobs),
+                    "completed": self.completed, "failed": self.failed}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def get_lip_sync_worker() -> LipSyncWorker:
+    """
+    Process-wide lip-sync worker with settings.LIP_SYNC_WORKERS threads for submitted jobs.
+    A forked chunk worker builds its own.
+    """
+    global _worker, _worker_pid
+    with _worker_lock:
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = LipSyncWorker(settings.LIP_SYNC_WORKERS)
+            _worker_pid = os.getpid()
+        return _worker
+
+
+def preload_lip_sync(background: bool = True):
+    """
+    Build the lip-syncer if settings.LIP_SYNC_PRELOAD is on.
+    """
+    if not settings.LIP_SYNC_PRELOAD:
+        return None
+    return get_lip_sync_worker().preload(background=background)
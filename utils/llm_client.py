@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses (as carried by google.api_core exceptions' .code) worth retrying.
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 60 / per_minute seconds apart across threads.
+    per_minute=0 disables the limit.
+    """
+
+    def __init__(self, per_minute: float = 0):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Claim the next slot. Returns how many seconds to wait before using it.
+        """
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        return max(0.0, wait)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Timeouts, dropped connections, throttling and server errors; not bad requests.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if callable(code):
+        # grpc errors expose code() returning a StatusCode.
+        code = getattr(code(), "name", None)
+        return code in {"DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL"}
+    return code in RETRYABLE_CODES
+
+
+class LLMClient:
+    """
+    Long-lived chat model client shared by every translation in the process.
+    Requests run on one background event loop: each attempt has a deadline of
+    `timeout` seconds, failed or timed-out attempts are retried up to `retries`
+    times with exponential backoff and jitter, and with hedge_after set a
+    duplicate request is sent when the first hasn't answered by then, the first
+    answer winning. Use complete() from threads or `await acomplete()` from async code.
+    At most max_in_flight calls to the chat model run at once. A timed-out call
+    can't be interrupted and keeps its thread until it returns, so it still
+    counts; a new attempt waits for a free thread before its deadline starts.
+    """
+
+    def __init__(self, llm, timeout: float = 30.0, retries: int = 3, backoff: float = 1.0,
+                 hedge_after: float = 0.0, limiter: RateLimiter = None, max_in_flight: int = 32):
+        self.llm = llm
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.limiter = limiter or RateLimiter()
+        self.max_in_flight = max_in_flight
+        self.stats = {"requests": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _event_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="llm-request")
+                # One slot per executor thread, held until the call really returns.
+                self._slots = asyncio.Semaphore(self.max_in_flight)
+                threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True).start()
+            return self._loop
+
+    def _release_slot(self, future):
+        self._loop.call_soon_threadsafe(self._slots.release)
+
+    def complete(self, messages) -> str:
+        """
+        Blocking call from any thread. messages: a prompt or chat messages, as the
+        chat model's invoke() takes them. Returns the reply text.
+        """
+        return asyncio.run_coroutine_threadsafe(self.acomplete(messages), self._event_loop()).result()
+
+    async def acomplete(self, messages) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._hedged(messages)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                self.stats["retries"] += 1
+                logger.warning(f"LLM request failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, messages) -> str:
+        first = asyncio.ensure_future(self._attempt(messages))
+        if not self.hedge_after:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+        self.stats["hedges"] += 1
+        second = asyncio.ensure_future(self._attempt(messages))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, messages) -> str:
+        wait = self.limiter.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        # Wait for a thread before the deadline starts, so an attempt queued behind
+        # abandoned calls isn't timed out before it was even sent.
+        await self._slots.acquire()
+        self.stats["requests"] += 1
+        # The chat model's own calls block, so each attempt runs on a worker
+        # thread; the deadline is enforced here and the late reply dropped.
+        future = self._executor.submit(self.llm.invoke, messages)
+        future.add_done_callback(self._release_slot)
+        try:
+            response = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        return response.content.strip()
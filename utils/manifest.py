@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: jobs aren't locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+STAGING_DIR = ".partial"
+LOCK_NAME = "job.lock"
+
+
+class JobManifest:
+    """
+    Record of a job's progress kept in <session_dir>/manifest.json.
+    Each finished stage is stored with its input key, its result and, for file
+    artifacts, the file's name and size, so a restarted job can pick up after the
+    last completed stage. Stages write their files under <session_dir>/.partial/<stage>/
+    and only move them into the session dir once they succeed, so anything left
+    in .partial after a crash is a partial write and is discarded on resume.
+    Streaming stages write in place (their consumers hold the path) and are only
+    trusted on resume if the manifest says done and the size matches.
+    The manifest itself is replaced atomically on every update.
+    A running job holds an flock on <session_dir>/job.lock (see claim), which the OS
+    drops if its process dies, so a job is only offered for resume once nobody runs it.
+    owner identifies who started the job, e.g. so an app lists only its user's jobs.
+    """
+
+    def __init__(self, session_dir: str, video_path: str = "", owner: str = ""):
+        self.session_dir = session_dir
+        self.path = os.path.join(session_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self.data = {
+            "video_path": video_path,
+            "owner": owner,
+            "status": "running",
+            "error": "",
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "stages": {},
+        }
+
+    @classmethod
+    def load(cls, session_dir: str, video_path: str = "", owner: str = ""):
+        """
+        Open the manifest in session_dir, creating a fresh one if there is none or it is unreadable.
+        """
+        manifest = cls(session_dir, video_path, owner)
+        try:
+            with open(manifest.path, encoding="utf-8") as f:
+                manifest.data.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {manifest.path}: {e}")
+        if video_path:
+            manifest.data["video_path"] = video_path
+        if owner:
+            manifest.data["owner"] = owner
+        return manifest
+
+    def claim(self) -> bool:
+        """
+        Lock the job for this run; False if another run (in any process) holds it.
+        """
+        if fcntl is None or self._lock_file is not None:
+            return True
+        os.makedirs(self.session_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.session_dir, LOCK_NAME), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def in_use(self) -> bool:
+        """
+        Whether a run currently holds the job's lock.
+        """
+        if self._lock_file is not None:
+            return True
+        if not self.claim():
+            return True
+        self.release()
+        return False
+
+    def _save(self):
+        self.data["updated_at"] = time.time()
+        os.makedirs(self.session_dir, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def discard_partial(self):
+        """
+        Remove files left behind by stages that were interrupted mid-write.
+        """
+        staging = os.path.join(self.session_dir, STAGING_DIR)
+        if os.path.isdir(staging):
+            logger.info(f"Discarding partial stage outputs in {staging}")
+            shutil.rmtree(staging, ignore_errors=True)
+        with self._lock:
+            for name, entry in self.data["stages"].items():
+                if entry.get("status") == "running":
+                    entry["status"] = "interrupted"
+            self._save()
+
+    def staging_dir(self, stage: str) -> str:
+        """
+        Fresh directory the stage writes its artifacts into.
+        """
+        path = os.path.join(self.session_dir, STAGING_DIR, stage)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def completed(self, stage: str, key: str):
+        """
+        (True, result) if the stage finished earlier with the same input key and
+        its artifact is still intact, else (False, None).
+        """
+        with self._lock:
+            entry = self.data["stages"].get(stage)
+        if not entry or entry.get("status") != "done" or entry.get("key") != key:
+            return False, None
+        if entry.get("file"):
+            path = os.path.join(self.session_dir, entry["file"])
+            try:
+                intact = os.path.getsize(path) == entry.get("size")
+            except OSError:
+                intact = False
+            if not intact:
+                logger.warning(f"Artifact of stage {stage} is missing or truncated; it will be rerun")
+                return False, None
+            return True, path
+        return True, entry.get("result")
+
+    def mark_running(self, stage: str, key: str):
+        with self._lock:
+            self.data["stages"][stage] = {"status": "running", "key": key, "started_at": time.time()}
+            self._save()
+
+    def mark_done(self, stage: str, key: str, result, produces_file: bool = False):
+        """
+        Record a finished stage. A file result still in the staging area is moved
+        into the session dir first; returns the (possibly moved) result.
+        """
+        entry = {"status": "done", "key": key, "result": result, "file": "", "finished_at": time.time()}
+        if produces_file and result:
+            staging = os.path.join(os.path.abspath(self.session_dir), STAGING_DIR)
+            if os.path.abspath(result).startswith(staging + os.sep):
+                final = os.path.join(self.session_dir, os.path.basename(result))
+                os.replace(result, final)
+                result = final
+            entry.update(result=result, file=os.path.relpath(result, self.session_dir),
+                         size=os.path.getsize(result))
+        with self._lock:
+            previous = self.data["stages"].get(stage, {})
+            entry["started_at"] = previous.get("started_at", entry["finished_at"])
+            self.data["stages"][stage] = entry
+            self._save()
+        return result
+
+    def mark_failed(self, stage: str, error: str):
+        with self._lock:
+            entry = self.data["stages"].setdefault(stage, {})
+            entry.update(status="failed", error=error, finished_at=time.time())
+            self.data["status"] = "failed"
+            self.data["error"] = error
+            self._save()
+
+    def finish(self, result=None):
+        with self._lock:
+            self.data["status"] = "done"
+            self.data["error"] = ""
+            self.data["result"] = result
+            self._save()
+        shutil.rmtree(os.path.join(self.session_dir, STAGING_DIR), ignore_errors=True)
+
+    @property
+    def status(self) -> str:
+        return self.data["status"]
+
+    @property
+    def owner(self) -> str:
+        return self.data.get("owner", "")
+
+
+def find_unfinished(output_dir: str, owner: str = None):
+    """
+    Manifests under output_dir whose job did not finish and is not running, newest
+    first; with owner, only that owner's jobs.
+    """
+    manifests = []
+    if not os.path.isdir(output_dir):
+        return manifests
+    for name in os.listdir(output_dir):
+        session_dir = os.path.join(output_dir, name)
+        if os.path.isfile(os.path.join(session_dir, MANIFEST_NAME)):
+            manifest = JobManifest.load(session_dir)
+            if manifest.status == "done" or (owner is not None and manifest.owner != owner):
+                continue
+            if not manifest.in_use():
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m.data["updated_at"], reverse=True)
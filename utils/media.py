@@ -0,0 +1,402 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import wave
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WHISPER_SAMPLE_RATE = 16000
+DEFAULT_MAX_BUFFERED_FRAMES = 32
+
+# index: position within the subscription; number: frame number in the source;
+# t: presentation time in seconds; image: HxWx3 uint8 (read-only, copy before editing).
+Frame = namedtuple("Frame", ["index", "number", "t", "image"])
+
+_END = object()
+
+
+def probe(path: str) -> dict:
+    """
+    Read stream properties with ffprobe.
+    Returns dict with width, height, fps, duration, frame_count and has_audio.
+    """
+    command = [
+        "ffprobe", "-v", "error", "-print_format", "json",
+        "-show_entries", "stream=codec_type,width,height,avg_frame_rate,r_frame_rate,nb_frames:format=duration",
+        path,
+    ]
+    out = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+    streams = out.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    rate = video.get("avg_frame_rate") or video.get("r_frame_rate") or "0/1"
+    if rate in ("0/0", "0/1"):
+        rate = video.get("r_frame_rate", "25/1")
+    num, _, den = rate.partition("/")
+    fps = float(num) / float(den or 1) if float(den or 1) else 25.0
+    duration = float(out.get("format", {}).get("duration") or 0.0)
+    nb_frames = video.get("nb_frames")
+    return {
+        "width": int(video.get("width", 0)),
+        "height": int(video.get("height", 0)),
+        "fps": fps,
+        "duration": duration,
+        "frame_count": int(nb_frames) if nb_frames and nb_frames.isdigit() else int(round(duration * fps)),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def range_args(start: float = 0.0, end=None):
+    """
+    ffmpeg input options restricting decoding to [start, end) seconds.
+    """
+    args = []
+    if start:
+        args += ["-ss", f"{start:.6f}"]
+    if end is not None:
+        args += ["-t", f"{end - start:.6f}"]
+    return args
+
+
+def load_audio(path: str, sr: int = WHISPER_SAMPLE_RATE, start: float = 0.0, end=None) -> np.ndarray:
+    """
+    Decode the audio track straight to a mono float32 array at sr Hz through an ffmpeg pipe.
+    Only the audio stream is decoded; the video stream is skipped by the demuxer.
+    start/end: optional range in seconds.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", *range_args(start, end), "-i", path,
+        "-vn", "-f", "s16le", "-ac", "1", "-ar", str(sr), "pipe:1",
+    ]
+    out = subprocess.run(command, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(data: bytes, sr: int) -> np.ndarray:
+    """
+    Decode an encoded audio file held in memory (e.g. an mp3 from a TTS API) to a
+    mono float32 array at sr Hz through an ffmpeg pipe.
+    """
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1",
+               "-ar", str(sr), "pipe:1"]
+    out = subprocess.run(command, input=data, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def write_wav(path: str, samples: np.ndarray, sr: int = WHISPER_SAMPLE_RATE) -> str:
+    """
+    Save a mono float32 array as 16-bit PCM WAV. Returns path.
+    """
+    with open_wav(path, sr) as w:
+        write_pcm(w, samples)
+    return path
+
+
+class _UnbufferedWav(wave.Wave_write):
+    # Writes each block straight to the file, so a reader (read_pcm_blocks) can
+    # see it as soon as write_pcm returns.
+
+    def __init__(self, path):
+        self._raw = open(path, "wb", buffering=0)
+        super().__init__(self._raw)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+
+def open_wav(path: str, sr: int = WHISPER_SAMPLE_RATE):
+    """
+    Open a mono 16-bit PCM WAV for writing block by block with write_pcm; the
+    header is completed when it is closed.
+    """
+    w = _UnbufferedWav(path)
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(sr)
+    return w
+
+
+def write_pcm(w, samples: np.ndarray):
+    w.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+
+
+def wav_data_offset(f) -> int:
+    """
+    Byte offset of the samples in a WAV open for reading, also while it is
+    still being written (the sizes in the header are only final once it is closed).
+    """
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("no data chunk in WAV")
+        size = int.from_bytes(header[4:], "little")
+        if header[:4] == b"data":
+            return f.tell()
+        f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def read_pcm_blocks(blocks):
+    """
+    Read mono 16-bit PCM blocks described by {'path', 'offset', 'frames'}
+    (sample offsets into a WAV written with open_wav, e.g. as it is written) as
+    float32 arrays. The file is opened once, at the first block, so it can be
+    renamed while it is read.
+    """
+    f = data = None
+    try:
+        for block in blocks:
+            if f is None:
+                f = open(block["path"], "rb")
+                data = wav_data_offset(f)
+            f.seek(data + 2 * block["offset"])
+            raw = f.read(2 * block["frames"])
+            if len(raw) < 2 * block["frames"]:
+                raise ValueError(f"{block['path']} ends before sample {block['offset'] + block['frames']}")
+            yield np.frombuffer(raw, "<i2").astype(np.float32) / 32768.0
+    finally:
+        if f is not None:
+            f.close()
+
+
+def extract_wav(path: str, sr: int = WHISPER_SAMPLE_RATE) -> str:
+    """
+    Decode the audio track with load_audio and save it to a temporary mono WAV.
+    Returns the WAV's path; the caller deletes it.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
+        audio_path = tmp_audio.name
+    try:
+        return write_wav(audio_path, load_audio(path, sr), sr)
+    except Exception:
+        os.remove(audio_path)
+        raise
+
+
+class FrameSubscription:
+    """
+    One consumer's view of a decode pass. Iterate to receive Frame tuples.
+    Only every-th second is delivered when every is set. The queue between the
+    decoder and this consumer holds at most maxsize frames, so a slow consumer
+    throttles the pass; call close() when stopping early so it doesn't stall the others.
+    """
+
+    def __init__(self, source, every=None, rgb=False, maxsize=DEFAULT_MAX_BUFFERED_FRAMES):
+        self.source = source
+        self.every = every
+        self.rgb = rgb
+        self.closed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pass = None
+        self._next_t = 0.0
+        self._delivered = 0
+
+    def _wants(self, t: float) -> bool:
+        if self.every is None:
+            return True
+        # First frame at or after each multiple of every, as ffmpeg's select filter below.
+        if t + 1e-6 >= self._next_t:
+            self._next_t += self.every
+            while self._next_t <= t:
+                self._next_t += self.every
+            return True
+        return False
+
+    def _offer(self, number, t, image) -> bool:
+        """
+        Called by the decoder thread. Blocks while this consumer's buffer is full.
+        """
+        if self.closed or not self._wants(t):
+            return False
+        frame = Frame(self._delivered, number, t, image)
+        self._delivered += 1
+        while not self.closed:
+            try:
+                self._queue.put(frame, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _finish(self, error=None):
+        item = error if error is not None else _END
+        while not self.closed:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        self.source._start(self)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if self.rgb:
+                    item = item._replace(image=np.ascontiguousarray(item.image[:, :, ::-1]))
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self.closed = True
+        # Drain so a decoder blocked on our queue wakes up.
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+class _DecodePass:
+    """
+    One ffmpeg decode of the video stream shared by a fixed set of subscriptions.
+    """
+
+    def __init__(self, source, subscriptions):
+        self.source = source
+        self.subscriptions = subscriptions
+        self.thread = threading.Thread(target=self._run, name=f"decode-{id(self):x}", daemon=True)
+
+    def _command(self):
+        # -noautorotate keeps the decoded size equal to the probed one.
+        command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-noautorotate",
+                   *range_args(self.source.start, self.source.end), "-i", self.source.path, "-an"]
+        intervals = {sub.every for sub in self.subscriptions}
+        if len(intervals) == 1 and None not in intervals:
+            # Only subsampled consumers: let ffmpeg drop the other frames before
+            # they are converted and piped. Frame numbers are then recovered
+            # from timestamps.
+            every = intervals.pop()
+            command += ["-vf", f"select='gte(t\\,{every}*selected_n)'", "-vsync", "0"]
+            self.subsampled = every
+        else:
+            self.subsampled = None
+        command += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        return command
+
+    def _run(self):
+        info = self.source.info
+        width, height, fps = info["width"], info["height"], info["fps"] or 25.0
+        frame_bytes = width * height * 3
+        error = None
+        proc = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                bufsize=frame_bytes)
+        try:
+            i = 0
+            while True:
+                if all(sub.closed for sub in self.subscriptions):
+                    break
+                buf = proc.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    break
+                image = np.frombuffer(buf, np.uint8).reshape(height, width, 3)
+                if self.subsampled is not None:
+                    t = i * self.subsampled
+                    number = int(round(t * fps))
+                else:
+                    number, t = i, i / fps
+                for sub in self.subscriptions:
+                    sub._offer(number, t, image)
+                i += 1
+            logger.debug(f"Decode pass over {self.source.path} produced {i} frames")
+        except Exception as e:
+            error = e
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            stderr = proc.stderr.read().decode(errors="replace")
+            proc.stderr.close()
+            proc.wait()
+            if error is None and proc.returncode not in (0, -9) and stderr:
+                error = RuntimeError(f"ffmpeg decode failed: {stderr.strip()}")
+            for sub in self.subscriptions:
+                sub._finish(error)
+
+
+class MediaSource:
+    """
+    Demux an input video once and share it between stages.
+    audio() decodes the audio track once and returns the same PCM array to every caller.
+    frames() subscribes to the video stream: all subscriptions created before the
+    first of them starts iterating share a single decode pass, each with its own
+    bounded buffer; later subscriptions start a new pass. Subscribers to one pass
+    must be consumed concurrently.
+    start/end restrict the source to a range of the file (e.g. one chunk of a long
+    video); info, audio and frame times are then relative to start.
+    """
+
+    def __init__(self, path: str, start: float = 0.0, end=None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.info = probe(path)
+        if start or end is not None:
+            stop = min(end, self.info["duration"]) if end is not None else self.info["duration"]
+            self.info["duration"] = max(0.0, stop - start)
+            self.info["frame_count"] = int(round(self.info["duration"] * self.info["fps"]))
+        self._audio = {}
+        self._audio_lock = threading.Lock()
+        self._pass_lock = threading.Lock()
+        self._pending = []
+
+    def audio(self, sr: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+        with self._audio_lock:
+            if sr not in self._audio:
+                samples = load_audio(self.path, sr, self.start, self.end)
+                samples.flags.writeable = False
+                self._audio[sr] = samples
+            return self._audio[sr]
+
+    def frames(self, every=None, rgb=False, maxsize=DEFAULT_MAX_BUFFERED_FRAMES) -> FrameSubscription:
+        """
+        every: seconds between delivered frames (None for every frame).
+        rgb: deliver RGB instead of OpenCV's BGR.
+        """
+        sub = FrameSubscription(self, every=every, rgb=rgb, maxsize=maxsize)
+        with self._pass_lock:
+            self._pending.append(sub)
+        return sub
+
+    def _start(self, sub):
+        with self._pass_lock:
+            if sub._pass is not None:
+                return
+            subscriptions = [s for s in self._pending if not s.closed]
+            self._pending = []
+            decode_pass = _DecodePass(self, subscriptions)
+            for s in subscriptions:
+                s._pass = decode_pass
+        decode_pass.thread.start()
+
+
+_sources = weakref.WeakValueDictionary()
+_sources_lock = threading.Lock()
+
+
+def open_source(path: str, start: float = 0.0, end=None) -> MediaSource:
+    """
+    Process-wide MediaSource for path (or a range of it), so stages of one job running
+    on the same process share the probe and decoded audio, and frame subscriptions made
+    together join one decode pass.
+    """
+    with _sources_lock:
+        source = _sources.get((path, start, end))
+        if source is None:
+            source = MediaSource(path, start, end)
+            _sources[(path, start, end)] = source
+        return source
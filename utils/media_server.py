@@ -0,0 +1,190 @@
+import logging
+import mimetypes
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def save_upload(uploaded_file, path):
+    """
+    Write an upload (a file-like object such as Streamlit's UploadedFile) to path
+    in CHUNK_SIZE pieces.
+    """
+    uploaded_file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f, CHUNK_SIZE)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    # GET/HEAD /<token>/<name>[?download=1], with byte ranges so players can seek.
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body):
+        url = urlsplit(self.path)
+        token = unquote(url.path).strip("/").split("/", 1)[0]
+        entry = self.server.media.lookup(token)
+        if entry is None:
+            self.send_error(404)
+            return
+        path, name = entry
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            start, end = 0, size - 1
+            match = _RANGE_RE.match(self.headers.get("Range", ""))
+            if match and (match.group(1) or match.group(2)):
+                if match.group(1):
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                else:
+                    start = max(0, size - int(match.group(2)))
+                if start > end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            if "download=1" in url.query:
+                self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name)}")
+            self.end_headers()
+            if not body:
+                return
+            f.seek(start)
+            left = end - start + 1
+            try:
+                while left > 0:
+                    chunk = f.read(min(CHUNK_SIZE, left))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    left -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # The player moved on to another range.
+                pass
+
+
+class MediaServer:
+    """
+    Serves published files straight from disk over HTTP, CHUNK_SIZE bytes at a
+    time and with byte ranges, so previews and downloads of multi-GB videos
+    never pass through the app as one bytes object. Streamlit's own static file
+    server can't do this: it serves .mp4 as text/plain with nosniff and refuses
+    files over 200 MB.
+    Each file gets an unguessable URL that stops working when its session is
+    unpublished or after ttl seconds.
+    URLs start with base_url if set, else with the base_url given to publish
+    (see url_for_page), else http://localhost:<port>.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, base_url: str = "", ttl: float = 24 * 3600):
+        self.ttl = ttl
+        self._files = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _MediaHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.media = self
+        self.port = self.httpd.server_port
+        self.base_url = base_url.rstrip("/")
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="media-server", daemon=True)
+        self._thread.start()
+
+    def publish(self, path: str, session_id: str, name: str, download: bool = False, base_url: str = "") -> str:
+        """
+        Serve path as name. Returns its URL; with download, one that makes the
+        browser save the file rather than open it.
+        """
+        base_url = self.base_url or base_url.rstrip("/") or f"http://localhost:{self.port}"
+        token = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._lock:
+            for expired in [t for t, entry in self._files.items() if now - entry[3] > self.ttl]:
+                del self._files[expired]
+            self._files[token] = (os.path.abspath(path), name, session_id, now)
+        return f"{base_url}/{token}/{quote(name)}" + ("?download=1" if download else "")
+
+    def unpublish(self, session_id: str) -> int:
+        """
+        Stop serving a session's files. Returns how many there were.
+        """
+        with self._lock:
+            tokens = [t for t, entry in self._files.items() if entry[2] == session_id]
+            for token in tokens:
+                del self._files[token]
+        return len(tokens)
+
+    def lookup(self, token: str):
+        with self._lock:
+            entry = self._files.get(token)
+        if entry is None or time.time() - entry[3] > self.ttl:
+            return None
+        return entry[0], entry[1]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def url_for_page(page_url: str, port: int, app_port: int = 8501) -> str:
+    """
+    Base URL of a media server on port as seen by a browser showing page_url (the
+    app's origin, e.g. "https://host:8501"): same scheme and host, the server's port.
+    Forwarders that put the app's port in the host name instead, like Codespaces'
+    <name>-8501.app.github.dev, get it swapped there. "" if page_url has no host.
+    """
+    url = urlsplit(page_url)
+    if not url.hostname:
+        return ""
+    host = url.hostname if ":" not in url.hostname else f"[{url.hostname}]"
+    label, dot, domain = host.partition(".")
+    if url.port is None and label.endswith(f"-{app_port}"):
+        return f"{url.scheme}://{label[:-len(str(app_port))]}{port}{dot}{domain}"
+    return f"{url.scheme}://{host}:{port}"
+
+
+_server = None
+_server_pid = None
+_server_lock = threading.Lock()
+
+
+def get_media_server() -> MediaServer:
+    """
+    Process-wide media server on settings.MEDIA_SERVER_HOST:MEDIA_SERVER_PORT.
+    """
+    global _server, _server_pid
+    with _server_lock:
+        if _server is None or _server_pid != os.getpid():
+            _server = MediaServer(settings.MEDIA_SERVER_HOST, settings.MEDIA_SERVER_PORT,
+                                  settings.MEDIA_SERVER_URL, settings.MEDIA_URL_TTL)
+            _server_pid = os.getpid()
+            logger.info(f"Serving media on {settings.MEDIA_SERVER_HOST}:{_server.port}")
+        return _server
@@ -0,0 +1,174 @@
+import contextlib
+import logging
+import threading
+from collections import OrderedDict
+
+from config import settings
+from utils import whisper_backends
+from utils.whisper_backends import model_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def default_device() -> str:
+    """
+    settings.WHISPER_DEVICE, or "cuda" when available, else "cpu".
+    """
+    if settings.WHISPER_DEVICE:
+        return settings.WHISPER_DEVICE
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def load_whisper(name: str, device: str, backend: str = "torch"):
+    return whisper_backends.load_model(name, device, backend or "torch")
+
+
+class _Entry:
+    def __init__(self):
+        self.model = None
+        self.size = 0
+        self.preloading = False
+        # Held while the model is loading and while it is in use: whisper installs
+        # per-call hooks on the model, so one model can't run two decodes at once.
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded models keyed by (name, device, backend).
+    A model is loaded once and shared by every caller in the process; when the
+    loaded models exceed max_bytes, the least recently used idle ones are dropped.
+    Callers borrow a model with `with registry.use(name) as model:`.
+    """
+
+    def __init__(self, loader=load_whisper, max_bytes: int = 0):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            self._entries.move_to_end(key)
+            return entry
+
+    @contextlib.contextmanager
+    def use(self, name: str, device: str = "", backend: str = ""):
+        """
+        Borrow the model, loading it on first use. Concurrent users of the same
+        model take turns; different models run in parallel.
+        """
+        key = (name, device or default_device(), backend)
+        entry = self._entry(key)
+        with entry.lock:
+            if entry.model is None:
+                logger.info(f"Loading model {key[0]} ({key[2] or 'torch'}) on {key[1]}")
+                entry.model = self.loader(*key)
+                entry.size = model_bytes(entry.model)
+                with self._lock:
+                    self.loads += 1
+                    # Evicted while we were waiting for the lock: put it back.
+                    self._entries[key] = entry
+                logger.info(f"Model {key[0]} loaded ({entry.size / 2 ** 20:.0f} MB)")
+            self.evict(keep=key)
+            yield entry.model
+
+    def preload(self, name: str, device: str = "", backend: str = "", warmup=None, background: bool = False):
+        """
+        Load a model ahead of the first job, optionally calling warmup(model) to
+        initialise kernels. With background, returns at once and loads on a thread.
+        Does nothing if the model is already loaded or being preloaded.
+        """
+        entry = self._entry((name, device or default_device(), backend))
+        with self._lock:
+            if entry.model is not None or entry.preloading:
+                return None
+            entry.preloading = True
+
+        def run():
+            try:
+                with self.use(name, device, backend) as model:
+                    if warmup is not None:
+                        warmup(model)
+            except Exception as e:
+                logger.error(f"Preloading model {name} failed: {e}")
+            finally:
+                # A failed preload can be tried again.
+                with self._lock:
+                    entry.preloading = False
+
+        if background:
+            thread = threading.Thread(target=run, name=f"preload-{name}", daemon=True)
+            thread.start()
+            return thread
+        run()
+        return None
+
+    def evict(self, keep=None):
+        """
+        Drop least recently used idle models until the loaded ones fit in max_bytes.
+        """
+        if not self.max_bytes:
+            return
+        with self._lock:
+            total = sum(e.size for e in self._entries.values())
+            for key, entry in list(self._entries.items()):
+                if total <= self.max_bytes:
+                    break
+                if key == keep or entry.model is None or not entry.lock.acquire(blocking=False):
+                    continue
+                try:
+                    del self._entries[key]
+                    total -= entry.size
+                    entry.model = None
+                    entry.size = 0
+                finally:
+                    entry.lock.release()
+                logger.info(f"Evicted model {key[0]} ({key[2] or 'torch'}) on {key[1]}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = {f"{name}/{backend or 'torch'}@{device}": e.size
+                      for (name, device, backend), e in self._entries.items() if e.model is not None}
+        return {"loads": self.loads, "models": loaded, "bytes": sum(loaded.values())}
+
+
+_whisper_registry = None
+_whisper_registry_lock = threading.Lock()
+
+
+def get_whisper_registry() -> ModelRegistry:
+    """
+    Process-wide registry of Whisper models, capped at settings.WHISPER_CACHE_MAX_BYTES.
+    """
+    global _whisper_registry
+    with _whisper_registry_lock:
+        if _whisper_registry is None:
+            _whisper_registry = ModelRegistry(load_whisper, settings.WHISPER_CACHE_MAX_BYTES)
+        return _whisper_registry
+
+
+def warmup_whisper(model):
+    """
+    Run one short decode so the first real job doesn't pay for lazy initialisation.
+    """
+    import numpy as np
+    model.transcribe(np.zeros(16000, dtype=np.float32), language="en", fp16=False)
+
+
+def preload_whisper(background: bool = True):
+    """
+    Load (and warm up) settings.WHISPER_MODEL if settings.WHISPER_PRELOAD is on.
+    """
+    if not settings.WHISPER_PRELOAD:
+        return None
+    return get_whisper_registry().preload(settings.WHISPER_MODEL, backend=settings.WHISPER_BACKEND,
+                                          warmup=warmup_whisper, background=background)
@@ -0,0 +1,756 @@
+import logging
+import os
+import sys
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from config import settings
+from utils import transcription, translation, tts, lip_sync, ocr, subtitles
+from utils.cache import get_cache, hash_file, make_key
+from utils.manifest import JobManifest
+from utils import tracing
+from utils import media
+from utils import chunking, video_processing
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """Raised when a required stage fails; carries the failing stage name."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+    def __reduce__(self):
+        # Keep the stage when the error crosses a process pool.
+        return PipelineError, (self.stage, str(self))
+
+
+class Stage:
+    """
+    One node of the dubbing graph.
+    func is called with a dict holding the job inputs, the results of deps and
+    this stage's params under "params".
+    pool selects the executor: "io" for API-bound work, "cpu" for local compute.
+    inputs names the job inputs the stage reads; together with params and the
+    deps' cache keys they form the stage's cache key. Inputs a job doesn't
+    provide (e.g. start/end outside chunked runs) are left out of the key.
+    produces_file marks stages whose result is a path to an artifact file. Under a
+    manifest it is written to a staging dir and promoted when the stage succeeds,
+    except for streaming stages, whose items may point into the file.
+    A streaming stage (collect set) has a generator func; its items are published
+    on a Stream as they are yielded and collect(items) is its result. replay(result)
+    turns a cached result back into items. Stages listing it in stream_deps start
+    as soon as it starts and get the Stream in place of its result (on a process
+    pool, where a Stream can't be shared, they wait and get the list of its items).
+    """
+
+    def __init__(self, name, func, deps=(), pool="io", label="", params=None, inputs=(), produces_file=False,
+                 stream_deps=(), collect=None, replay=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.pool = pool
+        self.label = label or name
+        self.params = params or {}
+        self.inputs = tuple(inputs)
+        self.produces_file = produces_file
+        self.stream_deps = tuple(stream_deps)
+        self.collect = collect
+        self.replay = replay
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={self.deps!r}, pool={self.pool!r})"
+
+
+class Stream:
+    """
+    Items of a streaming stage, readable by any number of consumers while the
+    stage is still producing them. Every iteration starts from the first item and
+    blocks until the next one is published; if the producer fails, consumers get
+    a PipelineError naming the producing stage.
+    """
+
+    def __init__(self, stage: str, label: str = ""):
+        self.stage = stage
+        self.label = label or stage
+        self.items = []
+        self.closed = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def close(self, error=None):
+        with self._cond:
+            if not self.closed:
+                self.closed = True
+                self.error = error
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.items) and not self.closed:
+                    self._cond.wait()
+                if i < len(self.items):
+                    item = self.items[i]
+                elif self.error is not None:
+                    raise PipelineError(self.stage, f"{self.label} failed: {self.error}")
+                else:
+                    return
+            yield item
+            i += 1
+
+
+def _pump(func, context, stream, collect):
+    """
+    Run a streaming stage on a thread, publishing its items as they are yielded.
+    """
+    items = []
+    try:
+        for item in func(context):
+            items.append(item)
+            stream.put(item)
+        result = collect(items)
+    except Exception as e:
+        stream.close(e)
+        raise
+    stream.close()
+    return result
+
+
+def _collect_stream(func, context, collect):
+    # Process pools can't share a Stream; the items are published from the result when it returns.
+    return collect(list(func(context)))
+
+
+def _check_graph(stages):
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names in {names}")
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in names:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stage {dep!r}")
+        for dep in stage.stream_deps:
+            if dep not in stage.deps or next(s for s in stages if s.name == dep).collect is None:
+                raise ValueError(f"Stage {stage.name!r} streams from {dep!r}, which is not a streaming dependency")
+    # Kahn's algorithm only to reject cycles; scheduling is done dynamically.
+    pending = {s.name: set(s.deps) for s in stages}
+    while pending:
+        ready = [n for n, d in pending.items() if not d]
+        if not ready:
+            raise ValueError(f"Cycle between stages {sorted(pending)}")
+        for n in ready:
+            del pending[n]
+        for d in pending.values():
+            d.difference_update(ready)
+
+
+def make_executors(io_workers=None, cpu_workers=None, cpu_executor=None):
+    """
+    Build the {"io": ..., "cpu": ...} pools. Callers running many jobs share one set.
+    """
+    io_workers = io_workers or settings.PIPELINE_MAX_WORKERS
+    cpu_workers = cpu_workers or settings.PIPELINE_MAX_WORKERS
+    io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pipeline-io")
+    if (cpu_executor or settings.PIPELINE_CPU_EXECUTOR) == "process":
+        cpu_pool = ProcessPoolExecutor(max_workers=cpu_workers)
+    else:
+        # Whisper/torch release the GIL and OCR, lip-sync and ffmpeg run in
+        # child processes, so threads already overlap the heavy stages.
+        cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="pipeline-cpu")
+    return {"io": io_pool, "cpu": cpu_pool}
+
+
+def _stage_key(stage, inputs, keys):
+    stage_inputs = {}
+    for name in stage.inputs:
+        if name not in inputs:
+            continue
+        value = inputs[name]
+        stage_inputs[name] = hash_file(value) if isinstance(value, str) and os.path.isfile(value) else value
+    stage_inputs.update({dep: keys[dep] for dep in stage.deps})
+    return make_key(stage.name, stage.params, stage_inputs)
+
+
+def run_pipeline(stages, inputs, executors=None, on_stage_start=None, on_stage_complete=None,
+                 cache=None, cache_dir="", trace=None, manifest=None, on_stage_progress=None):
+    """
+    Run stages as soon as their dependencies are done.
+    Independent branches execute concurrently on the executors ({"io": ..., "cpu": ...});
+    an executor registered under a stage's name takes precedence over its pool,
+    which lets callers cap the concurrency of a single stage across jobs.
+    callbacks are invoked from the calling thread so they may touch UI state;
+    on_stage_progress(stage, items) reports how many items a streaming stage has produced so far,
+    or what a stage on a thread pool last passed to ctx["progress"] (e.g. frames rendered).
+    With a cache, a stage whose params and inputs are unchanged is served from it
+    (file artifacts are linked into cache_dir) instead of being run.
+    With a trace (utils.tracing.JobTrace), every stage's resource usage is recorded.
+    With a manifest (utils.manifest.JobManifest), stages it records as done with
+    the same key are skipped, and file-producing stages write into a staging dir
+    that is only promoted to the session dir once they succeed.
+    Returns dict of stage name -> result. Raises PipelineError on the first failure.
+    """
+    _check_graph(stages)
+    owns_executors = executors is None
+    if owns_executors:
+        executors = make_executors()
+
+    results = {}
+    keys = {}
+    streams = {}
+    # Progress reported through ctx["progress"] by running stages, by name.
+    counters = {}
+    reported = {}
+    remaining = {s.name: s for s in stages}
+    running = {}
+    try:
+        while remaining or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(remaining.items()):
+                    executor = executors.get(stage.name) or executors[stage.pool]
+                    live = () if isinstance(executor, ProcessPoolExecutor) else stage.stream_deps
+                    if not all(dep in results or (dep in live and dep in streams) for dep in stage.deps):
+                        continue
+                    del remaining[name]
+                    if on_stage_start:
+                        on_stage_start(stage)
+                    if cache is not None or manifest is not None:
+                        keys[name] = _stage_key(stage, inputs, keys)
+                    hit = False
+                    if manifest is not None:
+                        hit, value = manifest.completed(name, keys[name])
+                        if hit:
+                            logger.info(f"Stage {name} already completed, resuming after it")
+                    if not hit and cache is not None:
+                        hit, value = cache.get(keys[name], cache_dir)
+                        if hit:
+                            logger.info(f"Stage {name} served from cache")
+                            if manifest is not None:
+                                manifest.mark_done(name, keys[name], value, stage.produces_file)
+                    if hit:
+                        results[name] = value
+                        if stage.collect is not None:
+                            streams[name] = Stream(name, stage.label)
+                            for item in stage.replay(value):
+                                streams[name].put(item)
+                            streams[name].close()
+                        if trace is not None:
+                            trace.add_cached(name)
+                        if on_stage_complete:
+                            on_stage_complete(stage, value)
+                        progressed = True
+                        continue
+                    context = dict(inputs)
+                    # A stage on a process pool can't share a Stream: it waits for the
+                    # producer and gets the complete list of items.
+                    context.update({dep: streams[dep] if dep in live
+                                    else streams[dep].items if dep in stage.stream_deps else results[dep]
+                                    for dep in stage.deps})
+                    context["params"] = stage.params
+                    if not isinstance(executor, ProcessPoolExecutor):
+                        context["progress"] = lambda done, name=name: counters.__setitem__(name, done)
+                    if manifest is not None:
+                        manifest.mark_running(name, keys[name])
+                        # A streaming stage writes its file in place: consumers may
+                        # still open it by path after the stage is done.
+                        if stage.produces_file and stage.collect is None:
+                            context["session_dir"] = manifest.staging_dir(name)
+                    logger.info(f"Starting stage {name}")
+                    func, args = stage.func, (context,)
+                    if stage.collect is not None:
+                        streams[name] = Stream(name, stage.label)
+                        if isinstance(executor, ProcessPoolExecutor):
+                            func, args = _collect_stream, (stage.func, context, stage.collect)
+                        else:
+                            func, args = _pump, (stage.func, context, streams[name], stage.collect)
+                    if trace is not None:
+                        future = executor.submit(tracing.run_traced, name, func, *args)
+                    else:
+                        future = executor.submit(func, *args)
+                    running[future] = stage
+                    progressed = True
+
+            if not running:
+                continue
+            streaming = [name for name, stream in streams.items() if not stream.closed]
+            timeout = 0.5 if on_stage_progress and (streaming or running) else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if on_stage_progress:
+                progress = {name: len(streams[name]) for name in streaming}
+                progress.update(counters)
+                for name, count in progress.items():
+                    if count != reported.get(name, 0):
+                        reported[name] = count
+                        on_stage_progress(next(s for s in stages if s.name == name), count)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if stage.name in streams:
+                        streams[stage.name].close(e)
+                    if trace is not None and getattr(e, "span_record", None):
+                        trace.add(e.span_record)
+                    if manifest is not None:
+                        manifest.mark_failed(stage.name, str(e))
+                    if isinstance(e, PipelineError):
+                        raise
+                    raise PipelineError(stage.name, f"{stage.label} failed: {e}") from e
+                if trace is not None:
+                    result, record = result
+                    trace.add(record)
+                if stage.collect is not None and not streams[stage.name].closed:
+                    for item in stage.replay(result):
+                        streams[stage.name].put(item)
+                    streams[stage.name].close()
+                if manifest is not None:
+                    result = manifest.mark_done(stage.name, keys[stage.name], result, stage.produces_file)
+                results[stage.name] = result
+                logger.info(f"Stage {stage.name} complete")
+                if cache is not None:
+                    result = results[stage.name]
+                    cache.put(keys[stage.name], result, result if stage.produces_file else "")
+                if on_stage_complete:
+                    on_stage_complete(stage, results[stage.name])
+        if cache is not None:
+            logger.info(f"Artifact cache: {cache.hits} hits, {cache.misses} misses")
+        return results
+    finally:
+        for future in running:
+            future.cancel()
+        # Release consumers still waiting on a stream whose producer won't finish.
+        for stream in streams.values():
+            stream.close(RuntimeError("pipeline stopped"))
+        if owns_executors:
+            # On failure don't block on sibling branches that are still running.
+            for pool in executors.values():
+                pool.shutdown(wait=not running, cancel_futures=True)
+
+
+# Dubbing stages. Kept at module level so they can be pickled onto a process pool.
+
+def _source(ctx):
+    """
+    The job's media source: the whole input, or the chunk between ctx["start"] and ctx["end"].
+    """
+    return media.open_source(ctx["video_path"], ctx.get("start", 0.0), ctx.get("end"))
+
+
+def _shared_source(ctx):
+    # The job's source, or None for the stage to open the video itself if probing
+    # it failed (a chunk can't do without the range).
+    try:
+        return _source(ctx)
+    except Exception:
+        if "start" in ctx:
+            raise
+        return None
+
+
+def _shared_audio(ctx):
+    try:
+        return _source(ctx).audio()
+    except Exception as e:
+        if "start" in ctx:
+            raise PipelineError("transcribe", f"Audio decode of chunk at {ctx['start']}s failed: {e}")
+        logger.warning(f"Shared audio decode failed, transcription will extract it itself: {e}")
+        return None
+
+
+def _transcribe(ctx):
+    yield from transcription.iter_segments(ctx["video_path"], model_name=ctx["params"]["model"],
+                                           audio=_shared_audio(ctx), use_vad=ctx["params"]["vad"],
+                                           backend=ctx["params"]["backend"])
+
+
+def _collect_transcript(segments):
+    transcript = transcription.join_segments(segments)
+    if not transcript:
+        raise PipelineError("transcribe", "Transcription failed!")
+    return {"transcript": transcript, "segments": segments}
+
+
+def _replay_transcript(result):
+    return result["segments"]
+
+
+def _translate(ctx):
+    params = ctx["params"]
+    try:
+        yield from translation.translate_segments(ctx["transcribe"], target_lang=params["target_lang"],
+                                                  model=params["model"], min_chars=params["min_chars"],
+                                                  max_tokens=params["batch_tokens"])
+    except RuntimeError as e:
+        raise PipelineError("translate", f"Translation failed! {e}") from e
+
+
+def _collect_translation(pieces):
+    if not pieces:
+        raise PipelineError("translate", "Translation failed!")
+    return {"text": " ".join(piece["text"] for piece in pieces), "pieces": pieces}
+
+
+def _replay_translation(result):
+    return result["pieces"]
+
+
+def _tts(ctx):
+    pieces = ctx["translate"]
+    # One ElevenLabs request per sentence (group) rather than per Whisper segment.
+    groups = translation.group_segments(pieces, ctx["params"]["min_chars"])
+    try:
+        duration = _source(ctx).info["duration"]
+    except Exception as e:
+        logger.warning(f"Could not probe the video length, the dubbed track ends with the speech: {e}")
+        duration = 0.0
+    tts_audio_path = os.path.join(ctx["session_dir"], "dubbed_audio.wav")
+    offset = 0
+    try:
+        # Items say where each block is in the WAV rather than carry the samples,
+        # so the stream doesn't hold the track; consumers read them back from the file.
+        for block in tts.stream_timeline(groups, tts_audio_path, voice_id=ctx["params"]["voice_id"],
+                                         duration=duration):
+            yield {"path": tts_audio_path, "offset": offset, "frames": len(block)}
+            offset += len(block)
+    except PipelineError:
+        # The translation failed under us; report that rather than an empty TTS.
+        raise
+    except Exception as e:
+        raise PipelineError("tts", f"TTS generation failed! {e}") from e
+
+
+def _collect_tts(blocks):
+    if not blocks or not os.path.exists(blocks[-1]["path"]):
+        raise PipelineError("tts", "TTS generation failed!")
+    return blocks[-1]["path"]
+
+
+def _replay_tts(tts_audio_path):
+    with wave.open(tts_audio_path, "rb") as w:
+        frames = w.getnframes()
+    return [{"path": tts_audio_path, "offset": offset, "frames": min(tts.EMIT_SAMPLES, frames - offset)}
+            for offset in range(0, frames, tts.EMIT_SAMPLES)]
+
+
+def _frames_done(ctx):
+    # Report a lip-sync job's frames as the stage's progress.
+    report = ctx.get("progress")
+    return (lambda job: report(job.frames)) if report else None
+
+
+def _render(ctx):
+    final_video_path = os.path.join(ctx["session_dir"], "final_video.mp4")
+    # Lip-sync starts on the first seconds of dubbed audio while TTS voices the rest.
+    final_video_path = lip_sync.render_dubbed_stream(ctx["video_path"], media.read_pcm_blocks(ctx["tts"]),
+                                                     tts.TTS_SAMPLE_RATE, final_video_path, ctx["srt"],
+                                                     source=_shared_source(ctx), on_progress=_frames_done(ctx))
+    if not final_video_path or not os.path.exists(final_video_path):
+        raise PipelineError("render", "Lip-sync and final render failed!")
+    return final_video_path
+
+
+def _ocr(ctx):
+    interval = ctx["params"]["frame_interval"]
+    source = _shared_source(ctx)
+    return ocr.detect_english_text_frames(ctx["video_path"], frame_interval=interval,
+                                          frames=source.frames(every=interval) if source else None)
+
+
+def _ocr_translate(ctx):
+    params = ctx["params"]
+    try:
+        return translation.translate_screen_text(ctx["ocr"], frame_interval=params["frame_interval"],
+                                                 target_lang=params["target_lang"], model=params["model"])
+    except RuntimeError as e:
+        raise PipelineError("ocr_translate", f"On-screen text translation failed! {e}") from e
+
+
+def _srt(ctx):
+    subtitle_items = ctx["ocr_translate"]
+    if not subtitle_items:
+        return ""
+    srt_path = subtitles.generate_srt(subtitle_items, os.path.join(ctx["session_dir"], "subtitles.srt"))
+    if not srt_path or not os.path.exists(srt_path):
+        raise PipelineError("srt", "Subtitle generation failed!")
+    return srt_path
+
+
+def dubbing_stages():
+    """
+    The English -> French dubbing graph.
+    OCR only needs the input video, so it (and the translation of the on-screen
+    text it finds) runs alongside the transcribe -> translate -> tts chain. Both join at render, which lip-syncs
+    and encodes the deliverable (frames + dubbed audio + subtitles) in one pass.
+    transcribe -> translate -> tts -> render stream: each sentence group is
+    translated as soon as it is transcribed and voiced as soon as it is translated,
+    and render lip-syncs each stretch of the dubbed track as soon as it is final.
+    """
+    return [
+        Stage("transcribe", _transcribe, pool="cpu", label="Transcription",
+              params={"model": settings.WHISPER_MODEL, "vad": settings.WHISPER_VAD,
+                      "backend": settings.WHISPER_BACKEND},
+              inputs=["video_path", "start", "end"], collect=_collect_transcript, replay=_replay_transcript),
+        Stage("translate", _translate, deps=["transcribe"], stream_deps=["transcribe"], label="Translation",
+              params={"target_lang": "fr", "model": settings.TRANSLATION_MODEL,
+                      "min_chars": settings.TRANSLATION_MIN_CHARS,
+                      "batch_tokens": settings.TRANSLATION_BATCH_TOKENS},
+              collect=_collect_translation, replay=_replay_translation),
+        Stage("tts", _tts, deps=["translate"], stream_deps=["translate"], label="TTS generation", produces_file=True,
+              params={"voice_id": settings.ELEVENLABS_VOICE_ID, "model_id": tts.TTS_MODEL_ID,
+                      "output_format": tts.TTS_OUTPUT_FORMAT, "min_chars": settings.TTS_MIN_CHARS,
+                      "max_speedup": settings.TTS_MAX_SPEEDUP},
+              inputs=["video_path", "start", "end"], collect=_collect_tts, replay=_replay_tts),
+        Stage("ocr", _ocr, pool="cpu", label="OCR",
+              params={"frame_interval": settings.OCR_FRAME_INTERVAL, "lang": "eng"},
+              inputs=["video_path", "start", "end"]),
+        Stage("ocr_translate", _ocr_translate, deps=["ocr"], label="On-screen text translation",
+              params={"frame_interval": settings.OCR_FRAME_INTERVAL, "target_lang": "fr",
+                      "model": settings.TRANSLATION_MODEL}),
+        Stage("srt", _srt, deps=["ocr_translate"], label="Subtitle generation", produces_file=True),
+        Stage("render", _render, deps=["tts", "srt"], stream_deps=["tts"], pool="cpu", label="Lip-sync and final render",
+              produces_file=True, inputs=["video_path", "start", "end"],
+              params={"preset": settings.RENDER_PRESET, "crf": settings.RENDER_CRF}),
+    ]
+
+
+def run_dubbing(video_path: str, session_dir: str, executors=None, on_stage_start=None, on_stage_complete=None,
+                cache=None, use_cache=True, trace=None, resume=True, start=0.0, end=None, chunk_seconds=None,
+                on_stage_progress=None, owner=""):
+    """
+    Dub one video. Returns dict of stage results; results["render"] is the final video path.
+    on_stage_progress(stage, items) reports segments transcribed, groups translated,
+    blocks of dubbed audio finalized and frames rendered so far.
+    cache defaults to the process-wide artifact cache (see utils.cache.get_cache).
+    Progress is kept in <session_dir>/manifest.json; with resume, a job rerun in the
+    same session dir skips the stages that already completed for the same inputs.
+    owner is recorded in the manifest (see utils.manifest.find_unfinished). Raises
+    PipelineError if another run of the same session dir is in progress.
+    start/end dub only that range of the video (one chunk of a chunked run).
+    chunk_seconds (default settings.CHUNK_SECONDS, 0 to disable): videos longer than
+    that are dubbed in chunks on a process pool, see run_chunked_dubbing.
+    The job's trace is written to <session_dir>/trace.json and metrics.prom, also on failure.
+    """
+    chunk_seconds = settings.CHUNK_SECONDS if chunk_seconds is None else chunk_seconds
+    if chunk_seconds and not start and end is None:
+        return run_chunked_dubbing(video_path, session_dir, chunk_seconds, executors=executors,
+                                   on_stage_start=on_stage_start, on_stage_complete=on_stage_complete,
+                                   use_cache=use_cache, trace=trace, resume=resume,
+                                   on_stage_progress=on_stage_progress, owner=owner)
+    os.makedirs(session_dir, exist_ok=True)
+    inputs = {"video_path": video_path, "session_dir": session_dir}
+    if start or end is not None:
+        inputs.update(start=start, end=end)
+    if cache is None and use_cache:
+        cache = get_cache()
+    if trace is None:
+        trace = tracing.JobTrace(os.path.basename(os.path.normpath(session_dir)), video=video_path)
+    if resume:
+        manifest = JobManifest.load(session_dir, video_path, owner)
+        manifest.data["status"] = "running"
+    else:
+        manifest = JobManifest(session_dir, video_path, owner)
+    _claim(manifest)
+    source = None
+    try:
+        manifest.discard_partial()
+        # Hold the job's media source so stages on this process reuse its probe and
+        # decoded audio. OCR and render still decode the frames in a pass each: render
+        # needs the subtitles OCR produces, so the two never read frames at the same time.
+        try:
+            source = media.open_source(video_path, start, end)
+        except Exception as e:
+            logger.warning(f"Could not probe {video_path}: {e}")
+        results = run_pipeline(dubbing_stages(), inputs, executors=executors,
+                               on_stage_start=on_stage_start, on_stage_complete=on_stage_complete,
+                               cache=cache, cache_dir=session_dir, trace=trace, manifest=manifest,
+                               on_stage_progress=on_stage_progress)
+        manifest.finish(results["render"])
+        return results
+    finally:
+        trace.write_json(os.path.join(session_dir, "trace.json"))
+        trace.write_prometheus(os.path.join(session_dir, "metrics.prom"))
+        manifest.release()
+        del source
+
+
+def _claim(manifest):
+    if not manifest.claim():
+        raise PipelineError("manifest", f"Job in {manifest.session_dir} is already running")
+
+
+def _init_chunk_worker(threads):
+    # Give each chunk process an equal share of the cores for torch/BLAS.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def make_chunk_pool(workers=None):
+    """
+    Process pool for the chunks of run_chunked_dubbing (default settings.CHUNK_WORKERS,
+    else one per core). Callers running many jobs share one, as executors["chunk"].
+    """
+    workers = workers or settings.CHUNK_WORKERS or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_chunk_worker, initargs=(threads,))
+
+
+_chunk_pool = None
+_chunk_pool_pid = None
+_chunk_pool_lock = threading.Lock()
+
+
+def get_chunk_pool():
+    """
+    Process-wide chunk pool, so concurrent jobs (e.g. app sessions) share the cores.
+    """
+    global _chunk_pool, _chunk_pool_pid
+    with _chunk_pool_lock:
+        if _chunk_pool is None or _chunk_pool_pid != os.getpid():
+            _chunk_pool = make_chunk_pool()
+            _chunk_pool_pid = os.getpid()
+        return _chunk_pool
+
+
+def _dub_chunk(video_path, chunk_dir, start, end, use_cache, resume):
+    """
+    Dub one chunk in a worker process. Returns (final chunk path, trace stage records).
+    """
+    executors = make_executors(io_workers=2, cpu_workers=2, cpu_executor="thread")
+    trace = tracing.JobTrace(os.path.basename(chunk_dir), video=video_path, start=start, end=end)
+    try:
+        results = run_dubbing(video_path, chunk_dir, executors=executors, use_cache=use_cache, trace=trace,
+                              resume=resume, start=start, end=end, chunk_seconds=0)
+    finally:
+        for pool in executors.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+    return results["render"], trace.to_dict()["stages"]
+
+
+def run_chunked_dubbing(video_path: str, session_dir: str, chunk_seconds: float, executors=None,
+                        on_stage_start=None, on_stage_complete=None, use_cache=True, trace=None, resume=True,
+                        on_stage_progress=None, owner=""):
+    """
+    Dub a long video as independent chunks split at pauses in speech (or scene cuts,
+    see utils.chunking.plan_chunks). Each chunk runs the whole dubbing graph on its own
+    range of the input in a worker process, in <session_dir>/chunks/NNN/, and the
+    chunk renders are then joined without re-encoding. Wall time therefore scales
+    with the number of cores rather than the length of the video.
+    Chunks run on executors["chunk"] if given, else on get_chunk_pool(), so jobs
+    running at once share the same processes.
+    Chunks are reported to the callbacks as stages named chunkNNN, plus "concat";
+    on_stage_progress reports the number of chunks done as stage "chunks".
+    Returns {"chunks": [chunk video paths], "render": final video path}.
+    """
+    os.makedirs(session_dir, exist_ok=True)
+    info = media.probe(video_path)
+    chunks = chunking.plan_chunks(video_path, info["duration"], info["fps"], chunk_seconds)
+    if len(chunks) == 1:
+        return run_dubbing(video_path, session_dir, executors=executors, on_stage_start=on_stage_start,
+                           on_stage_complete=on_stage_complete, use_cache=use_cache, trace=trace,
+                           resume=resume, chunk_seconds=0, on_stage_progress=on_stage_progress, owner=owner)
+
+    if trace is None:
+        trace = tracing.JobTrace(os.path.basename(os.path.normpath(session_dir)), video=video_path)
+    if resume:
+        manifest = JobManifest.load(session_dir, video_path, owner)
+    else:
+        manifest = JobManifest(session_dir, video_path, owner)
+    manifest.data.update(status="running", chunks=chunks)
+    # A chunk's output depends on every stage's parameters, not only on its range.
+    params = {stage.name: stage.params for stage in dubbing_stages()}
+    video_hash = hash_file(video_path)
+
+    pool = (executors or {}).get("chunk") or get_chunk_pool()
+    logger.info(f"Dubbing {len(chunks)} chunks of {video_path}")
+
+    outputs = [None] * len(chunks)
+    keys = {}
+    running = {}
+    progress_stage = Stage("chunks", _dub_chunk, label="Chunks")
+
+    def chunk_done(stage, path):
+        if on_stage_complete:
+            on_stage_complete(stage, path)
+        if on_stage_progress:
+            on_stage_progress(progress_stage, sum(output is not None for output in outputs))
+
+    _claim(manifest)
+    manifest.discard_partial()
+    try:
+        for i, (chunk_start, chunk_end) in enumerate(chunks):
+            stage = Stage(f"chunk{i:03d}", _dub_chunk, pool="cpu", label=f"Chunk {i + 1}/{len(chunks)}",
+                          produces_file=True)
+            keys[stage.name] = make_key("chunk", params, {"video_path": video_hash, "start": chunk_start,
+                                                          "end": chunk_end})
+            if on_stage_start:
+                on_stage_start(stage)
+            hit, value = manifest.completed(stage.name, keys[stage.name])
+            if hit:
+                outputs[i] = value
+                trace.add_cached(stage.name)
+                chunk_done(stage, value)
+                continue
+            manifest.mark_running(stage.name, keys[stage.name])
+            chunk_dir = os.path.join(session_dir, "chunks", f"{i:03d}")
+            future = pool.submit(_dub_chunk, video_path, chunk_dir, chunk_start, chunk_end, use_cache, resume)
+            running[future] = (i, stage)
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, stage = running.pop(future)
+                try:
+                    path, records = future.result()
+                except Exception as e:
+                    manifest.mark_failed(stage.name, str(e))
+                    if isinstance(e, PipelineError):
+                        raise PipelineError(e.stage, f"{stage.label}: {e}") from e
+                    raise PipelineError(stage.name, f"{stage.label} failed: {e}") from e
+                for record in records:
+                    trace.add(dict(record, stage=f"{stage.name}.{record['stage']}"))
+                outputs[i] = manifest.mark_done(stage.name, keys[stage.name], path, produces_file=True)
+                logger.info(f"{stage.label} complete")
+                chunk_done(stage, outputs[i])
+
+        stage = Stage("concat", video_processing.concat_videos, label="Joining chunks", produces_file=True)
+        if on_stage_start:
+            on_stage_start(stage)
+        key = make_key("concat", {}, {"chunks": [keys[f"chunk{i:03d}"] for i in range(len(chunks))]})
+        hit, final_video_path = manifest.completed(stage.name, key)
+        if hit:
+            trace.add_cached(stage.name)
+        else:
+            manifest.mark_running(stage.name, key)
+            staged = os.path.join(manifest.staging_dir(stage.name), "final_video.mp4")
+            final_video_path, record = tracing.run_traced(stage.name, video_processing.concat_videos, outputs, staged)
+            trace.add(record)
+            if not final_video_path:
+                manifest.mark_failed(stage.name, "Joining chunks failed!")
+                raise PipelineError(stage.name, "Joining chunks failed!")
+            final_video_path = manifest.mark_done(stage.name, key, final_video_path, produces_file=True)
+        if on_stage_complete:
+            on_stage_complete(stage, final_video_path)
+        manifest.finish(final_video_path)
+        return {"chunks": outputs, "render": final_video_path}
+    finally:
+        # The pool is shared: drop this job's queued chunks, leave the rest running.
+        for future in running:
+            future.cancel()
+        trace.write_json(os.path.join(session_dir, "trace.json"))
+        trace.write_prometheus(os.path.join(session_dir, "metrics.prom"))
+        manifest.release()
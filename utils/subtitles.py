@@ -3,6 +3,7 @@ import pysrt
 from moviepy.editor import VideoFileClip
 import tempfile
 import os
+from utils import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +18,14 @@ def generate_srt(subtitles, output_path):
         for idx, (start, end, text) in enumerate(subtitles, 1):
             sub = pysrt.SubRipItem(
                 index=idx,
-                start=pysrt.SubRipTime(seconds=int(start)),
-                end=pysrt.SubRipTime(seconds=int(end)),
+                # Times are fractional (e.g. OCR frames sampled every 0.5 s): keep the milliseconds.
+                start=pysrt.SubRipTime.from_ordinal(int(round(start * 1000))),
+                end=pysrt.SubRipTime.from_ordinal(int(round(end * 1000))),
                 text=text
             )
             subs.append(sub)
         subs.save(output_path, encoding='utf-8')
+        tracing.count("subtitles", len(subs))
         logger.info(f"SRT file generated at {output_path}")
         return output_path
     except Exception as e:
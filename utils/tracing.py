@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import resource
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RSS_SAMPLE_INTERVAL = 0.1  # seconds
+METRIC_PREFIX = "dubber_stage"
+
+_local = threading.local()
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS): fall back to the lifetime peak, reported in bytes there.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _io_bytes():
+    """
+    (bytes read, bytes written) by this process and its reaped children, via /proc/self/io.
+    """
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key] = int(value)
+    except (OSError, ValueError):
+        return 0, 0
+    return counters.get("rchar", 0), counters.get("wchar", 0)
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class Span:
+    """
+    Resource usage of one stage run, used as a context manager around the work.
+    cpu_seconds, peak_rss_bytes and bytes_read/written are process-wide (children
+    included once reaped), so stages that overlap see part of each other's load;
+    thread_cpu_seconds covers only the thread that ran the stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = {}
+        self.cached = False
+        self.error = ""
+        self.record = {}
+        self._counts_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._peak_rss = 0
+
+    def count(self, item: str, value=1):
+        # Also called from the stage's helper threads (see carry_span).
+        with self._counts_lock:
+            self.counts[item] = self.counts.get(item, 0) + value
+
+    def _counts_copy(self) -> dict:
+        with self._counts_lock:
+            return dict(self.counts)
+
+    def _sample_rss(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self._peak_rss = max(self._peak_rss, _rss_bytes())
+
+    def __enter__(self):
+        self._parent = getattr(_local, "span", None)
+        _local.span = self
+        self._peak_rss = _rss_bytes()
+        self._child_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        self._io = _io_bytes()
+        self._cpu = _cpu_seconds()
+        self._thread_cpu = time.thread_time()
+        self._started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_rss, name=f"rss-{self.name}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._t0
+        self._stop.set()
+        self._sampler.join()
+        peak = max(self._peak_rss, _rss_bytes())
+        child_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if child_maxrss > self._child_maxrss:
+            # ru_maxrss is in KiB on Linux; a child that peaked during this stage
+            # counts towards its footprint.
+            peak = max(peak, child_maxrss * 1024)
+        read, written = _io_bytes()
+        if exc is not None:
+            self.error = str(exc)
+        self.record = {
+            "stage": self.name,
+            "started_at": self._started_at,
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(_cpu_seconds() - self._cpu, 6),
+            "thread_cpu_seconds": round(time.thread_time() - self._thread_cpu, 6),
+            "peak_rss_bytes": peak,
+            "bytes_read": read - self._io[0],
+            "bytes_written": written - self._io[1],
+            "counts": self._counts_copy(),
+            "cached": self.cached,
+            "error": self.error,
+        }
+        _local.span = self._parent
+        return False
+
+
+def count(item: str, value=1):
+    """
+    Add an item count (frames, segments, characters, ...) to the stage running on this thread.
+    No-op outside a traced stage.
+    """
+    span = getattr(_local, "span", None)
+    if span is not None:
+        span.count(item, value)
+
+
+def carry_span(func):
+    """
+    Wrap func so that its counts go to the stage running on the calling thread
+    when it runs on another one, e.g. a pool a stage hands its work to.
+    """
+    span = getattr(_local, "span", None)
+
+    def run(*args, **kwargs):
+        parent = getattr(_local, "span", None)
+        _local.span = span
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.span = parent
+
+    return run
+
+
+def run_traced(name, func, *args):
+    """
+    Call func(*args) inside a Span. Returns (result, span record); module level so it
+    can be submitted to a process pool.
+    """
+    span = Span(name)
+    try:
+        with span:
+            result = func(*args)
+    except Exception as e:
+        e.span_record = span.record
+        raise
+    return result, span.record
+
+
+class JobTrace:
+    """
+    Per-job collection of stage records, written as JSON and as a Prometheus text file.
+    """
+
+    def __init__(self, job_id: str, **attrs):
+        self.job_id = job_id
+        self.attrs = attrs
+        self.created_at = time.time()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self._lock:
+            self.stages.append(record)
+
+    def add_cached(self, name: str):
+        """
+        Record a stage that was served from the artifact cache.
+        """
+        self.add({"stage": name, "started_at": time.time(), "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                  "thread_cpu_seconds": 0.0, "peak_rss_bytes": 0, "bytes_read": 0, "bytes_written": 0,
+                  "counts": {}, "cached": True, "error": ""})
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = list(self.stages)
+        return {
+            "job_id": self.job_id,
+            "attrs": self.attrs,
+            "created_at": self.created_at,
+            "wall_seconds": round(time.time() - self.created_at, 6),
+            "stages": stages,
+        }
+
+    def write_json(self, path: str) -> str:
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2))
+        logger.info(f"Trace written to {path}")
+        return path
+
+    def write_prometheus(self, path: str) -> str:
+        """
+        Write the stage metrics in Prometheus text exposition format, e.g. for
+        node_exporter's textfile collector.
+        """
+        metrics = [
+            ("wall_seconds", "Wall-clock time of the stage."),
+            ("cpu_seconds", "Process CPU time (including children) while the stage ran."),
+            ("thread_cpu_seconds", "CPU time of the thread that ran the stage."),
+            ("peak_rss_bytes", "Peak resident set size while the stage ran."),
+            ("bytes_read", "Bytes read by the process while the stage ran."),
+            ("bytes_written", "Bytes written by the process while the stage ran."),
+        ]
+        stages = self.to_dict()["stages"]
+        lines = []
+        for metric, help_text in metrics:
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for record in stages:
+                lines.append(f"{name}{self._labels(record)} {record[metric]}")
+        name = f"{METRIC_PREFIX}_items"
+        lines.append(f"# HELP {name} Items processed by the stage (frames, segments, characters, ...).")
+        lines.append(f"# TYPE {name} gauge")
+        for record in stages:
+            for item, value in sorted(record["counts"].items()):
+                lines.append(f"{name}{self._labels(record, item=item)} {value}")
+        name = f"{METRIC_PREFIX}_cached"
+        lines.append(f"# HELP {name} 1 if the stage was served from the artifact cache.")
+        lines.append(f"# TYPE {name} gauge")
+        for record in stages:
+            lines.append(f"{name}{self._labels(record)} {int(record['cached'])}")
+        _atomic_write(path, "\n".join(lines) + "\n")
+        logger.info(f"Metrics written to {path}")
+        return path
+
+    def _labels(self, record, **extra):
+        labels = {"job": self.job_id, "stage": record["stage"], **extra}
+        body = ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in labels.items())
+        return "{" + body + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _atomic_write(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
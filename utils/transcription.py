@@ -1,44 +1,152 @@
 import logging
-import os
-import tempfile
-from moviepy.editor import VideoFileClip
+from config import settings
+from utils import media, tracing, vad
+from utils.model_registry import get_whisper_registry
 
 logger = logging.getLogger(__name__)
 
-def transcribe_audio(video_path: str):
+def transcribe_audio(video_path: str, model_name: str = "", audio=None, use_vad=None, backend: str = ""):
     """
     Transcribe English speech from video using Whisper.
+    model_name: Whisper model size, defaults to settings.WHISPER_MODEL.
+    audio: optional 16 kHz mono float32 array of the video's soundtrack
+           (e.g. media.MediaSource.audio()); otherwise it is decoded in memory
+           with media.load_audio.
+    use_vad: skip non-speech and decode the speech chunks in batches
+             (see iter_segments); defaults to settings.WHISPER_VAD.
+    backend: inference backend (see whisper_backends.BACKENDS); defaults to settings.WHISPER_BACKEND.
     Returns transcript (str) and segments (list of dicts with 'start', 'end', 'text').
     """
     try:
-        # Try to import whisper
-        try:
-            import whisper
-        except ImportError as e:
-            logger.error(f"Whisper import failed: {e}")
-            return _fallback_transcription(video_path)
-        
-        # Extract audio to a temporary file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-            audio_path = tmp_audio.name
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(audio_path, logger=None)
-
-        # Load Whisper model (use 'base' for speed, 'small' or 'medium' for accuracy)
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path, language="en")
-        transcript = result["text"]
-        segments = result.get("segments", [])
-
-        # Clean up temp audio
-        os.remove(audio_path)
-        logger.info("Transcription complete. Length: %d chars", len(transcript))
-        return transcript, segments
-        
+        segments = list(iter_segments(video_path, model_name, audio, use_vad, backend))
+        return join_segments(segments), segments
     except Exception as e:
         logger.error(f"Transcription failed: {e}")
         return _fallback_transcription(video_path)
 
+
+def join_segments(segments) -> str:
+    return " ".join(seg["text"].strip() for seg in segments).strip()
+
+
+def iter_segments(video_path: str, model_name: str = "", audio=None, use_vad=None, backend: str = ""):
+    """
+    Generator variant of transcribe_audio: yields each segment dict as soon as it
+    is final, so translation and TTS can start on the first sentences while the
+    rest is still being transcribed.
+    With VAD the first speech chunk is decoded alone and the rest in batches, and
+    the shared model is only held for one batch at a time. Without VAD all
+    segments arrive together once Whisper is done.
+    Raises RuntimeError when Whisper isn't installed.
+    """
+    try:
+        import whisper
+    except ImportError as e:
+        # No placeholder here: the pipeline would cache it and dub it as the real transcript.
+        raise RuntimeError(f"Whisper import failed: {e}") from e
+
+    if audio is None:
+        # Pipe the soundtrack straight into a 16 kHz float32 array: no temp
+        # file, and Whisper doesn't decode it a second time.
+        audio = media.load_audio(video_path)
+
+    # Shared Whisper model (use 'base' for speed, 'small' or 'medium' for accuracy),
+    # loaded once per process by the registry.
+    registry = get_whisper_registry()
+    model_name = model_name or settings.WHISPER_MODEL
+    backend = backend or settings.WHISPER_BACKEND
+    count = characters = 0
+    if not (settings.WHISPER_VAD if use_vad is None else use_vad):
+        with registry.use(model_name, backend=backend) as model:
+            result = model.transcribe(audio, language="en")
+        for seg in result.get("segments", []):
+            count += 1
+            characters += len(seg["text"])
+            yield seg
+    else:
+        sr = media.WHISPER_SAMPLE_RATE
+        chunks = vad.speech_chunks(audio, sr)
+        tracing.count("speech_seconds", round(sum(e - s for s, e in chunks) / sr, 3))
+        batch_size = settings.WHISPER_BATCH_SIZE
+        # A batch of one first, for the shortest time to the first segment.
+        batches = [chunks[:1]] + [chunks[i:i + batch_size] for i in range(1, len(chunks), batch_size)]
+        for batch in batches:
+            if not batch:
+                continue
+            with registry.use(model_name, backend=backend) as model:
+                segments = decode_speech_chunks(model, audio, batch)
+            for seg in segments:
+                seg["id"] = count
+                count += 1
+                characters += len(seg["text"])
+                yield seg
+    tracing.count("segments", count)
+    tracing.count("characters", characters)
+    logger.info("Transcription complete. %d segments, %d chars", count, characters)
+
+
+def decode_speech_chunks(model, audio, chunks):
+    """
+    Decode speech chunks (sample ranges of audio, at most one Whisper window each)
+    in one batched forward pass.
+    Returns segments with 'start'/'end' on the original timeline.
+    """
+    import torch
+    import whisper
+
+    sr = media.WHISPER_SAMPLE_RATE
+    tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                                language="en", task="transcribe")
+    options = whisper.DecodingOptions(language="en", without_timestamps=False,
+                                      fp16=model.device.type == "cuda")
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio[s:e]), model.dims.n_mels)
+        for s, e in chunks
+    ]).to(model.device)
+    with torch.no_grad():
+        results = model.decode(mel, options)
+    segments = []
+    for (start, end), result in zip(chunks, results):
+        # Whisper's own rule for windows that hold no speech.
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+            continue
+        for seg_start, seg_end, text in _split_timestamps(result.tokens, tokenizer, (end - start) / sr):
+            segments.append({
+                "start": round(start / sr + seg_start, 3),
+                "end": round(start / sr + seg_end, 3),
+                "text": text,
+            })
+    return segments
+
+
+def _split_timestamps(tokens, tokenizer, duration):
+    """
+    Cut a decoded token sequence at its timestamp tokens.
+    Yields (start, end, text) in seconds relative to the window.
+    """
+    start = None
+    text_tokens = []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = min((token - tokenizer.timestamp_begin) * 0.02, duration)
+            if start is None:
+                start = t
+            elif text_tokens:
+                text = tokenizer.decode(text_tokens).strip()
+                if text:
+                    yield start, t, text
+                text_tokens = []
+                start = None
+            else:
+                start = t
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    if text_tokens:
+        text = tokenizer.decode(text_tokens).strip()
+        if text:
+            yield start or 0.0, duration, text
+
+
 def _fallback_transcription(video_path: str):
     """
     Fallback transcription method when Whisper is not available.
@@ -50,13 +158,10 @@ def _fallback_transcription(video_path: str):
 def extract_audio_only(video_path: str):
     """
     Extract audio from video without transcription.
-    Returns the path to the extracted audio file.
+    Returns the path to the extracted audio file (16 kHz mono WAV).
     """
     try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-            audio_path = tmp_audio.name
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(audio_path, logger=None)
+        audio_path = media.extract_wav(video_path)
         logger.info(f"Audio extracted to {audio_path}")
         return audio_path
     except Exception as e:
@@ -1,25 +1,368 @@
 import logging
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import settings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+from utils import tracing
+from utils.http_backends import GeminiREST
+from utils.llm_client import LLMClient, RateLimiter
+from utils.translation_memory import get_translation_memory
 
 logger = logging.getLogger(__name__)
 
-def translate_text(text: str, target_lang: str = "fr") -> str:
+_NUMBERED_RE = re.compile(r"^\s*(\d+)\s*[:.)]\s*(.*)$")
+_SENTENCE_END = (".", "!", "?", "…")
+
+def translate_text(text: str, target_lang: str = "fr", model: str = "") -> str:
     """
-    Translate text to French using LangChain + Gemini 2.0 Flash.
+    Translate text to French using LangChain + Gemini 2.0 Flash, answering from the
+    translation memory when the same text was translated before.
     Returns translated text (str).
     """
+    model = model or settings.TRANSLATION_MODEL
+    memory = get_translation_memory()
+    if memory is not None:
+        remembered = memory.get(text, target_lang, memory_model(model))
+        if remembered is not None:
+            tracing.count("memory_hits")
+            return remembered
+    translated = _translate_uncached(text, target_lang, model)
+    if translated and memory is not None:
+        memory.put(text, target_lang, memory_model(model), translated)
+    return translated
+
+
+def memory_model(model: str) -> str:
+    """
+    The model name translations are remembered under: qualified with
+    settings.TRANSLATION_BACKEND, so replies of one backend (e.g. the benchmark
+    stub) are never served for another.
+    """
+    return f"{settings.TRANSLATION_BACKEND}/{model}"
+
+
+def _translate_uncached(text: str, target_lang: str, model: str) -> str:
     try:
         if not settings.GOOGLE_API_KEY:
             logger.error("GOOGLE_API_KEY not set in environment.")
             return ""
-        llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=settings.GOOGLE_API_KEY)
         prompt = f"Translate the following text to {target_lang} (French):\n{text}"
-        response = llm([HumanMessage(content=prompt)])
-        translated = response.content.strip()
+        translated = _ask(prompt, model)
+        tracing.count("characters", len(text))
+        tracing.count("output_characters", len(translated))
         logger.info("Translation complete. Length: %d chars", len(translated))
         return translated
     except Exception as e:
         logger.error(f"Translation failed: {e}")
-        return "" 
\ No newline at end of file
+        return ""
+
+
+def gemini_llm(model: str):
+    """
+    The LangChain Gemini chat model. With settings.GEMINI_API_ENDPOINT set, requests
+    go to that URL over REST instead, e.g. the local stand-in in benchmarks/llm_server.py.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    kwargs = {}
+    if settings.GEMINI_API_ENDPOINT:
+        kwargs = {"client_options": {"api_endpoint": settings.GEMINI_API_ENDPOINT}, "transport": "rest"}
+    return ChatGoogleGenerativeAI(model=model, google_api_key=settings.GOOGLE_API_KEY,
+                                  timeout=settings.TRANSLATION_TIMEOUT, max_retries=0, **kwargs)
+
+
+def gemini_rest_llm(model: str):
+    """
+    Gemini over plain HTTP (utils.http_backends), without the LangChain and
+    Google client libraries; honours settings.GEMINI_API_ENDPOINT the same way.
+    """
+    return GeminiREST(model, settings.GOOGLE_API_KEY, settings.GEMINI_API_ENDPOINT,
+                      timeout=settings.TRANSLATION_TIMEOUT)
+
+
+# settings.TRANSLATION_BACKEND -> factory(model) returning a chat model whose
+# invoke(prompt) returns an object with .content. Add entries to plug in others.
+LLM_BACKENDS = {
+    "gemini": gemini_llm,
+    "gemini-rest": gemini_rest_llm,
+}
+
+
+def make_llm(model: str = ""):
+    """
+    Build the chat model of settings.TRANSLATION_BACKEND (see LLM_BACKENDS).
+    Retries and deadlines are left to LLMClient.
+    """
+    backend = settings.TRANSLATION_BACKEND
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown TRANSLATION_BACKEND {backend!r}; expected one of {', '.join(LLM_BACKENDS)}")
+    return LLM_BACKENDS[backend](model or settings.TRANSLATION_MODEL)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_clients_pid = None
+_limiter = None
+
+
+def get_llm_client(model: str = "") -> LLMClient:
+    """
+    Process-wide client per backend and model, so connections are reused across
+    requests and jobs, sharing one limiter for settings.TRANSLATION_REQUESTS_PER_MINUTE.
+    """
+    global _limiter, _clients_pid
+    model = model or settings.TRANSLATION_MODEL
+    key = (settings.TRANSLATION_BACKEND, model)
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            # A forked chunk worker inherits the clients but not their event loop threads.
+            _clients.clear()
+            _limiter = None
+            _clients_pid = os.getpid()
+        if _limiter is None:
+            _limiter = RateLimiter(settings.TRANSLATION_REQUESTS_PER_MINUTE)
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = LLMClient(make_llm(model), timeout=settings.TRANSLATION_TIMEOUT,
+                                               retries=settings.TRANSLATION_RETRIES,
+                                               backoff=settings.TRANSLATION_BACKOFF,
+                                               hedge_after=settings.TRANSLATION_HEDGE_SECONDS, limiter=_limiter)
+        return client
+
+
+def _ask(prompt: str, model: str = "") -> str:
+    return get_llm_client(model).complete(prompt)
+
+
+def group_segments(segments, min_chars: int):
+    """
+    Join consecutive segments into groups of at least min_chars that end on a
+    sentence boundary, e.g. translated segments into sentences for TTS.
+    Yields {'start', 'end', 'text'} as soon as a group is complete.
+    """
+    group = []
+    for seg in segments:
+        group.append(seg)
+        text = " ".join(s["text"].strip() for s in group).strip()
+        if len(text) >= min_chars and text.endswith(_SENTENCE_END):
+            yield {"start": group[0]["start"], "end": group[-1]["end"], "text": text}
+            group = []
+    if group:
+        text = " ".join(s["text"].strip() for s in group).strip()
+        if text:
+            yield {"start": group[0]["start"], "end": group[-1]["end"], "text": text}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of English or French text (about 4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+def pack_segments(segments, min_chars: int, max_tokens: int):
+    """
+    Pack a (possibly still growing) iterable of transcript segments into batches
+    for translate_batch. A batch is closed once it holds at least min_chars and
+    ends on a sentence boundary, or when the next segment would take it over
+    max_tokens. The first segment goes out alone, so translation starts as soon
+    as Whisper produces anything. Yields lists of segments.
+    """
+    batch, chars, tokens = [], 0, 0
+    first = True
+    for seg in segments:
+        text = seg["text"].strip()
+        if not text:
+            continue
+        if batch and tokens + estimate_tokens(text) > max_tokens:
+            yield batch
+            batch, chars, tokens = [], 0, 0
+        batch.append(seg)
+        chars += len(text)
+        tokens += estimate_tokens(text)
+        if first or (chars >= min_chars and text.endswith(_SENTENCE_END)):
+            yield batch
+            batch, chars, tokens = [], 0, 0
+            first = False
+    if batch:
+        yield batch
+
+
+def _parse_numbered(reply: str, count: int):
+    lines = {}
+    for line in reply.splitlines():
+        match = _NUMBERED_RE.match(line)
+        if match:
+            lines[int(match.group(1))] = match.group(2).strip()
+    if sorted(lines) != list(range(1, count + 1)) or not all(lines.values()):
+        return None
+    return [lines[n] for n in range(1, count + 1)]
+
+
+def translate_batch(texts, target_lang: str = "fr", model: str = "",
+                    context: str = "consecutive parts of one transcript"):
+    """
+    Translate consecutive transcript lines in one request, as numbered lines so
+    each translation can be matched back to its segment. Lines found in the
+    translation memory are not sent. If the reply doesn't have one line per
+    input, the lines are translated one by one instead.
+    context: what the lines are, for the prompt.
+    Returns list of translations. Raises RuntimeError on failure.
+    """
+    model = model or settings.TRANSLATION_MODEL
+    memory = get_translation_memory()
+    translations = [memory.get(text, target_lang, memory_model(model)) if memory is not None else None
+                    for text in texts]
+    missing = [i for i, translated in enumerate(translations) if translated is None]
+    tracing.count("memory_hits", len(texts) - len(missing))
+    if not missing:
+        return translations
+    if not settings.GOOGLE_API_KEY:
+        raise RuntimeError("GOOGLE_API_KEY not set in environment.")
+    sources = [texts[i] for i in missing]
+    if len(sources) > 1:
+        numbered = "\n".join(f"{n}: {' '.join(text.split())}" for n, text in enumerate(sources, 1))
+        prompt = (f"Translate each numbered line below to {target_lang} (French). The lines are {context}. "
+                  f"Reply with exactly one line per number, formatted \"<number>: <translation>\", "
+                  f"and nothing else.\n{numbered}")
+        try:
+            reply = _ask(prompt, model)
+        except Exception as e:
+            raise RuntimeError(e) from e
+        translated = _parse_numbered(reply, len(sources))
+        if translated is None:
+            logger.warning(f"Batch reply didn't match its {len(sources)} lines; translating them one by one")
+        else:
+            tracing.count("characters", sum(len(text) for text in sources))
+            tracing.count("output_characters", sum(len(text) for text in translated))
+    else:
+        translated = None
+    if translated is None:
+        translated = [_translate_uncached(text, target_lang, model) for text in sources]
+        if not all(translated):
+            raise RuntimeError("empty translation")
+    for i, text in zip(missing, translated):
+        translations[i] = text
+        if memory is not None:
+            memory.put(texts[i], target_lang, memory_model(model), text)
+    return translations
+
+
+def _translate_packed(batch, target_lang, model):
+    translations = translate_batch([seg["text"].strip() for seg in batch], target_lang, model)
+    return [
+        {"start": seg["start"], "end": seg["end"], "source": seg["text"].strip(), "text": text}
+        for seg, text in zip(batch, translations)
+    ]
+
+
+def translate_segments(segments, target_lang: str = "fr", model: str = "", min_chars: int = 0,
+                       max_tokens: int = 0, workers: int = 0):
+    """
+    Translate a (possibly still growing) iterable of transcript segments, keeping
+    Whisper's timing: segments are packed into batches (see pack_segments), up to
+    `workers` batches are in flight at once, and the results come back in order.
+    Yields {'start', 'end', 'source', 'text'} per segment; list() it for the whole
+    translated transcript. Raises RuntimeError if a batch can't be translated.
+    min_chars, max_tokens and workers default to settings.TRANSLATION_MIN_CHARS,
+    TRANSLATION_BATCH_TOKENS and TRANSLATION_WORKERS.
+    """
+    workers = workers or settings.TRANSLATION_WORKERS
+    batches = pack_segments(segments, min_chars or settings.TRANSLATION_MIN_CHARS,
+                            max_tokens or settings.TRANSLATION_BATCH_TOKENS)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+    submitted = queue.Queue()
+    # Batches submitted but not yet handed on: at most one queued per worker.
+    slots = threading.Semaphore(2 * workers)
+    stop = threading.Event()
+    # Counts (characters, memory hits) made on the pool threads go to the calling stage.
+    translate_packed = tracing.carry_span(_translate_packed)
+
+    def feed():
+        # Reads the transcript on its own thread, so finished translations are
+        # handed on while the next segments are still being transcribed.
+        try:
+            for batch in batches:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                submitted.put((batch, executor.submit(translate_packed, batch, target_lang, model)))
+            submitted.put(None)
+        except BaseException as e:
+            submitted.put(e)
+
+    feeder = threading.Thread(target=feed, name="translate-feed", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            item = submitted.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from _batch_result(*item)
+            slots.release()
+    finally:
+        stop.set()
+        slots.release()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _batch_result(batch, future):
+    try:
+        return future.result()
+    except Exception as e:
+        raise RuntimeError(f"Translation of segment at {batch[0]['start']}s failed: {e}") from e
+
+
+def _screen_text_key(text: str) -> str:
+    # OCR of the same caption varies in spacing, case and stray punctuation.
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split()).casefold()
+
+
+def translate_screen_text(ocr_results, frame_interval: float = 1.0, target_lang: str = "fr", model: str = "",
+                          max_tokens: int = 0):
+    """
+    Translate on-screen text found by ocr.detect_english_text_frames.
+    The detected strings are normalized and deduplicated, so each distinct text
+    is translated once (or comes from the translation memory), in as few
+    batched requests as max_tokens (default settings.TRANSLATION_BATCH_TOKENS)
+    allows; the number of calls depends on the distinct text, not the video length.
+    Consecutive sampled frames showing the same text become one subtitle.
+    Returns list of (start, end, translated text) in seconds.
+    Raises RuntimeError if a batch can't be translated.
+    """
+    spans = []
+    variants = {}
+    for frame_idx, text in ocr_results:
+        text = " ".join(text.split())
+        key = _screen_text_key(text)
+        if len(key.replace(" ", "")) < 2:
+            continue
+        counts = variants.setdefault(key, {})
+        counts[text] = counts.get(text, 0) + 1
+        if spans and spans[-1][2] == key and spans[-1][1] == frame_idx:
+            spans[-1][1] = frame_idx + 1
+        else:
+            spans.append([frame_idx, frame_idx + 1, key])
+
+    # Translate the most common spelling of each distinct text.
+    keys = list(variants)
+    sources = [max(variants[key], key=variants[key].get) for key in keys]
+    translated = {}
+    max_tokens = max_tokens or settings.TRANSLATION_BATCH_TOKENS
+    batch, tokens = [], 0
+    for i, source in enumerate(sources + [None]):
+        if source is None or (batch and tokens + estimate_tokens(source) > max_tokens):
+            texts = [sources[j] for j in batch]
+            for j, text in zip(batch, translate_batch(texts, target_lang, model,
+                                                      context="separate pieces of on-screen text from one video")):
+                translated[keys[j]] = text
+            batch, tokens = [], 0
+        if source is not None:
+            batch.append(i)
+            tokens += estimate_tokens(source)
+    tracing.count("distinct_texts", len(keys))
+    logger.info(f"Translated {len(keys)} distinct on-screen texts from {len(ocr_results)} OCR frames")
+    return [(start * frame_interval, end * frame_interval, translated[key]) for start, end, key in spans]
@@ -0,0 +1,199 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import settings
+from utils.cache import store_best_effort
+
+logger = logging.getLogger(__name__)
+
+# Hits only bump last_used in memory; the times are written once this many entries
+# have been hit or this many seconds have passed, so a hit costs no write of its own.
+TOUCH_BATCH = 100
+TOUCH_INTERVAL = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    source TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    model TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (source, target_lang, model)
+);
+CREATE INDEX IF NOT EXISTS memory_normalized ON memory (normalized, target_lang, model);
+CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used);
+"""
+
+
+def normalize(text: str) -> str:
+    """
+    Source text as matched by the memory: whitespace collapsed, case folded.
+    """
+    return " ".join(text.split()).casefold()
+
+
+class TranslationMemory:
+    """
+    Persistent store of past translations in SQLite, keyed on source text, target
+    language and model. A lookup tries the exact source first, then the
+    whitespace/case-normalized one. Entries are evicted least-recently-used first
+    once the stored text exceeds max_bytes; recency is recorded in batches (see
+    TOUCH_BATCH), so it is only as fresh as the last flush. Safe to share between
+    threads and between processes using the same file.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._flushed = time.monotonic()
+        self.pid = os.getpid()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL lets chunk worker processes read while one of them writes; with
+        # synchronous=NORMAL a commit doesn't wait for an fsync.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM memory").fetchone()[0]
+
+    def get(self, source: str, target_lang: str, model: str):
+        """
+        Returns the stored translation, or None on a miss (also when the database
+        can't be read, e.g. it stays locked by another process).
+        """
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT rowid, translation FROM memory "
+                                       "WHERE source=? AND target_lang=? AND model=?",
+                                       (source, target_lang, model)).fetchone()
+                exact = row is not None
+                if not exact:
+                    row = self._db.execute("SELECT rowid, translation FROM memory "
+                                           "WHERE normalized=? AND target_lang=? AND model=? LIMIT 1",
+                                           (normalize(source), target_lang, model)).fetchone()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Translation memory lookup failed: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            if exact:
+                self.exact_hits += 1
+            else:
+                self.normalized_hits += 1
+            self._touched[row[0]] = time.time()
+            due = len(self._touched) >= TOUCH_BATCH or time.monotonic() - self._flushed >= TOUCH_INTERVAL
+        if due:
+            self.flush()
+        return row[1]
+
+    def flush(self):
+        """
+        Write the last-used times of the hits since the previous flush.
+        """
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed = time.monotonic()
+            if not touched:
+                return
+
+            def write():
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.executemany("UPDATE memory SET last_used=? WHERE rowid=?",
+                                         [(used, rowid) for rowid, used in touched.items()])
+                    self._db.execute("COMMIT")
+                except sqlite3.Error:
+                    self._db.execute("ROLLBACK")
+                    raise
+
+            store_best_effort(write, "translation memory last-used times", errors=(sqlite3.Error,))
+
+    def put(self, source: str, target_lang: str, model: str, translation: str):
+        size = len(source.encode("utf-8")) + len(translation.encode("utf-8"))
+
+        def write():
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    # A replaced row no longer takes up its old size.
+                    old = self._db.execute("SELECT size FROM memory WHERE source=? AND target_lang=? AND model=?",
+                                           (source, target_lang, model)).fetchone()
+                    self._db.execute("INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (source, normalize(source), target_lang, model, translation, size, time.time()))
+                    self._db.execute("COMMIT")
+                except sqlite3.Error:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._bytes += size - (old[0] if old else 0)
+
+        if store_best_effort(write, "translation in memory", errors=(sqlite3.Error,)) and self._bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop least-recently-used entries until the stored text fits in max_bytes.
+        """
+        self.flush()
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM memory").fetchone()[0]
+            # Trim to 90% so a full memory doesn't evict on every put.
+            target = int(self.max_bytes * 0.9)
+            if total > self.max_bytes:
+                freed = 0
+                doomed = []
+                for rowid, size in self._db.execute("SELECT rowid, size FROM memory ORDER BY last_used"):
+                    if total - freed <= target:
+                        break
+                    doomed.append((rowid,))
+                    freed += size
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.executemany("DELETE FROM memory WHERE rowid=?", doomed)
+                self._db.execute("COMMIT")
+                total -= freed
+                logger.info(f"Evicted {len(doomed)} translations ({freed} bytes) from the translation memory")
+            self._bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+            hits = self.exact_hits + self.normalized_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._bytes,
+            }
+
+
+_default_memory = None
+_default_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    """
+    Process-wide translation memory configured from settings, or None when it is disabled.
+    """
+    global _default_memory
+    if not settings.TRANSLATION_MEMORY_ENABLED:
+        return None
+    with _default_memory_lock:
+        # A connection must not cross a fork (chunk worker processes): reopen.
+        if _default_memory is None or _default_memory.pid != os.getpid():
+            _default_memory = TranslationMemory(settings.TRANSLATION_MEMORY_PATH,
+                                                settings.TRANSLATION_MEMORY_MAX_BYTES)
+        return _default_memory
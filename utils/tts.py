@@ -1,55 +1,58 @@
-import os, uuid, logging
+import os, uuid, logging, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from config import settings
+from utils import media, tracing
+from utils.http_backends import ElevenLabsREST
+from utils.timeline import Timeline
+from utils.tts_cache import get_tts_cache, make_key
+from utils.voice_catalogue import get_voice_catalogue
 
 logger = logging.getLogger(__name__)
 
-def text_to_speech(text: str, output_folder: str) -> str:
-    api_key = getattr(settings, "ELEVENLABS_API_KEY", None)
-    if not api_key:
-        logger.error("ELEVENLABS_API_KEY not set.")
-        return ""
-
-    try:
-        from elevenlabs.client import ElevenLabs
-        from elevenlabs import save
-    except ImportError as e:
-        logger.error(f"ElevenLabs SDK not found: {e}")
-        return ""
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_22050_32"
+TTS_SAMPLE_RATE = 22050
+# Longest block stream_timeline yields (10 s).
+EMIT_SAMPLES = 10 * TTS_SAMPLE_RATE
 
-    client = ElevenLabs(api_key=api_key)
-    logger.info(f"Generating TTS for {len(text)} chars...")
+def text_to_speech(text: str, output_folder: str, voice_id: str = "") -> str:
+    """
+    Synthesize French speech with ElevenLabs into output_folder.
+    voice_id: ElevenLabs voice to use; empty picks the first French-capable voice.
+    Returns the path to the mp3, or "" on failure.
+    """
+    return text_to_speech_stream([text], output_folder, voice_id)
 
-    try:
-        # List available voices
-        voices_resp = client.voices.get_all()
-        logger.debug(f"Found voices: {[v.name for v in voices_resp.voices]}")
-
-        # Pick first voice supporting French
-        from elevenlabs import Voice
-        french_voice = next(
-            (v for v in voices_resp.voices if any(
-                lang.language.lower().startswith("fr")
-                for lang in getattr(v, "verified_languages", [])
-            )),
-            None
-        )
-        if not french_voice:
-            logger.error("No French-capable voice found.")
-            return ""
 
-        audio_stream = client.text_to_speech.convert(
-            text=text,
-            voice_id=french_voice.voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_22050_32",
-        )
+def text_to_speech_stream(texts, output_folder: str, voice_id: str = "") -> str:
+    """
+    Synthesize an iterable of texts, e.g. translations still arriving from an
+    upstream stage, one after the other into a single mp3. Each text is sent to
+    ElevenLabs as soon as the iterable yields it, and its audio is appended to the
+    file as it streams back.
+    Returns the path to the mp3, or "" on failure.
+    """
+    client, french_voice_id = _client_and_voice(voice_id)
+    if client is None:
+        return ""
 
+    try:
         os.makedirs(output_folder, exist_ok=True)
         filename = f"{uuid.uuid4()}.mp3"
         out_path = os.path.join(output_folder, filename)
 
-        save(audio_stream, out_path)
-        if os.path.isfile(out_path):
+        characters = 0
+        with open(out_path, "wb") as f:
+            for text in texts:
+                logger.info(f"Generating TTS for {len(text)} chars...")
+                for chunk in convert(client, text, french_voice_id):
+                    f.write(chunk)
+                f.flush()
+                characters += len(text)
+        tracing.count("characters", characters)
+        if characters and os.path.isfile(out_path):
             logger.info(f"TTS saved: {out_path}")
             return out_path
         else:
@@ -58,3 +61,209 @@ def text_to_speech(text: str, output_folder: str) -> str:
     except Exception as e:
         logger.error(f"TTS generation failed: {e}")
         return ""
+
+
+def elevenlabs_client(api_key: str):
+    """
+    The ElevenLabs SDK client, talking to settings.ELEVENLABS_API_URL when set.
+    """
+    from elevenlabs.client import ElevenLabs
+    kwargs = {"base_url": settings.ELEVENLABS_API_URL} if settings.ELEVENLABS_API_URL else {}
+    return ElevenLabs(api_key=api_key, **kwargs)
+
+
+def elevenlabs_rest_client(api_key: str):
+    """
+    ElevenLabs over plain HTTP (utils.http_backends), without the SDK.
+    """
+    return ElevenLabsREST(api_key, settings.ELEVENLABS_API_URL)
+
+
+# settings.TTS_BACKEND -> factory(api_key) returning a client with the SDK's
+# voices.get_all() and text_to_speech.convert(). Add entries to plug in others.
+TTS_BACKENDS = {
+    "elevenlabs": elevenlabs_client,
+    "elevenlabs-rest": elevenlabs_rest_client,
+}
+
+
+def make_client(api_key: str):
+    """
+    Build the client of settings.TTS_BACKEND (see TTS_BACKENDS).
+    """
+    backend = settings.TTS_BACKEND
+    if backend not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS_BACKEND {backend!r}; expected one of {', '.join(TTS_BACKENDS)}")
+    return TTS_BACKENDS[backend](api_key)
+
+
+def _client_and_voice(voice_id: str = ""):
+    """
+    The shared ElevenLabs client and the voice to use: voice_id, or the catalogue's
+    French voice. Returns (None, "") after logging the reason when TTS can't run.
+    """
+    api_key = getattr(settings, "ELEVENLABS_API_KEY", None)
+    if not api_key:
+        logger.error("ELEVENLABS_API_KEY not set.")
+        return None, ""
+    try:
+        client = get_client(api_key)
+    except ImportError as e:
+        logger.error(f"ElevenLabs SDK not found: {e}")
+        return None, ""
+    except ValueError as e:
+        logger.error(str(e))
+        return None, ""
+    try:
+        voice_id = voice_id or get_voice_catalogue(client, api_key).voice_for("fr")
+    except Exception as e:
+        logger.error(f"Listing ElevenLabs voices failed: {e}")
+        return None, ""
+    if not voice_id:
+        logger.error("No French-capable voice found.")
+        return None, ""
+    return client, voice_id
+
+
+def convert(client, text: str, voice_id: str):
+    """
+    Yield the encoded audio for text as ElevenLabs streams it, or from the TTS
+    cache (see utils.tts_cache) when the same text was voiced before with the
+    same voice, model and format. Complete responses are added to the cache.
+    """
+    cache = get_tts_cache()
+    key = make_key(text, voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT)
+    if cache is not None:
+        audio = cache.get(key, characters=len(text))
+        if audio is not None:
+            yield audio
+            return
+    chunks = []
+    for chunk in client.text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_OUTPUT_FORMAT,
+    ):
+        chunks.append(chunk)
+        yield chunk
+    if cache is not None:
+        cache.put(key, b"".join(chunks))
+
+
+def synthesize(client, text: str, voice_id: str) -> np.ndarray:
+    """
+    One ElevenLabs request (or cache hit), decoded to mono float32 PCM at TTS_SAMPLE_RATE.
+    """
+    return media.decode_audio(b"".join(convert(client, text, voice_id)), TTS_SAMPLE_RATE)
+
+
+def synthesize_timeline(segments, output_folder: str, voice_id: str = "", duration: float = 0.0,
+                        workers: int = 0) -> str:
+    """
+    Voice translated segments onto one track, see stream_timeline.
+    Returns the path to the mono WAV track, or "" on failure.
+    """
+    out_path = os.path.join(output_folder, f"{uuid.uuid4()}.wav")
+    try:
+        os.makedirs(output_folder, exist_ok=True)
+        for _ in stream_timeline(segments, out_path, voice_id, duration, workers):
+            pass
+    except Exception as e:
+        logger.error(f"TTS generation failed: {e}")
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        return ""
+    return out_path
+
+
+def stream_timeline(segments, out_path: str, voice_id: str = "", duration: float = 0.0, workers: int = 0):
+    """
+    Voice translated segments ({'start', 'end', 'text'}, e.g. still arriving from
+    the translate stage) concurrently, up to `workers` (default settings.TTS_WORKERS)
+    requests at a time, and place each clip at its segment's start on a timeline
+    (see timeline.Timeline) at least `duration` seconds long.
+    Yields the track as mono float32 blocks at TTS_SAMPLE_RATE as soon as each
+    part of it is final, so a consumer can start on the first seconds of speech
+    while the rest is synthesized, and writes them to the WAV at out_path.
+    Raises RuntimeError if TTS can't run or there is nothing to synthesize.
+    """
+    client, french_voice_id = _client_and_voice(voice_id)
+    if client is None:
+        raise RuntimeError("no ElevenLabs client or voice")
+    workers = workers or settings.TTS_WORKERS
+    track = Timeline(TTS_SAMPLE_RATE, duration, settings.TTS_MAX_SPEEDUP)
+    pending = deque()
+    # The last clip waits for the next segment, whose start ends its slot; the
+    # track is final up to where the held clip will go.
+    held = []
+    characters = 0
+
+    def place(segment, clip):
+        if held:
+            track.place(held[1], held[0]["start"], slot_end=segment["start"])
+        held[:] = [segment, clip]
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+    try:
+        with media.open_wav(out_path, TTS_SAMPLE_RATE) as wav:
+            def emit(until=None):
+                # Long stretches (silence, the end of the track) go out in bounded blocks.
+                end = track.length if until is None else int(until * TTS_SAMPLE_RATE)
+                while True:
+                    step = track.taken + EMIT_SAMPLES
+                    block = track.take(step / TTS_SAMPLE_RATE if end > step else until)
+                    if len(block):
+                        media.write_pcm(wav, block)
+                        yield block
+                    if end <= step:
+                        return
+
+            for segment in segments:
+                text = segment["text"].strip()
+                if not text:
+                    continue
+                logger.info(f"Generating TTS for {len(text)} chars at {segment['start']}s...")
+                pending.append((segment, pool.submit(synthesize, client, text, french_voice_id)))
+                characters += len(text)
+                while pending and (pending[0][1].done() or len(pending) > workers):
+                    voiced, clip = _clip_result(*pending.popleft())
+                    place(voiced, clip)
+                    yield from emit(voiced["start"])
+            while pending:
+                voiced, clip = _clip_result(*pending.popleft())
+                place(voiced, clip)
+                yield from emit(voiced["start"])
+            if held:
+                track.place(held[1], held[0]["start"], slot_end=duration if duration > held[0]["start"] else None)
+            if not characters:
+                raise RuntimeError("nothing to synthesize")
+            yield from emit()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    tracing.count("characters", characters)
+    tracing.count("clips_stretched", track.stretched)
+    tracing.count("clips_delayed", track.delayed)
+    logger.info(f"TTS saved: {out_path} ({track.length / TTS_SAMPLE_RATE:.1f}s, "
+                f"{track.stretched} clips sped up, {track.delayed} pushed back)")
+
+
+def _clip_result(segment, future):
+    return segment, future.result()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str):
+    """
+    Long-lived client per backend and API key, so its HTTP connections are reused
+    across requests and jobs. A forked chunk worker builds its own.
+    """
+    key = (settings.TTS_BACKEND, api_key, os.getpid())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = make_client(api_key)
+        return client
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+
+from config import settings
+from utils.cache import store_best_effort
+
+logger = logging.getLogger(__name__)
+
+# Bump to drop every cached clip after a change in how audio is requested.
+TTS_CACHE_VERSION = 1
+
+
+def normalize(text: str) -> str:
+    """
+    Text as keyed by the cache: NFC, whitespace collapsed. Case and punctuation
+    change how a line is spoken, so they are kept.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+    payload = json.dumps({"v": TTS_CACHE_VERSION, "text": normalize(text), "voice_id": voice_id,
+                          "model_id": model_id, "output_format": output_format}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed store of synthesized audio, one file per segment at
+    <root>/<key[:2]>/<key>, keyed by make_key. Least-recently-used clips are
+    evicted once the store exceeds max_bytes. The LRU order is indexed in memory
+    from the files' mtimes when the cache is opened, so lookups never scan the
+    directory; processes sharing the root each keep their own index.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.characters_saved = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> size, least recently used first
+        self._bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _load_index(self):
+        entries = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if shard.startswith(".") or not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                try:
+                    st = os.stat(os.path.join(shard_dir, key))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, key, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def get(self, key: str, characters: int = 0):
+        """
+        The cached audio bytes, or None. characters: length of the text, counted
+        as saved on a hit.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # mark as recently used for other processes
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                if key in self._index:
+                    # Evicted by another process.
+                    self._bytes -= self._index.pop(key)
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(audio)
+            self.characters_saved += characters
+            if key not in self._index:
+                self._bytes += len(audio)
+            self._index[key] = len(audio)
+            self._index.move_to_end(key)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        path = self._path(key)
+        tmp = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+
+        def cleanup():
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        if not store_best_effort(write, f"TTS audio {key[:12]}", cleanup=cleanup):
+            return
+        with self._lock:
+            self._bytes += len(audio) - self._index.get(key, 0)
+            self._index[key] = len(audio)
+            self._index.move_to_end(key)
+        self.evict()
+
+    def evict(self):
+        """
+        Drop least-recently-used clips until the store is back under 90% of
+        max_bytes, so eviction doesn't run again on every put.
+        """
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return
+            while self._index and self._bytes > self.max_bytes * 0.9:
+                key, size = self._index.popitem(last=False)
+                self._bytes -= size
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            logger.info(f"Evicted TTS clips down to {self._bytes} bytes")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "characters_saved": self.characters_saved,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """
+    Process-wide TTS cache configured from settings, or None when it is disabled.
+    """
+    global _default_cache
+    if not settings.TTS_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.root != settings.TTS_CACHE_DIR:
+            _default_cache = TTSCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES)
+        return _default_cache
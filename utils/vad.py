@@ -0,0 +1,91 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.03
+# Speech must be this far above the noise floor (10th percentile frame energy) ...
+THRESHOLD_DB = 12.0
+# ... and above this absolute level, so near-silent recordings aren't all "speech".
+MIN_LEVEL_DB = -50.0
+MIN_SPEECH_SECONDS = 0.25
+MIN_SILENCE_SECONDS = 0.3
+PAD_SECONDS = 0.2
+# Whisper's input window.
+MAX_CHUNK_SECONDS = 30.0
+
+
+def frame_energy_db(audio: np.ndarray, sr: int, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """
+    RMS level of consecutive frames in dBFS.
+    """
+    hop = max(1, int(sr * frame_seconds))
+    n = len(audio) // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n * hop].reshape(n, hop).astype(np.float32)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_regions(audio: np.ndarray, sr: int):
+    """
+    Energy-based voice activity detection.
+    Returns list of (start, end) sample offsets of speech, padded by PAD_SECONDS,
+    with pauses shorter than MIN_SILENCE_SECONDS bridged and blips shorter than
+    MIN_SPEECH_SECONDS dropped. Loud non-speech (music) counts as speech; Whisper
+    then returns little or no text for it.
+    """
+    energy = frame_energy_db(audio, sr)
+    if not len(energy):
+        return []
+    threshold = max(np.percentile(energy, 10) + THRESHOLD_DB, MIN_LEVEL_DB)
+    active = energy > threshold
+
+    hop = int(sr * FRAME_SECONDS)
+    min_silence = int(MIN_SILENCE_SECONDS / FRAME_SECONDS)
+    min_speech = int(MIN_SPEECH_SECONDS / FRAME_SECONDS)
+    pad = int(PAD_SECONDS * sr)
+
+    # Edges of runs of active frames.
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    runs = list(zip(edges[::2], edges[1::2]))
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        s, e = max(0, start * hop - pad), min(len(audio), end * hop + pad)
+        if regions and s <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], e)
+        else:
+            regions.append((s, e))
+    return regions
+
+
+def speech_chunks(audio: np.ndarray, sr: int, max_seconds: float = MAX_CHUNK_SECONDS):
+    """
+    Group speech regions into contiguous chunks of at most max_seconds, so every
+    chunk fills one Whisper window and the non-speech between chunks is skipped.
+    Returns list of (start, end) sample offsets.
+    """
+    limit = int(max_seconds * sr)
+    chunks = []
+    for start, end in speech_regions(audio, sr):
+        if chunks and end - chunks[-1][0] <= limit:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        # A region longer than the window is cut into window-sized pieces.
+        while end - start > limit:
+            chunks.append((start, start + limit))
+            start += limit
+        chunks.append((start, end))
+    speech = sum(e - s for s, e in chunks)
+    logger.info(f"VAD: {len(chunks)} chunks, {speech / sr:.1f}s of {len(audio) / sr:.1f}s kept")
+    return chunks
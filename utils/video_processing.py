@@ -1,19 +1,16 @@
 import logging
-import tempfile
 import os
-from moviepy.editor import VideoFileClip, AudioFileClip
+from config import settings
+from utils import media, tracing
 
 logger = logging.getLogger(__name__)
 
 def extract_audio(video_path):
     """
-    Extract audio from video and return path to temporary audio file (wav).
+    Extract audio from video and return path to temporary audio file (16 kHz mono wav).
     """
     try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-            audio_path = tmp_audio.name
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(audio_path, logger=None)
+        audio_path = media.extract_wav(video_path)
         logger.info(f"Audio extracted to {audio_path}")
         return audio_path
     except Exception as e:
@@ -43,4 +40,132 @@ def replace_audio(video_path, new_audio_path, output_path):
         return output_path
     except Exception as e:
         logger.error(f"Audio replacement failed: {e}")
-        return "" 
\ No newline at end of file
+        return "" 
+
+def subtitles_filter(srt_path):
+    # The subtitles filter takes a filter-graph argument, so ':' , '\' and quotes
+    # in the path have to be escaped.
+    escaped = srt_path.replace("\\", "\\\\").replace(":", "\\:").replace("'", "\\'")
+    return f"subtitles='{escaped}'"
+
+
+def render_final(frames, fps, audio_path, output_path, srt_path="", pad_audio=False):
+    """
+    Encode the deliverable in one ffmpeg pass: raw BGR frames on stdin, the dubbed
+    audio muxed in and, if srt_path is given, subtitles burned in the same filter graph.
+    frames: iterable of BGR numpy arrays (or media.Frame).
+    audio_path: "" encodes the video alone, for mux_audio to add the audio once it is complete.
+    pad_audio: pad the audio with silence so the output keeps every frame, as chunks
+               that are concatenated afterwards must.
+    Returns output_path, or "" on failure.
+    """
+    try:
+        import subprocess
+        frames = iter(frames)
+        first = next(frames, None)
+        if first is None:
+            logger.error("Final render failed: no frames to encode")
+            return ""
+        first = getattr(first, "image", first)
+        height, width = first.shape[:2]
+
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps}", "-i", "pipe:0",
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+        if srt_path:
+            command += ["-vf", subtitles_filter(srt_path)]
+        if pad_audio and audio_path:
+            command += ["-af", "apad"]
+        command += [
+            "-c:v", "libx264", "-preset", settings.RENDER_PRESET, "-crf", str(settings.RENDER_CRF),
+            "-pix_fmt", "yuv420p",
+        ]
+        if audio_path:
+            command += ["-c:a", "aac", "-shortest"]
+        command += ["-movflags", "+faststart", output_path]
+        logger.info(f"Rendering final video: {' '.join(command)}")
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        count = 0
+        try:
+            proc.stdin.write(first.tobytes())
+            count = 1
+            for frame in frames:
+                proc.stdin.write(getattr(frame, "image", frame).tobytes())
+                count += 1
+        except BrokenPipeError:
+            # -shortest stops ffmpeg once the audio ends; the remaining frames aren't needed.
+            pass
+        finally:
+            if hasattr(frames, "close"):
+                # Release the upstream decode pass even if ffmpeg stopped early.
+                frames.close()
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+        tracing.count("frames", count)
+        logger.info(f"Final video ({count} frames) saved at {output_path}")
+        return output_path
+    except Exception as e:
+        logger.error(f"Final render failed: {e}")
+        return ""
+
+
+def mux_audio(video_path, audio_path, output_path, pad_audio=False):
+    """
+    Add the dubbed audio to a video-only render, copying the video stream.
+    Like render_final, the output ends with the shorter of the two unless pad_audio.
+    Returns output_path, or "" on failure.
+    """
+    try:
+        import subprocess
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", video_path, "-i", audio_path,
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", "-c:a", "aac",
+        ]
+        if pad_audio:
+            command += ["-af", "apad"]
+        command += ["-shortest", "-movflags", "+faststart", output_path]
+        subprocess.run(command, check=True)
+        return output_path
+    except Exception as e:
+        logger.error(f"Muxing the audio failed: {e}")
+        return ""
+
+
+def concat_videos(paths, output_path):
+    """
+    Join clips encoded with identical settings (see render_final) into one file
+    with ffmpeg's concat demuxer, copying the streams instead of re-encoding.
+    Returns output_path, or "" on failure.
+    """
+    list_path = f"{output_path}.txt"
+    try:
+        import subprocess
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-c", "copy", "-movflags", "+faststart",
+            output_path,
+        ]
+        logger.info(f"Concatenating {len(paths)} clips into {output_path}")
+        subprocess.run(command, check=True)
+        return output_path
+    except Exception as e:
+        logger.error(f"Concatenation failed: {e}")
+        return ""
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
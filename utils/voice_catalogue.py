@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _voice_record(voice) -> dict:
+    return {
+        "voice_id": voice.voice_id,
+        "name": voice.name,
+        "languages": [lang.language.lower() for lang in getattr(voice, "verified_languages", None) or []],
+    }
+
+
+class VoiceCatalogue:
+    """
+    The ElevenLabs voice list, persisted as JSON at path so it is fetched once per
+    ttl rather than once per TTS call, plus the voice resolved for each language.
+    A stale catalogue keeps answering while a background thread refreshes it; on a
+    cold start one caller fetches the list and concurrent ones wait for it.
+    """
+
+    def __init__(self, client, path: str, ttl: float):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.fetches = 0
+        self._data = {"fetched_at": 0.0, "voices": [], "resolved": {}}
+        self._lock = threading.Lock()
+        # Held while the voice list is fetched, so only one request is in flight.
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save the voice catalogue: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @staticmethod
+    def _resolve(voices, language: str) -> str:
+        # First voice verified for the language, as the API lists them.
+        voice = next((v for v in voices if any(lang.startswith(language) for lang in v["languages"])), None)
+        return voice["voice_id"] if voice else ""
+
+    def refresh(self):
+        """
+        Fetch the voice list and re-resolve every language resolved so far.
+        """
+        with self._fetch_lock:
+            self._fetch()
+
+    def _fetch(self):
+        voices = [_voice_record(v) for v in self.client.voices.get_all().voices]
+        logger.debug(f"Found voices: {[v['name'] for v in voices]}")
+        with self._lock:
+            self.fetches += 1
+            resolved = {lang: self._resolve(voices, lang) for lang in self._data["resolved"]}
+            self._data = {"fetched_at": time.time(), "voices": voices, "resolved": resolved}
+            self._save()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Voice catalogue refresh failed, keeping the old one: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="voice-catalogue", daemon=True).start()
+
+    def voice_for(self, language: str = "fr") -> str:
+        """
+        voice_id of the first voice verified for language, or "" if there is none.
+        """
+        language = language.lower()
+        with self._lock:
+            fetched = bool(self._data["voices"])
+            stale = time.time() - self._data["fetched_at"] > self.ttl
+        if not fetched:
+            with self._fetch_lock:
+                # Another caller (or the background refresh) may have fetched it meanwhile.
+                with self._lock:
+                    fetched = bool(self._data["voices"])
+                if not fetched:
+                    self._fetch()
+        elif stale:
+            self._refresh_in_background()
+        with self._lock:
+            resolved = self._data["resolved"]
+            if language not in resolved:
+                resolved[language] = self._resolve(self._data["voices"], language)
+                self._save()
+            return resolved[language]
+
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
+
+def get_voice_catalogue(client, api_key: str) -> VoiceCatalogue:
+    """
+    Process-wide catalogue per API key (each account sees its own voices), stored
+    under settings.VOICE_CATALOGUE_DIR.
+    """
+    account = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    with _catalogues_lock:
+        catalogue = _catalogues.get(account)
+        if catalogue is None:
+            path = os.path.join(settings.VOICE_CATALOGUE_DIR, f"voices-{account}.json")
+            catalogue = _catalogues[account] = VoiceCatalogue(client, path, settings.VOICE_CATALOGUE_TTL)
+        catalogue.client = client
+        return catalogue
@@ -0,0 +1,98 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# torch: the stock fp32 model.
+# int8: Linear layers dynamically quantized to int8 (weights int8, activations
+#       quantized on the fly); roughly 2-3x faster matmuls on x86/ARM CPUs.
+# torchscript: the audio encoder traced and frozen with TorchScript (the decoder,
+#       which needs Whisper's kv-cache hooks, stays eager).
+# int8-torchscript: both.
+BACKENDS = ("torch", "int8", "torchscript", "int8-torchscript")
+
+
+def load_model(name: str, device: str = "cpu", backend: str = "torch"):
+    """
+    Load a Whisper model for the given backend. The optimised backends are CPU
+    only; on other devices the stock model is returned.
+    """
+    import whisper
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown Whisper backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    model = whisper.load_model(name, device=device)
+    if backend == "torch":
+        return model
+    if model.device.type != "cpu":
+        logger.warning(f"Whisper backend {backend} is CPU only; using the fp32 model on {model.device}")
+        return model
+    model.eval()
+    if "int8" in backend:
+        model = quantize_int8(model)
+    # Measured before tracing: a frozen TorchScript module holds its weights as
+    # constants that can no longer be enumerated.
+    model.resident_bytes = model_bytes(model)
+    if "torchscript" in backend:
+        try:
+            model = script_encoder(model)
+        except Exception as e:
+            logger.warning(f"TorchScript export of the Whisper encoder failed, keeping it eager: {e}")
+    return model
+
+
+def _plain_linears(module):
+    """
+    Replace whisper's Linear subclass with torch.nn.Linear, which is what dynamic
+    quantization knows how to convert.
+    """
+    import torch
+
+    for child_name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, child_name, plain)
+        else:
+            _plain_linears(child)
+
+
+def quantize_int8(model):
+    """
+    Dynamically quantize every Linear layer of the model to int8, in place.
+    """
+    import torch
+
+    _plain_linears(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def script_encoder(model):
+    """
+    Swap the audio encoder for a traced, frozen TorchScript module. Whisper always
+    feeds the encoder fixed-size 30 s windows, so one trace covers every input.
+    """
+    import torch
+    import whisper
+
+    example = torch.zeros(1, model.dims.n_mels, whisper.audio.N_FRAMES, device=model.device)
+    with torch.no_grad():
+        traced = torch.jit.trace(model.encoder, example, check_trace=False)
+        traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+    model.encoder = traced
+    return model
+
+
+def model_bytes(model) -> int:
+    """
+    Resident size of a model's weights, counting packed int8 weights of quantized layers.
+    """
+    if hasattr(model, "resident_bytes"):
+        return model.resident_bytes
+    total = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    for module in model.modules():
+        if hasattr(module, "_packed_params"):
+            weight, bias = module._packed_params._weight_bias()
+            total += weight.numel() * weight.element_size()
+            total += bias.numel() * bias.element_size() if bias is not None else 0
+    return total